@@ -25,6 +25,9 @@ from api.config import (
     is_multi_user_enabled
 )
 
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
 
 # --- JWT TOKEN MANAGEMENT ---
 
@@ -252,15 +255,49 @@ async def require_share_client(
 
 # --- PASSWORD HASHING (multi-user) ---
 
+# New hashes use Argon2id (memory-hard, RFC 9106 low-memory profile). Older
+# PBKDF2 'salt_hex:dk_hex' hashes are only verified, then re-hashed to Argon2id
+# on the next successful login.
+_ARGON2_PREFIX = '$argon2'
+_password_hasher = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=4)
+
+
 def hash_password(password: str) -> str:
-    """Hash a password using PBKDF2-HMAC-SHA256. Returns 'salt_hex:dk_hex'."""
-    salt = os.urandom(16)
-    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-    return f"{salt.hex()}:{dk.hex()}"
+    """Hash a password with Argon2id."""
+    return _password_hasher.hash(password)
+
+
+# Successful verifications, so a client logging in again with the same
+# password skips the deliberately slow KDF. Keys are HMACs of (hash, password)
+# under a per-process random pepper, never the password itself. Only
+# successes are cached, so a stream of wrong guesses cannot evict them.
+_VERIFY_CACHE_SIZE = 512
+_verify_pepper = os.urandom(32)
+_verify_cache: collections.OrderedDict = collections.OrderedDict()
+_verify_cache_lock = threading.Lock()
 
 
 def verify_password(password: str, stored_hash: str) -> bool:
-    """Verify a password against a stored 'salt_hex:dk_hex' hash."""
+    """Verify a password against a stored Argon2 or 'salt_hex:dk_hex' PBKDF2 hash."""
+    key = hmac.new(
+        _verify_pepper, f"{stored_hash}\0{password}".encode('utf-8'), hashlib.sha256
+    ).digest()
+    with _verify_cache_lock:
+        if key in _verify_cache:
+            _verify_cache.move_to_end(key)
+            return True
+    if not _verify_password_uncached(password, stored_hash):
+        return False
+    with _verify_cache_lock:
+        _verify_cache[key] = True
+        if len(_verify_cache) > _VERIFY_CACHE_SIZE:
+            _verify_cache.popitem(last=False)
+    return True
+
+
+def _verify_password_uncached(password: str, stored_hash: str) -> bool:
+    if isinstance(stored_hash, str) and stored_hash.startswith(_ARGON2_PREFIX):
+        return _verify_argon2(password, stored_hash)
     try:
         salt_hex, dk_hex = stored_hash.split(':')
         salt = bytes.fromhex(salt_hex)
@@ -271,13 +308,35 @@ def verify_password(password: str, stored_hash: str) -> bool:
         return False
 
 
+def _verify_argon2(password: str, stored_hash: str) -> bool:
+    try:
+        return _password_hasher.verify(stored_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+
+def password_needs_rehash(stored_hash: str) -> bool:
+    """True if a verified hash should be replaced by a fresh hash_password() one:
+    a PBKDF2 hash, or Argon2 with outdated parameters."""
+    if not stored_hash:
+        return False
+    if not stored_hash.startswith(_ARGON2_PREFIX):
+        return True
+    try:
+        return _password_hasher.check_needs_rehash(stored_hash)
+    except InvalidHashError:
+        return False
+
+
 # --- LEGACY PASSWORD VERIFICATION ---
 
 logger = logging.getLogger(__name__)
 
 
 def _is_hashed(value: str) -> bool:
-    """Return True if value looks like a stored PBKDF2 hash (salt_hex:dk_hex)."""
+    """Return True if value looks like a stored Argon2 or PBKDF2 (salt_hex:dk_hex) hash."""
+    if value.startswith(_ARGON2_PREFIX):
+        return True
     parts = value.split(':')
     if len(parts) != 2 or len(parts[0]) != 32 or len(parts[1]) != 64:
         return False
@@ -290,7 +349,7 @@ def _is_hashed(value: str) -> bool:
 
 
 def verify_legacy_password(candidate: str, stored: str) -> bool:
-    """Verify a password against either a PBKDF2 hash or plaintext value."""
+    """Verify a password against either a stored hash or plaintext value."""
     if not stored:
         return False
     if _is_hashed(stored):
@@ -298,44 +357,78 @@ def verify_legacy_password(candidate: str, stored: str) -> bool:
     return hmac.compare_digest(candidate.encode('utf-8'), stored.encode('utf-8'))
 
 
-def upgrade_legacy_password(config_key: str, plaintext: str):
-    """Hash a plaintext password and rewrite it in scoring_config.json.
+def _rewrite_config(update, description: str) -> bool:
+    """Re-read scoring_config.json, apply *update* and write it back atomically.
 
-    Called after a successful login against a plaintext password.
-    Uses the same atomic write pattern as _load_and_ensure_share_secret().
+    *update* mutates the parsed config and returns True when it changed
+    anything; nothing is written otherwise. Uses the same lock and atomic write
+    pattern as _load_and_ensure_share_secret(). Returns True if written.
     """
     from api.config import _CONFIG_PATH, _share_secret_lock, reload_config
     import json
     import shutil
     import tempfile
 
-    hashed = hash_password(plaintext)
     with _share_secret_lock:
         try:
             with open(_CONFIG_PATH) as f:
                 config = json.load(f)
         except Exception:
             logger.warning("Cannot upgrade password: failed to read config")
-            return
-        viewer = config.get('viewer', {})
-        if viewer.get(config_key, '') and not _is_hashed(viewer[config_key]):
-            viewer[config_key] = hashed
-            config['viewer'] = viewer
-            shutil.copy2(_CONFIG_PATH, f"{_CONFIG_PATH}.backup")
-            dir_name = os.path.dirname(_CONFIG_PATH)
-            fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix='.json')
+            return False
+        if not update(config):
+            return False
+        shutil.copy2(_CONFIG_PATH, f"{_CONFIG_PATH}.backup")
+        dir_name = os.path.dirname(_CONFIG_PATH)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f, indent=2)
+            os.replace(tmp_path, _CONFIG_PATH)
+            reload_config()
+            return True
+        except Exception:
             try:
-                with os.fdopen(fd, 'w') as f:
-                    json.dump(config, f, indent=2)
-                os.replace(tmp_path, _CONFIG_PATH)
-                reload_config()
-                logger.info("Upgraded plaintext %s to PBKDF2 hash", config_key)
-            except Exception:
-                try:
-                    os.unlink(tmp_path)
-                except OSError:
-                    pass
-                logger.exception("Failed to upgrade password hash for %s", config_key)
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            logger.exception("Failed to upgrade password hash for %s", description)
+            return False
+
+
+def upgrade_legacy_password(config_key: str, plaintext: str):
+    """Hash a plaintext (or outdated PBKDF2) viewer password in scoring_config.json.
+
+    Called after a successful login; checks the on-disk value, so it is
+    idempotent and only pays for hashing when an upgrade is due.
+    """
+    def update(config):
+        viewer = config.get('viewer', {})
+        stored = viewer.get(config_key, '')
+        if not stored or (_is_hashed(stored) and not password_needs_rehash(stored)):
+            return False
+        viewer[config_key] = hash_password(plaintext)
+        config['viewer'] = viewer
+        return True
+
+    if _rewrite_config(update, config_key):
+        logger.info("Upgraded %s to an Argon2id hash", config_key)
+
+
+def upgrade_user_password(username: str, plaintext: str):
+    """Re-hash a multi-user password whose stored hash password_needs_rehash().
+
+    Called after a successful login, e.g. to move PBKDF2 hashes to Argon2id.
+    """
+    def update(config):
+        user = config.get('users', {}).get(username)
+        if not isinstance(user, dict) or not password_needs_rehash(user.get('password_hash', '')):
+            return False
+        user['password_hash'] = hash_password(plaintext)
+        return True
+
+    if _rewrite_config(update, f"user '{username}'"):
+        logger.info("Upgraded password hash for user '%s' to Argon2id", username)
 
 
 def check_legacy_password_warnings():
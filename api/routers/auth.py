@@ -9,7 +9,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 from api.auth import (
     create_access_token, verify_password, verify_legacy_password,
-    upgrade_legacy_password, _login_limiter,
+    password_needs_rehash, upgrade_legacy_password, upgrade_user_password, _login_limiter,
     CurrentUser, get_optional_user, require_authenticated,
     is_edition_enabled, is_edition_authenticated,
     set_auth_cookie, clear_auth_cookie,
@@ -43,6 +43,9 @@ def login(body: LoginRequest, request: Request, response: Response):
         user = get_user_config(body.username)
         if not user or not verify_password(body.password, user.get('password_hash', '')):
             raise HTTPException(status_code=401, detail="Invalid credentials")
+        # Move PBKDF2 hashes to Argon2id transparently on a successful login
+        if password_needs_rehash(user.get('password_hash', '')):
+            upgrade_user_password(body.username, body.password)
         token = create_access_token({
             'sub': body.username,
             'role': user.get('role', 'user'),
@@ -70,7 +73,7 @@ def login(body: LoginRequest, request: Request, response: Response):
         if not verify_legacy_password(body.password, password):
             raise HTTPException(status_code=401, detail="Invalid password")
 
-        # Upgrade plaintext password to PBKDF2 hash on first successful login
+        # Upgrade a plaintext or PBKDF2 password to a fresh hash on successful login
         # (idempotent — checks on-disk value, not stale in-memory VIEWER_CONFIG)
         upgrade_legacy_password('password', body.password)
 
@@ -92,7 +95,7 @@ def edition_login(body: EditionLoginRequest, request: Request, response: Respons
     if not edition_password or not verify_legacy_password(body.password, edition_password):
         raise HTTPException(status_code=401, detail="Invalid password")
 
-    # Upgrade plaintext edition password to PBKDF2 hash
+    # Upgrade a plaintext or PBKDF2 edition password to a fresh hash
     # (idempotent — checks on-disk value, not stale in-memory VIEWER_CONFIG)
     upgrade_legacy_password('edition_password', body.password)
 
@@ -882,7 +882,7 @@ def _vec_knn_similar(conn, source_embedding, photo_path, min_similarity, vis_sql
 def _find_similar_visual(conn, source, photo_path, min_similarity, vis_sql, vis_params):
     """Find visually similar photos using pHash hamming distance (primary) + CLIP cosine (secondary)."""
     import numpy as np
-    from utils.duplicate import _POPCOUNT_TABLE
+    from utils.duplicate import _hamming_to_all, _phashes_to_uint64
     from utils.embedding import bytes_to_normalized_embedding
     PHASH_W = 0.7
     CLIP_W = 0.3
@@ -928,13 +928,8 @@ def _find_similar_visual(conn, source, photo_path, min_similarity, vis_sql, vis_
         results.sort(key=lambda x: x['similarity'], reverse=True)
         return results[:500], None
 
-    hashes = np.array([int(r['phash'], 16) for r in rows], dtype=np.uint64)
-    xor = np.bitwise_xor(hashes, source_phash)
-    hamming = np.zeros(len(rows), dtype=np.int32)
-    for byte_idx in range(8):
-        shift = np.uint64(byte_idx * 8)
-        byte_vals = ((xor >> shift) & np.uint64(0xFF)).astype(np.int32)
-        hamming += _POPCOUNT_TABLE[byte_vals]
+    hashes = _phashes_to_uint64([r['phash'] for r in rows])
+    hamming = _hamming_to_all(source_phash, hashes)
     phash_sims = 1.0 - hamming / 64.0
 
     if source_embedding is not None:
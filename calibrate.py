@@ -14,7 +14,7 @@ Usage:
         --db photo_scores_pro.db \
         --ava-annotations /path/to/AVA.txt \
         [--categories portrait,landscape,default] \
-        [--apply]
+        [--apply] [--float32]
 
     # Extended calibration with AVA semantic tags
     python calibrate.py --db photo_scores_pro.db --ava-annotations AVA.txt --ava-tags
@@ -29,13 +29,15 @@ import logging
 import os
 import sqlite3
 import sys
+import warnings
+import zipfile
 from collections import Counter, defaultdict
 
 logger = logging.getLogger("facet.calibrate")
 
 import numpy as np
 from scipy.optimize import differential_evolution, minimize
-from scipy.stats import pearsonr, spearmanr
+from scipy.stats import qmc, rankdata, spearmanr
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -64,10 +66,30 @@ EXTRA_COLUMNS = [
     'ISO', 'shutter_speed', 'tags', 'luminance',
 ]
 
+# Columns loaded as object arrays; every other column is numeric (NULL → NaN)
+TEXT_COLUMNS = {'category', 'filename', 'path', 'tags'}
+
 MIN_PHOTOS_FOR_CATEGORY = 100
 MIN_PHOTOS_FOR_BASELINE = 10
 MIN_MISCLASSIFIED_FOR_ANALYSIS = 20
 
+# Modifier DE: categories whose current modifiers already reach this SRCC are
+# left alone, and a run stops once its best SRCC stalls for this many generations
+MODIFIER_SKIP_SRCC = 0.95
+MODIFIER_STALL_GENERATIONS = 20
+
+# Numeric category filters checked by --ava-tags: filter key -> (DB column, direction)
+FILTER_METRICS = {
+    'face_ratio_min': ('face_ratio', 'min'),
+    'face_ratio_max': ('face_ratio', 'max'),
+    'luminance_max': ('luminance', 'max'),
+    'shutter_speed_min': ('shutter_speed', 'min'),
+    'shutter_speed_max': ('shutter_speed', 'max'),
+}
+
+# Rows fetched per sqlite round-trip when loading the photo table
+QUERY_BATCH_SIZE = 10000
+
 SCORING_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'scoring_config.json')
 
 # ---------------------------------------------------------------------------
@@ -163,39 +185,81 @@ AVA_TAG_COMBOS = {
 }
 
 
+def _build_ava_category_table() -> tuple[np.ndarray, list[str]]:
+    """Compile the AVA tag rules into a dense (tag1, tag2) lookup table.
+
+    Returns (table, names): ``table[tag1, tag2]`` is an index into *names*,
+    or -1 when the pair maps to no Facet category. Tag 0 stands for "absent".
+    Rules are written lowest priority first so each layer overwrites the
+    one before: tag_2 mapping, then tag_1 mapping, then combo rules.
+    """
+    size = max(AVA_TAG_NAMES) + 1
+    names = sorted(set(AVA_TAG_TO_FACET.values()) | set(AVA_TAG_COMBOS.values()))
+    name_to_idx = {name: i for i, name in enumerate(names)}
+    table = np.full((size, size), -1, dtype=np.int8)
+    for tag, category in AVA_TAG_TO_FACET.items():
+        table[:, tag] = name_to_idx[category]
+    for tag, category in AVA_TAG_TO_FACET.items():
+        table[tag, :] = name_to_idx[category]
+    for (tag1, tag2), category in AVA_TAG_COMBOS.items():
+        table[tag1, tag2] = name_to_idx[category]
+    return table, names
+
+
+AVA_CATEGORY_TABLE, AVA_CATEGORY_NAMES = _build_ava_category_table()
+
+
 def resolve_ava_category(tag1: int, tag2: int) -> str | None:
     """Resolve AVA tag pair to a Facet category name.
 
     Priority: combo rules → tag_1 mapping → tag_2 mapping → None.
+    Unknown tag ids count as absent.
     """
-    # Check combo rules first
-    combo = AVA_TAG_COMBOS.get((tag1, tag2))
-    if combo:
-        return combo
-
-    # Single-tag fallback: prefer tag_1
-    mapped = AVA_TAG_TO_FACET.get(tag1)
-    if mapped:
-        return mapped
+    size = AVA_CATEGORY_TABLE.shape[0]
+    idx = AVA_CATEGORY_TABLE[tag1 if 0 < tag1 < size else 0, tag2 if 0 < tag2 < size else 0]
+    return AVA_CATEGORY_NAMES[idx] if idx >= 0 else None
 
-    mapped = AVA_TAG_TO_FACET.get(tag2)
-    if mapped:
-        return mapped
 
-    return None
+def resolve_ava_categories(tag1: np.ndarray, tag2: np.ndarray) -> list[str | None]:
+    """Vectorized resolve_ava_category() over arrays of tag ids."""
+    size = AVA_CATEGORY_TABLE.shape[0]
+    tag1 = np.where((tag1 > 0) & (tag1 < size), tag1, 0)
+    tag2 = np.where((tag2 > 0) & (tag2 < size), tag2, 0)
+    lookup = AVA_CATEGORY_NAMES + [None]  # index -1 -> None
+    return [lookup[i] for i in AVA_CATEGORY_TABLE[tag1, tag2].tolist()]
 
 
 # ---------------------------------------------------------------------------
 # Phase 1: Data loading
 # ---------------------------------------------------------------------------
 
-def parse_ava_annotations(ava_path: str) -> dict[int, dict]:
-    """Parse AVA.txt and return {image_id: {'mos': float, 'tags': list[int]}}.
+def _parse_ava_file(ava_path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Parse AVA.txt into (image_ids, normalized MOS, tags) arrays.
 
-    AVA format: index image_id count_1 count_2 ... count_10 tag_1 tag_2 challenge_id
-    MOS = Σ(i * count_i) / Σ(count_i), then normalized to 0-10.
+    ``tags`` has shape (N, 2) holding the raw tag_1/tag_2 columns (0 = none).
+    A well-formed file is read in one np.loadtxt call and the MOS is computed
+    as a single matrix product; ragged or non-numeric files fall back to the
+    tolerant line-by-line parser.
     """
-    ava_map = {}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)  # empty file
+            arr = np.loadtxt(ava_path, dtype=np.int64, ndmin=2, usecols=range(14))
+    except ValueError:
+        return _parse_ava_lines(ava_path)
+
+    counts = arr[:, 2:12]
+    total = counts.sum(axis=1)
+    keep = total > 0
+    mos = (counts[keep] @ np.arange(1, 11, dtype=np.float64)) / total[keep]
+    # Normalize from [1, 10] → [0, 10]
+    mos_normalized = (mos - 1.0) / 9.0 * 10.0
+    return arr[keep, 1], mos_normalized, np.ascontiguousarray(arr[keep, 12:14])
+
+
+def _parse_ava_lines(ava_path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Row-by-row _parse_ava_file() that skips malformed lines."""
+    image_ids, mos_values, tag_pairs = [], [], []
     with open(ava_path, 'r') as f:
         reader = csv.reader(f, delimiter=' ')
         for row in reader:
@@ -212,110 +276,253 @@ def parse_ava_annotations(ava_path: str) -> dict[int, dict]:
                 mos_normalized = (mos - 1.0) / 9.0 * 10.0
 
                 # Parse semantic tags (columns 12-13, 0-indexed)
-                tags = []
-                for idx in (12, 13):
+                tags = [0, 0]
+                for slot, idx in enumerate((12, 13)):
                     if idx < len(row):
                         try:
-                            tag_id = int(row[idx])
-                            if tag_id > 0:
-                                tags.append(tag_id)
+                            tags[slot] = int(row[idx])
                         except ValueError:
                             pass
 
-                ava_map[image_id] = {'mos': mos_normalized, 'tags': tags}
+                image_ids.append(image_id)
+                mos_values.append(mos_normalized)
+                tag_pairs.append(tags)
             except (ValueError, IndexError):
                 continue
-    return ava_map
+    return (
+        np.array(image_ids, dtype=np.int64),
+        np.array(mos_values, dtype=np.float64),
+        np.array(tag_pairs, dtype=np.int64).reshape(-1, 2),
+    )
+
+
+def _load_ava_arrays(ava_path: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return _parse_ava_file() output, memoized in a sibling .npz file.
+
+    The cache is keyed on the annotation file's mtime and size, so editing
+    or replacing AVA.txt invalidates it. An unreadable or unwritable cache
+    just falls back to parsing.
+    """
+    cache_path = ava_path + '.facet_cache.npz'
+    stat = os.stat(ava_path)
+    key = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+    try:
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached['key'], key):
+                return cached['image_ids'], cached['mos'], cached['tags']
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+        logger.warning("  Ignoring unreadable AVA cache %s: %s", cache_path, e)
+
+    image_ids, mos, tags = _parse_ava_file(ava_path)
+    try:
+        np.savez(cache_path, key=key, image_ids=image_ids, mos=mos, tags=tags)
+    except OSError as e:
+        logger.warning("  Could not write AVA cache %s: %s", cache_path, e)
+    return image_ids, mos, tags
+
+
+def parse_ava_annotations(ava_path: str) -> dict[str, np.ndarray]:
+    """Parse AVA.txt into a column table sorted by image id.
+
+    Columns: 'image_id', 'mos' (normalized 0-10), and 'ava_tag1' / 'ava_tag2'
+    holding the photo's semantic tags in order (0 = none, so a lone tag_2 is
+    reported as ava_tag1). A repeated image id keeps its last line.
 
+    AVA format: index image_id count_1 count_2 ... count_10 tag_1 tag_2 challenge_id
+    MOS = Σ(i * count_i) / Σ(count_i), then normalized to 0-10.
+    """
+    image_ids, mos, tags = _load_ava_arrays(ava_path)
+    # np.unique over the reversed ids keeps the last occurrence of each id
+    unique_ids, first_in_reversed = np.unique(image_ids[::-1], return_index=True)
+    keep = len(image_ids) - 1 - first_in_reversed
 
-def query_facet_db(db_path: str, include_extra: bool = False) -> list[dict]:
+    raw1, raw2 = tags[keep, 0], tags[keep, 1]
+    has1, has2 = raw1 > 0, raw2 > 0
+    return {
+        'image_id': unique_ids,
+        'mos': mos[keep],
+        'ava_tag1': np.where(has1, raw1, np.where(has2, raw2, 0)),
+        'ava_tag2': np.where(has1 & has2, raw2, 0),
+    }
+
+
+def n_rows(table: dict[str, np.ndarray]) -> int:
+    """Number of photos in a column table."""
+    return len(next(iter(table.values())))
+
+
+def take_rows(table: dict[str, np.ndarray], index: np.ndarray) -> dict[str, np.ndarray]:
+    """Select rows (boolean mask or index array) from every column of *table*."""
+    return {col: values[index] for col, values in table.items()}
+
+
+def split_by(table: dict[str, np.ndarray], col: str) -> dict[str, dict[str, np.ndarray]]:
+    """Group a column table by the values of *col* (first-seen order; None skipped)."""
+    keys = table[col]
+    return {key: take_rows(table, keys == key) for key in dict.fromkeys(keys.tolist()) if key is not None}
+
+
+def column_or_default(table: dict[str, np.ndarray], col: str, default: float) -> np.ndarray:
+    """Numeric column with NULLs (or the whole column, if not loaded) set to *default*."""
+    values = table.get(col)
+    if values is None:
+        return np.full(n_rows(table), default)
+    return np.nan_to_num(values, nan=default)
+
+
+def tagged_rows(matched: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Matched photos whose AVA tags resolved to a Facet category."""
+    return take_rows(matched, matched['ava_category'].astype(bool))
+
+
+def categories_by_name(config: dict) -> dict[str, dict]:
+    """Index a scoring config's category blocks by name (first block wins)."""
+    index = {}
+    for cat in config.get('categories', []):
+        index.setdefault(cat.get('name'), cat)
+    return index
+
+
+# (db_path, db mtime_ns, WAL mtime_ns) -> column names of the photos table
+_photo_columns_cache: dict[tuple[str, int, int], frozenset[str]] = {}
+
+
+def _photo_columns(conn: sqlite3.Connection, db_path: str) -> frozenset[str]:
+    """Column names of the photos table, probed once per DB file version.
+
+    Schema changes in WAL mode land in the -wal file before a checkpoint
+    touches the main file, so both mtimes key the cache.
+    """
+    wal_path = db_path + '-wal'
+    wal_mtime = os.stat(wal_path).st_mtime_ns if os.path.exists(wal_path) else 0
+    key = (os.path.abspath(db_path), os.stat(db_path).st_mtime_ns, wal_mtime)
+    if key not in _photo_columns_cache:
+        cursor = conn.execute("PRAGMA table_info(photos)")
+        _photo_columns_cache[key] = frozenset(row[1] for row in cursor.fetchall())
+    return _photo_columns_cache[key]
+
+
+def query_facet_db(db_path: str, include_extra: bool = False) -> dict[str, np.ndarray]:
     """Query Facet DB for scored photos with all relevant metrics.
 
+    Returns a column table: one array per selected column, numeric columns as
+    float64 with NULL as NaN, TEXT_COLUMNS as object arrays. A NULL category
+    is reported as 'default'.
+
     Args:
         include_extra: If True, also fetch columns needed for modifier
                        optimization and filter analysis.
     """
     columns = list(METRIC_COLUMNS.keys()) + ['aggregate', 'category', 'filename', 'path']
-    if include_extra:
-        # Only add columns that actually exist in the DB
-        conn = sqlite3.connect(db_path)
-        try:
-            cursor = conn.execute("PRAGMA table_info(photos)")
-            existing = {row[1] for row in cursor.fetchall()}
-        finally:
-            conn.close()
-        for col in EXTRA_COLUMNS:
-            if col in existing and col not in columns:
-                columns.append(col)
-
-    col_sql = ', '.join(columns)
-    query = f"""
-        SELECT {col_sql}
-        FROM photos
-        WHERE aggregate IS NOT NULL
-    """
     conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
     try:
-        rows = conn.execute(query).fetchall()
-        return [dict(r) for r in rows]
+        if include_extra:
+            # Only add columns that actually exist in the DB
+            existing = _photo_columns(conn, db_path)
+            for col in EXTRA_COLUMNS:
+                if col in existing and col not in columns:
+                    columns.append(col)
+
+        col_sql = ', '.join(columns)
+        query = f"""
+            SELECT {col_sql}
+            FROM photos
+            WHERE aggregate IS NOT NULL
+        """
+        # Stream plain tuple rows in batches so only one batch is alive at a
+        # time; each batch is transposed into per-column arrays straight away,
+        # with the i-th tuple field belonging to columns[i].
+        chunks: dict[str, list[np.ndarray]] = {col: [] for col in columns}
+        cursor = conn.execute(query)
+        for batch in iter(lambda: cursor.fetchmany(QUERY_BATCH_SIZE), []):
+            for col, values in zip(columns, zip(*batch)):
+                chunks[col].append(_column_array(col, values))
     finally:
         conn.close()
 
+    return {
+        col: np.concatenate(parts) if parts else _column_array(col, ())
+        for col, parts in chunks.items()
+    }
+
+
+def _column_array(col: str, values) -> np.ndarray:
+    """Convert one column of DB values to its column-table array."""
+    if col == 'category':
+        return np.array([v or 'default' for v in values], dtype=object)
+    if col in TEXT_COLUMNS:
+        return np.array(values, dtype=object)
+    return np.array(values, dtype=np.float64)
+
 
-def match_photos(db_rows: list[dict], ava_map: dict[int, dict]) -> list[dict]:
+def _image_ids_from_filenames(filenames: np.ndarray, paths: np.ndarray) -> np.ndarray:
+    """Numeric AVA image id of each photo's file stem, or -1 when not numeric.
+
+    Uses the filename column, falling back to the basename of the path.
+    """
+    image_ids = np.full(len(filenames), -1, dtype=np.int64)
+    if not len(filenames):
+        return image_ids
+    names = np.where(filenames.astype(bool), filenames, paths).astype(str)
+    names = np.char.rpartition(names, '/')[:, 2]
+    parts = np.char.rpartition(names, '.')
+    stems = np.where((parts[:, 1] == '.') & (parts[:, 0] != ''), parts[:, 0], names)
+    # int64 holds any 18-digit id
+    numeric = np.char.isdigit(stems) & (np.char.str_len(stems) <= 18)
+    image_ids[numeric] = stems[numeric].astype(np.int64)
+    return image_ids
+
+
+def match_photos(db_rows: dict[str, np.ndarray], ava: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
     """Match DB rows to AVA annotations by image_id extracted from filename.
 
-    Each matched row gets 'mos', 'ava_tags', and 'ava_category' fields.
+    Returns the matched subset of *db_rows* with the 'mos', 'ava_tag1' and
+    'ava_tag2' columns of *ava* (see parse_ava_annotations) joined in, plus
+    'ava_category' (None when the tags map to no Facet category).
     """
-    matched = []
-    for row in db_rows:
-        filename = row.get('filename') or os.path.basename(row.get('path', ''))
-        stem = os.path.splitext(filename)[0]
-        try:
-            image_id = int(stem)
-        except ValueError:
-            continue
-        if image_id in ava_map:
-            row = dict(row)
-            entry = ava_map[image_id]
-            row['mos'] = entry['mos']
-            row['ava_tags'] = entry['tags']
-
-            # Resolve AVA tags to Facet category
-            tags = entry['tags']
-            tag1 = tags[0] if len(tags) > 0 else 0
-            tag2 = tags[1] if len(tags) > 1 else 0
-            row['ava_category'] = resolve_ava_category(tag1, tag2)
-
-            matched.append(row)
+    image_ids = _image_ids_from_filenames(db_rows['filename'], db_rows['path'])
+
+    # Sort-merge join against the (sorted, unique) AVA ids
+    ava_ids = ava['image_id']
+    pos = np.minimum(np.searchsorted(ava_ids, image_ids), max(len(ava_ids) - 1, 0))
+    found = ava_ids[pos] == image_ids if len(ava_ids) else np.zeros(len(image_ids), dtype=bool)
+
+    matched = take_rows(db_rows, found)
+    for col in ('mos', 'ava_tag1', 'ava_tag2'):
+        matched[col] = ava[col][pos[found]]
+
+    # Resolve AVA tags to Facet categories in one table lookup
+    matched['ava_category'] = np.array(
+        resolve_ava_categories(matched['ava_tag1'], matched['ava_tag2']), dtype=object)
     return matched
 
 
-def report_match_summary(all_rows: list[dict], matched: list[dict], ava_map: dict):
+def report_match_summary(all_rows: dict[str, np.ndarray], matched: dict[str, np.ndarray], ava: dict[str, np.ndarray]):
     """Print a summary of matched vs unmatched photos."""
+    n_all, n_matched = n_rows(all_rows), n_rows(matched)
     logger.info("=" * 60)
     logger.info("AVA MATCHING SUMMARY")
     logger.info("=" * 60)
-    logger.info("  AVA annotations loaded : %s", f"{len(ava_map):,}")
-    logger.info("  Photos in Facet DB     : %s", f"{len(all_rows):,}")
-    logger.info("  Matched photos         : %s", f"{len(matched):,}")
-    logger.info("  Unmatched photos       : %s", f"{len(all_rows) - len(matched):,}")
+    logger.info("  AVA annotations loaded : %s", f"{n_rows(ava):,}")
+    logger.info("  Photos in Facet DB     : %s", f"{n_all:,}")
+    logger.info("  Matched photos         : %s", f"{n_matched:,}")
+    logger.info("  Unmatched photos       : %s", f"{n_all - n_matched:,}")
 
-    if matched:
-        cats = Counter(r.get('category') or 'default' for r in matched)
+    if n_matched:
         logger.info("  Facet category distribution:")
-        for cat, count in sorted(cats.items(), key=lambda x: -x[1]):
+        for cat, count in _value_counts(matched['category']):
             logger.info("    %-20s %6s", cat, f"{count:,}")
 
         # AVA tag distribution (show if tags were parsed)
-        has_tags = sum(1 for r in matched if r.get('ava_tags'))
+        tag1, tag2 = matched['ava_tag1'], matched['ava_tag2']
+        has_tags = int(np.count_nonzero(tag1))
         if has_tags:
             logger.info("  AVA tag distribution (%s photos with tags):", f"{has_tags:,}")
-            tag_counts = Counter()
-            for r in matched:
-                for tag_id in r.get('ava_tags', []):
-                    tag_counts[tag_id] += 1
+            bincount = np.bincount(np.concatenate([tag1[tag1 > 0], tag2[tag2 > 0]]))
+            tag_counts = Counter({tag_id: int(c) for tag_id, c in enumerate(bincount.tolist()) if c})
             for tag_id, count in sorted(tag_counts.items(), key=lambda x: -x[1])[:15]:
                 name = AVA_TAG_NAMES.get(tag_id, f'Tag {tag_id}')
                 facet_cat = AVA_TAG_TO_FACET.get(tag_id, '-')
@@ -324,136 +531,251 @@ def report_match_summary(all_rows: list[dict], matched: list[dict], ava_map: dic
                 logger.info("    ... and %d more tags", len(tag_counts) - 15)
 
             # Resolved category distribution
-            ava_cats = Counter(r.get('ava_category') for r in matched if r.get('ava_category'))
-            if ava_cats:
+            ava_category = matched['ava_category']
+            resolved = np.not_equal(ava_category, None)
+            if resolved.any():
                 logger.info("  Resolved AVA -> Facet category distribution:")
-                for cat, count in sorted(ava_cats.items(), key=lambda x: -x[1]):
+                for cat, count in _value_counts(ava_category[resolved]):
                     logger.info("    %-20s %6s", cat, f"{count:,}")
-                unmapped = sum(1 for r in matched if r.get('ava_tags') and not r.get('ava_category'))
+                unmapped = int(np.count_nonzero((tag1 > 0) & ~resolved))
                 if unmapped:
                     logger.info("    %-20s %6s", "(unmapped)", f"{unmapped:,}")
 
 
+def _value_counts(values: np.ndarray) -> list[tuple[str, int]]:
+    """(value, count) pairs of a string column, most frequent first."""
+    names, counts = np.unique(values.astype(str), return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    return list(zip(names[order].tolist(), counts[order].tolist()))
+
+
 # ---------------------------------------------------------------------------
 # Phase 2: Baseline evaluation
 # ---------------------------------------------------------------------------
 
 def compute_correlations(predicted: np.ndarray, ground_truth: np.ndarray) -> dict:
-    """Compute SRCC, PLCC, MAE between two score arrays."""
-    if len(predicted) < 2:
-        return {'srcc': float('nan'), 'plcc': float('nan'), 'mae': float('nan')}
-    srcc, _ = spearmanr(predicted, ground_truth)
-    plcc, _ = pearsonr(predicted, ground_truth)
-    mae = float(np.mean(np.abs(predicted - ground_truth)))
-    return {'srcc': float(srcc), 'plcc': float(plcc), 'mae': mae}
+    """Compute SRCC, PLCC, MAE of each column of *predicted* (N, K) vs *ground_truth*.
 
+    Returns a dict of length-K arrays. The ground truth is ranked once for
+    all columns, and each column's SRCC is the Pearson correlation of its
+    average ranks. Constant columns get NaN correlations, as in spearmanr.
+    """
+    n, k = predicted.shape
+    if n < 2:
+        nan = np.full(k, np.nan)
+        return {'srcc': nan, 'plcc': nan, 'mae': nan}
+    constant = (predicted == predicted[0]).all(axis=0)
+
+    def pearson_vs(cols, target):
+        cols = cols - cols.mean(axis=0)
+        target = target - target.mean()
+        denom = np.sqrt(np.einsum('ij,ij->j', cols, cols) * (target @ target))
+        r = np.divide(target @ cols, denom, out=np.full(k, np.nan), where=denom > 0)
+        r[constant] = np.nan
+        return np.clip(r, -1.0, 1.0)
 
-def evaluate_baseline(matched: list[dict]) -> None:
+    return {
+        'srcc': pearson_vs(rankdata(predicted, axis=0), rankdata(ground_truth)),
+        'plcc': pearson_vs(predicted, ground_truth),
+        'mae': np.mean(np.abs(predicted - ground_truth[:, None]), axis=0),
+    }
+
+
+def evaluate_baseline(matched: dict[str, np.ndarray]) -> None:
     """Print baseline correlation table for all metrics vs AVA MOS."""
-    mos = np.array([r['mos'] for r in matched])
-    aggregate = np.array([r.get('aggregate') or 5.0 for r in matched])
+    mos = matched['mos']
 
     logger.info("=" * 60)
     logger.info("BASELINE EVALUATION")
     logger.info("=" * 60)
-    logger.info("  Photos used: %s", f"{len(matched):,}")
+    logger.info("  Photos used: %s", f"{len(mos):,}")
 
-    # Overall aggregate
-    c = compute_correlations(aggregate, mos)
+    # Overall aggregate and per-metric correlations, one column each
+    labels = ['aggregate (current)'] + list(METRIC_COLUMNS)
+    values = np.column_stack(
+        [column_or_default(matched, 'aggregate', 5.0)]
+        + [column_or_default(matched, col, 5.0) for col in METRIC_COLUMNS]
+    )
+    c = compute_correlations(values, mos)
     logger.info("  %-25s %8s %8s %8s", "Metric", "SRCC", "PLCC", "MAE")
     logger.info("  %s", "-" * 55)
-    logger.info("  %-25s %8.4f %8.4f %8.4f", "aggregate (current)", c['srcc'], c['plcc'], c['mae'])
-
-    # Per-metric correlations
-    for col in METRIC_COLUMNS:
-        vals = np.array([r.get(col) or 5.0 for r in matched])
-        c = compute_correlations(vals, mos)
-        logger.info("  %-25s %8.4f %8.4f %8.4f", col, c['srcc'], c['plcc'], c['mae'])
+    for label, srcc, plcc, mae in zip(labels, c['srcc'].tolist(), c['plcc'].tolist(), c['mae'].tolist()):
+        logger.info("  %-25s %8.4f %8.4f %8.4f", label, srcc, plcc, mae)
 
     # Per-category breakdown
-    by_cat = defaultdict(list)
-    for r in matched:
-        by_cat[r.get('category') or 'default'].append(r)
+    by_cat = split_by(matched, 'category')
 
     if len(by_cat) > 1:
         logger.info("  Per-category SRCC (aggregate vs AVA MOS):")
         for cat, rows in sorted(by_cat.items()):
-            agg = np.array([r.get('aggregate') or 5.0 for r in rows])
-            y = np.array([r['mos'] for r in rows])
-            if len(rows) >= 5:
+            agg = column_or_default(rows, 'aggregate', 5.0)
+            y = rows['mos']
+            if len(y) >= 5:
                 srcc, _ = spearmanr(agg, y)
-                logger.info("    %-20s n=%5s  SRCC=%.4f", cat, f"{len(rows):,}", srcc)
+                logger.info("    %-20s n=%5s  SRCC=%.4f", cat, f"{len(y):,}", srcc)
 
 
 # ---------------------------------------------------------------------------
 # Phase 3: Weight optimization
 # ---------------------------------------------------------------------------
 
-def build_metric_matrix(rows: list[dict]) -> tuple[np.ndarray, np.ndarray, list[str]]:
-    """Build (X, y, col_names) for optimization.
+def build_metric_matrix(
+    rows: dict[str, np.ndarray],
+    dtype: type = np.float64,
+) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Build (X, y, col_names) for optimization from a column table.
 
     Skips metrics where >50% of values are NULL/missing (not populated in this profile).
+    X is C-contiguous in *dtype*; y (MOS) always stays float64.
     """
-    col_names = list(METRIC_COLUMNS.keys())
+    y = np.asarray(rows['mos'], dtype=np.float64)
+    n = len(y)
 
-    # Filter out columns with too many NULLs
-    available_cols = []
-    for col in col_names:
-        vals = [r.get(col) for r in rows]
-        non_null = sum(1 for v in vals if v is not None)
-        if non_null / len(vals) >= 0.5:
-            available_cols.append(col)
+    # Filter out columns with too many NULLs (NaN in the column table)
+    available_cols = [
+        col for col in METRIC_COLUMNS
+        if col in rows and np.isnan(rows[col]).sum() <= n / 2
+    ]
 
     default_value = 5.0
-    X = np.array([[r.get(col) if r.get(col) is not None else default_value for col in available_cols] for r in rows], dtype=np.float64)
-    y = np.array([r['mos'] for r in rows], dtype=np.float64)
+    X = np.column_stack([rows[col] for col in available_cols]) if available_cols else np.empty((n, 0))
+    X = np.ascontiguousarray(np.nan_to_num(X, nan=default_value), dtype=dtype)
     return X, y, available_cols
 
 
-def objective(w: np.ndarray, X: np.ndarray, y: np.ndarray) -> float:
-    """Minimize negative SRCC (maximize correlation)."""
-    predicted = X @ w
-    srcc, _ = spearmanr(predicted, y)
-    return -srcc if np.isfinite(srcc) else 0.0
+def rank_target(y: np.ndarray) -> tuple[np.ndarray, float]:
+    """Rank a fixed target vector once for repeated SRCC evaluation.
+
+    Returns (centered average ranks, their L2 norm). Spearman's rho is the
+    Pearson correlation of the ranks, so the MOS side of every objective call
+    reduces to a dot product against these precomputed values.
+    """
+    y_centered = rankdata(y)
+    y_centered -= y_centered.mean()
+    return y_centered, float(np.sqrt(y_centered @ y_centered))
+
+
+def average_ranks(x: np.ndarray) -> np.ndarray:
+    """1-based average (tie-aware) ranks along axis 0, as ``rankdata(x, axis=0)``.
+
+    One argsort per column, then each tie run in sorted order gets the mean
+    of its first and last position. About twice as fast as rankdata on the
+    DE populations here, since it skips rankdata's axis shuffling and NaN
+    handling; *x* must not contain NaN.
+    """
+    n = x.shape[0]
+    cols = x.reshape(n, -1)
+    order = np.argsort(cols, axis=0)
+    ordered = np.take_along_axis(cols, order, axis=0)
+    positions = np.arange(n, dtype=np.float64)[:, None]
+    # Tie runs: first[i] marks a run starting at sorted position i,
+    # last[i] a run ending there
+    first = np.ones(cols.shape, dtype=bool)
+    np.not_equal(ordered[1:], ordered[:-1], out=first[1:])
+    last = np.ones(cols.shape, dtype=bool)
+    last[:-1] = first[1:]
+    start = np.maximum.accumulate(np.where(first, positions, 0.0), axis=0)
+    end = np.minimum.accumulate(np.where(last, positions, n)[::-1], axis=0)[::-1]
+    ranks = np.empty(cols.shape)
+    np.put_along_axis(ranks, order, (start + end) * 0.5 + 1.0, axis=0)
+    return ranks.reshape(x.shape)
+
+
+def srcc_vs_ranked(predicted: np.ndarray, y_centered: np.ndarray, y_norm: float) -> float | np.ndarray:
+    """SRCC of *predicted* against a target pre-ranked by :func:`rank_target`.
+
+    Pearson-on-ranks without spearmanr's input validation and p-value.
+    *predicted* is either one score vector of shape (N,) or a batch of M
+    candidate score vectors of shape (N, M), ranked column-wise. Constant
+    columns score 0.0 (spearmanr would return NaN).
+    """
+    ranks = average_ranks(predicted)
+    ranks -= (len(ranks) + 1) / 2.0  # average ranks always have mean (N+1)/2
+    denom = np.sqrt(np.einsum('i...,i...->...', ranks, ranks)) * y_norm
+    srcc = np.divide(y_centered @ ranks, denom, out=np.zeros_like(denom), where=denom > 0)
+    return float(srcc) if srcc.ndim == 0 else srcc
+
+
+def objective(w: np.ndarray, X: np.ndarray, y_centered: np.ndarray, y_norm: float) -> float | np.ndarray:
+    """Minimize negative SRCC (maximize correlation) against pre-ranked MOS.
+
+    *w* is a weight vector (n,) or, for SciPy's vectorized differential
+    evolution, a batch of weight vectors (n, M); the return shape follows.
+    """
+    return -srcc_vs_ranked(X @ w, y_centered, y_norm)
 
 
 def optimize_weights(
-    rows: list[dict],
+    rows: dict[str, np.ndarray],
     category: str,
     method: str = 'de',
+    dtype: type = np.float64,
 ) -> tuple[dict, dict]:
     """Optimize weights for a set of photos.
 
     Returns (result_info, col_to_weight) where col_to_weight maps DB column
-    names to optimized decimal weights (summing to 1.0).
+    names to optimized decimal weights (summing to 1.0). *dtype* sets the
+    precision of the metric matrix and predictions in the DE loop: float32
+    halves their memory traffic, and scores bounded to [0, 10] keep enough
+    precision that the rank order is practically unchanged.
     """
-    X, y, col_names = build_metric_matrix(rows)
+    X, y, col_names = build_metric_matrix(rows, dtype=dtype)
     n = len(col_names)
+    n_photos = len(y)
 
-    if len(rows) < MIN_PHOTOS_FOR_BASELINE:
-        raise ValueError(f"Not enough photos for optimization (need {MIN_PHOTOS_FOR_BASELINE}, got {len(rows)})")
+    if n_photos < MIN_PHOTOS_FOR_BASELINE:
+        raise ValueError(f"Not enough photos for optimization (need {MIN_PHOTOS_FOR_BASELINE}, got {n_photos})")
 
     # Uniform initial weights
     w0 = np.ones(n) / n
     bounds = [(0.0, 1.0)] * n
 
-    # Sum-to-1 constraint: we enforce it by normalizing inside a wrapper
+    # MOS is constant across objective calls: rank it once
+    y_centered, y_norm = rank_target(y)
+
+    # The prediction buffer is sized for a full population and reused every
+    # generation. A whole population is scored with one DGEMM of C-ordered X
+    # against Fortran-ordered W (one contiguous column per candidate), written
+    # straight into the Fortran-ordered buffer. Predictions are ranked with
+    # average (tie-aware) ranks like srcc_before/srcc_after: NULLs imputed to
+    # 5.0 and float32 rounding both produce real ties.
+    pred_buf = np.empty((n_photos, 15 * n), dtype=X.dtype, order='F')
+
+    def neg_srcc(w_norm):
+        """-SRCC for each normalized weight column of w_norm (n, M)."""
+        m = w_norm.shape[1]
+        predicted = np.matmul(X, np.asfortranarray(w_norm, dtype=X.dtype), out=pred_buf[:, :m])
+        return -srcc_vs_ranked(predicted, y_centered, y_norm)
+
+    # DE keeps re-proposing (near-)identical normalized vectors once the
+    # population stagnates; memoize per candidate, keyed at 1e-6 resolution.
+    srcc_cache: dict[bytes, float] = {}
+
+    # Sum-to-1 constraint: we enforce it by normalizing inside a wrapper.
+    # Accepts (n,) or a whole DE population as (n, M) columns.
     def constrained_objective(w):
-        w_norm = w / (w.sum() + 1e-12)
-        return objective(w_norm, X, y)
+        w_norm = (w / (w.sum(axis=0) + 1e-12)).reshape(n, -1)
+        keys = [col.tobytes() for col in np.round(w_norm, 6).T]
+        misses = [j for j, key in enumerate(keys) if key not in srcc_cache]
+        if misses:
+            values = neg_srcc(w_norm[:, misses])
+            srcc_cache.update(zip((keys[j] for j in misses), values.tolist()))
+        result = np.array([srcc_cache[key] for key in keys])
+        return result if w.ndim == 2 else result[0]
 
-    srcc_before = -objective(w0, X, y)
+    srcc_before = -objective(w0, X, y_centered, y_norm)
 
     if method == 'de':
         result = differential_evolution(
             constrained_objective,
             bounds=bounds,
             strategy='best1bin',
-            popsize=15,
+            popsize=15,  # pred_buf above holds 15 * n columns
             maxiter=200,
             seed=42,
             tol=1e-6,
-            workers=1,
+            updating='deferred',
+            vectorized=True,
         )
         w_opt = result.x
     else:
@@ -469,11 +791,11 @@ def optimize_weights(
     else:
         w_opt = w0
 
-    srcc_after = -objective(w_opt, X, y)
+    srcc_after = -objective(w_opt, X, y_centered, y_norm)
 
     result_info = {
         'category': category,
-        'n_photos': len(rows),
+        'n_photos': n_photos,
         'srcc_before': srcc_before,
         'srcc_after': srcc_after,
         'col_names': col_names,
@@ -489,101 +811,90 @@ def optimize_weights(
 # Phase 3b: AVA Tag-based Analysis
 # ---------------------------------------------------------------------------
 
-def evaluate_category_detection(matched: list[dict]) -> None:
+def evaluate_category_detection(matched: dict[str, np.ndarray]) -> None:
     """Compare Facet category assignments against AVA ground-truth tags.
 
     Prints confusion matrix, per-category precision/recall/F1,
     top misclassification pairs, and overall accuracy.
     """
     # Filter to photos with resolved AVA category
-    tagged = [r for r in matched if r.get('ava_category')]
-    if not tagged:
+    tagged = tagged_rows(matched)
+    n_tagged = n_rows(tagged)
+    if not n_tagged:
         logger.info("  No photos with resolved AVA categories -- skipping.")
         return
 
     logger.info("=" * 70)
-    logger.info("CATEGORY DETECTION VALIDATION (%s photos with AVA tags)", f"{len(tagged):,}")
+    logger.info("CATEGORY DETECTION VALIDATION (%s photos with AVA tags)", f"{n_tagged:,}")
     logger.info("=" * 70)
 
-    # Collect all categories present
-    ava_cats = sorted(set(r['ava_category'] for r in tagged))
-    facet_cats = sorted(set((r.get('category') or 'default') for r in tagged))
-    all_cats = sorted(set(ava_cats) | set(facet_cats))
-
-    # Build confusion counts: confusion[ava_cat][facet_cat] = count
-    confusion = defaultdict(Counter)
-    for r in tagged:
-        ava_cat = r['ava_category']
-        facet_cat = r.get('category') or 'default'
-        confusion[ava_cat][facet_cat] += 1
+    # Dense (K, K) confusion matrix over the union of both label sets:
+    # confusion[i, j] = photos AVA called all_cats[i] and Facet all_cats[j]
+    all_cats, codes = np.unique(
+        np.concatenate([tagged['ava_category'], tagged['category']]).astype(str),
+        return_inverse=True,
+    )
+    all_cats = all_cats.tolist()
+    k = len(all_cats)
+    ava_idx, facet_idx = codes[:n_tagged], codes[n_tagged:]
+    confusion = np.bincount(ava_idx * k + facet_idx, minlength=k * k).reshape(k, k)
 
     # Per-category precision, recall, F1
     # Precision = TP / (TP + FP) — of photos Facet called X, how many were truly X
     # Recall = TP / (TP + FN) — of photos AVA called X, how many did Facet also call X
-    facet_totals = Counter()
-    for r in tagged:
-        facet_totals[r.get('category') or 'default'] += 1
+    tp = np.diag(confusion)
+    ava_counts = confusion.sum(axis=1)
+    facet_counts = confusion.sum(axis=0)
+    precision = tp / np.maximum(facet_counts, 1)
+    recall = tp / np.maximum(ava_counts, 1)
+    f1 = np.divide(2 * precision * recall, precision + recall,
+                   out=np.zeros(k), where=(precision + recall) > 0)
 
     logger.info("  %-20s %6s %6s %6s %8s %8s %8s", "Category", "AVA", "Facet", "Match", "Prec", "Recall", "F1")
     logger.info("  %s", "-" * 68)
 
-    total_correct = 0
-    category_stats = []
-
-    for cat in all_cats:
-        ava_count = sum(confusion[cat].values())
-        facet_count = facet_totals.get(cat, 0)
-        tp = confusion[cat].get(cat, 0)
-        total_correct += tp
-
-        precision = tp / facet_count if facet_count > 0 else 0.0
-        recall = tp / ava_count if ava_count > 0 else 0.0
-        f1 = 2 * precision * recall / (precision + recall) if (precision + recall) > 0 else 0.0
-
-        if ava_count > 0 or facet_count > 0:
-            logger.info("  %-20s %6d %6d %6d %8.3f %8.3f %8.3f", cat, ava_count, facet_count, tp, precision, recall, f1)
-            category_stats.append((cat, ava_count, facet_count, tp, precision, recall, f1))
-
-    accuracy = total_correct / len(tagged) if tagged else 0.0
-    logger.info("  Overall accuracy: %s/%s = %.1f%%", f"{total_correct:,}", f"{len(tagged):,}", accuracy * 100)
-
-    # Top misclassification pairs
-    misclass = []
-    for ava_cat in ava_cats:
-        ava_total = sum(confusion[ava_cat].values())
-        for facet_cat, count in confusion[ava_cat].items():
-            if facet_cat != ava_cat and count > 0:
-                pct = count / ava_total * 100 if ava_total > 0 else 0.0
-                misclass.append((ava_cat, facet_cat, count, pct))
-
-    misclass.sort(key=lambda x: -x[2])
+    category_stats = list(zip(all_cats, ava_counts.tolist(), facet_counts.tolist(), tp.tolist(),
+                              precision.tolist(), recall.tolist(), f1.tolist()))
+    for stats in category_stats:
+        logger.info("  %-20s %6d %6d %6d %8.3f %8.3f %8.3f", *stats)
+
+    total_correct = int(tp.sum())
+    accuracy = total_correct / n_tagged
+    logger.info("  Overall accuracy: %s/%s = %.1f%%", f"{total_correct:,}", f"{n_tagged:,}", accuracy * 100)
+
+    # Top misclassification pairs: off-diagonal cells, largest first
+    off_diag = confusion.copy()
+    np.fill_diagonal(off_diag, 0)
+    flat_order = np.argsort(-off_diag, axis=None, kind='stable')[:15]
+    misclass = [
+        (all_cats[i], all_cats[j], int(off_diag[i, j]), off_diag[i, j] / ava_counts[i] * 100)
+        for i, j in zip(*np.unravel_index(flat_order, off_diag.shape))
+        if off_diag[i, j] > 0
+    ]
     if misclass:
         logger.info("  Top misclassifications:")
-        for ava_cat, facet_cat, count, pct in misclass[:15]:
+        for ava_cat, facet_cat, count, pct in misclass:
             logger.info("    AVA=%-18s -> Facet=%-18s (%5s, %5.1f%% of AVA %s)", ava_cat, facet_cat, f"{count:,}", pct, ava_cat)
 
     # Print compact confusion matrix for categories with >50 photos
-    active_ava = [c for c in ava_cats if sum(confusion[c].values()) >= 50]
-    active_facet = sorted(set(
-        fc for ac in active_ava for fc, cnt in confusion[ac].items() if cnt >= 10
-    ))
-    if active_ava and active_facet:
+    active_ava = np.flatnonzero(ava_counts >= 50)
+    active_facet = np.flatnonzero((confusion[active_ava] >= 10).any(axis=0))
+    if active_ava.size and active_facet.size:
         logger.info("  Confusion matrix (AVA rows x Facet columns, >=50 AVA photos):")
         ava_facet_label = 'AVA \\ Facet'
-        header = f"  {ava_facet_label:<18}" + ''.join(f'{c[:8]:>9}' for c in active_facet)
+        header = f"  {ava_facet_label:<18}" + ''.join(f'{all_cats[j][:8]:>9}' for j in active_facet)
         logger.info("%s", header)
         logger.info("  %s", "-" * len(header))
-        for ac in active_ava:
-            row_str = f"  {ac:<18}"
-            for fc in active_facet:
-                cnt = confusion[ac].get(fc, 0)
+        for i in active_ava:
+            row_str = f"  {all_cats[i]:<18}"
+            for cnt in confusion[i, active_facet].tolist():
                 row_str += f'{cnt:>9,}' if cnt > 0 else f'{"·":>9}'
             logger.info("%s", row_str)
 
     return category_stats
 
 
-def validate_priorities(matched: list[dict]) -> None:
+def validate_priorities(matched: dict[str, np.ndarray]) -> None:
     """Diagnostic: check if Facet priority ordering conflicts with AVA tag ordering.
 
     For photos with 2 AVA tags mapping to different Facet categories,
@@ -591,14 +902,14 @@ def validate_priorities(matched: list[dict]) -> None:
     """
     # Filter to photos with 2 tags mapping to different Facet categories
     dual_mapped = []
-    for r in matched:
-        tags = r.get('ava_tags', [])
-        if len(tags) < 2:
-            continue
-        cat_a = AVA_TAG_TO_FACET.get(tags[0])
-        cat_b = AVA_TAG_TO_FACET.get(tags[1])
+    has_two = matched['ava_tag2'] > 0
+    for tag1, tag2, facet_cat in zip(matched['ava_tag1'][has_two].tolist(),
+                                     matched['ava_tag2'][has_two].tolist(),
+                                     matched['category'][has_two].tolist()):
+        cat_a = AVA_TAG_TO_FACET.get(tag1)
+        cat_b = AVA_TAG_TO_FACET.get(tag2)
         if cat_a and cat_b and cat_a != cat_b:
-            dual_mapped.append((r, cat_a, cat_b))
+            dual_mapped.append((facet_cat, cat_a, cat_b))
 
     if not dual_mapped:
         logger.info("  No photos with dual-mapped AVA tags -- skipping priority validation.")
@@ -610,9 +921,8 @@ def validate_priorities(matched: list[dict]) -> None:
 
     # For each (cat_A, cat_B) pair, count Facet assignments
     pair_counts = defaultdict(lambda: Counter())
-    for r, cat_a, cat_b in dual_mapped:
+    for facet_cat, cat_a, cat_b in dual_mapped:
         pair_key = tuple(sorted([cat_a, cat_b]))
-        facet_cat = r.get('category') or 'default'
         pair_counts[pair_key][facet_cat] += 1
 
     logger.info("  %-35s %-40s %10s", "AVA pair", "Facet assigns ->", "Conflict?")
@@ -640,198 +950,198 @@ def validate_priorities(matched: list[dict]) -> None:
     logger.info("  Conflicts: %d pairs where Facet assigns neither AVA category as primary", conflicts)
 
 
-def analyze_filter_boundaries(matched: list[dict], config_path: str) -> list[dict]:
+def analyze_filter_boundaries(matched: dict[str, np.ndarray], cat_configs: dict[str, dict]) -> list[dict]:
     """Analyze filter thresholds for misclassified photos.
 
     For each category with significant misclassification, examines metric
-    distributions and suggests threshold adjustments.
+    distributions and suggests threshold adjustments against the current
+    filter thresholds in *cat_configs* (see :func:`categories_by_name`).
 
     Returns list of suggested changes for --apply-filters.
     """
-    tagged = [r for r in matched if r.get('ava_category')]
-    if not tagged:
+    tagged = tagged_rows(matched)
+    n_tagged = n_rows(tagged)
+    if not n_tagged:
         logger.info("  No photos with resolved AVA categories -- skipping.")
         return []
 
-    # Load current config for filter thresholds
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.warning("  Could not load config: %s", e)
-        return []
-
-    # Build category config lookup
-    cat_configs = {}
-    for cat in config.get('categories', []):
-        cat_configs[cat['name']] = cat
-
     logger.info("=" * 70)
-    logger.info("FILTER THRESHOLD ANALYSIS (%s tagged photos)", f"{len(tagged):,}")
+    logger.info("FILTER THRESHOLD ANALYSIS (%s tagged photos)", f"{n_tagged:,}")
     logger.info("=" * 70)
 
     suggestions = []
 
-    # Group by AVA category
-    by_ava_cat = defaultdict(list)
-    for r in tagged:
-        by_ava_cat[r['ava_category']].append(r)
+    # Parse each distinct tags string once; photos carry an index into the
+    # resulting tag-set vocabulary
+    tag_vocab, tag_codes = _tag_set_codes(tagged.get('tags', np.full(n_tagged, None)))
+
+    # Group by AVA category, carrying only the columns the filter checks read
+    needed = {'ava_category', 'category'} | {db_col for db_col, _ in FILTER_METRICS.values()}
+    columns = {col: tagged[col] for col in needed if col in tagged}
+    columns['tag_code'] = tag_codes
+    by_ava_cat = split_by(columns, 'ava_category')
 
-    for ava_cat, rows in sorted(by_ava_cat.items(), key=lambda x: -len(x[1])):
-        # Split into correct vs misclassified
-        correct = [r for r in rows if (r.get('category') or 'default') == ava_cat]
-        misclassified = [r for r in rows if (r.get('category') or 'default') != ava_cat]
+    for ava_cat, rows in sorted(by_ava_cat.items(), key=lambda x: -n_rows(x[1])):
+        # Correct vs misclassified as a mask over this category's rows
+        is_correct = rows['category'] == ava_cat
+        n_correct = int(np.count_nonzero(is_correct))
+        n_misclassified = len(is_correct) - n_correct
 
-        if len(misclassified) < MIN_MISCLASSIFIED_FOR_ANALYSIS:
+        if n_misclassified < MIN_MISCLASSIFIED_FOR_ANALYSIS:
             continue
 
-        recall = len(correct) / len(rows) if rows else 0.0
-        logger.info("  %s (recall=%.3f, %d misclassified as other):", ava_cat, recall, len(misclassified))
+        recall = n_correct / len(is_correct)
+        logger.info("  %s (recall=%.3f, %d misclassified as other):", ava_cat, recall, n_misclassified)
 
         cat_cfg = cat_configs.get(ava_cat, {})
         filters = cat_cfg.get('filters', {})
 
         # Analyze numeric filter thresholds
-        _analyze_numeric_filters(ava_cat, correct, misclassified, filters, suggestions)
+        _analyze_numeric_filters(ava_cat, rows, is_correct, filters, suggestions)
 
         # Analyze tag-based filters
-        _analyze_tag_filters(ava_cat, correct, misclassified, filters)
+        _analyze_tag_filters(ava_cat, rows, is_correct, filters, tag_vocab)
 
     return suggestions
 
 
+def _sorted_percentiles(sorted_values: np.ndarray, q: list[float]) -> np.ndarray:
+    """np.percentile (linear interpolation) for an already-sorted array, without re-sorting."""
+    pos = np.asarray(q, dtype=np.float64) / 100.0 * (len(sorted_values) - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (pos - lo) * (sorted_values[hi] - sorted_values[lo])
+
+
 def _analyze_numeric_filters(
     category: str,
-    correct: list[dict],
-    misclassified: list[dict],
+    rows: dict[str, np.ndarray],
+    is_correct: np.ndarray,
     filters: dict,
     suggestions: list[dict],
 ) -> None:
-    """Analyze numeric filter thresholds for one category."""
-    # Metrics to check based on common filter keys
-    filter_metrics = {
-        'face_ratio_min': ('face_ratio', 'min'),
-        'face_ratio_max': ('face_ratio', 'max'),
-        'luminance_max': ('luminance', 'max'),
-        'shutter_speed_min': ('shutter_speed', 'min'),
-        'shutter_speed_max': ('shutter_speed', 'max'),
-    }
+    """Analyze numeric filter thresholds for one category.
 
-    for filter_key, (db_col, direction) in filter_metrics.items():
+    *rows* holds every photo AVA put in *category*; *is_correct* marks the
+    ones Facet also assigned to it.
+    """
+    n_total = len(is_correct)
+
+    for filter_key, (db_col, direction) in FILTER_METRICS.items():
         if filter_key not in filters:
             continue
 
         current_threshold = filters[filter_key]
+        if db_col not in rows:
+            continue
 
-        # Collect values for correct and misclassified
-        correct_vals = [r.get(db_col) for r in correct if r.get(db_col) is not None]
-        misclass_vals = [r.get(db_col) for r in misclassified if r.get(db_col) is not None]
+        # Non-NULL values for correct and misclassified, masked in place
+        values = rows[db_col]
+        valid = ~np.isnan(values)
+        misclass_sorted = np.sort(values[valid & ~is_correct])
+        n_misclass = len(misclass_sorted)
 
-        if not correct_vals or not misclass_vals:
+        if not np.any(valid & is_correct) or not n_misclass:
             continue
 
-        np.array(correct_vals)
-        misclass_arr = np.array(misclass_vals)
-
-        # Sweep thresholds to find better boundary
+        # Sweep candidate thresholds in one shot; only candidates that loosen
+        # the filter count. The first candidate with the largest gain wins.
         if direction == 'min':
-            # For min filters, lowering the threshold captures more photos
-            candidates = np.percentile(misclass_arr, [5, 10, 15, 20, 25])
-            best_threshold = current_threshold
-            best_gain = 0
-
-            for candidate in candidates:
-                if candidate >= current_threshold:
-                    continue
-                # How many misclassified would now pass the filter?
-                gained = np.sum(misclass_arr >= candidate)
-                # How many correct would we incorrectly exclude?
-                # (For min filters, lowering threshold shouldn't exclude correct photos)
-                lost = 0
-                net = gained - lost
-                if net > best_gain:
-                    best_gain = net
-                    best_threshold = float(candidate)
-
-            if best_gain > 0 and best_threshold != current_threshold:
-                recall_gain = best_gain / (len(correct) + len(misclassified)) * 100
-                logger.info("    %s: current=%s, suggested=%.4f (+%d photos, +%.1f%% recall)",
-                            filter_key, current_threshold, best_threshold, best_gain, recall_gain)
-                suggestions.append({
-                    'category': category,
-                    'filter_key': filter_key,
-                    'current': current_threshold,
-                    'suggested': round(best_threshold, 4),
-                    'gain': best_gain,
-                })
-
-        elif direction == 'max':
+            # For min filters, lowering the threshold captures more photos:
+            # how many misclassified would now pass? (Lowering a min threshold
+            # doesn't exclude any correct photos, so nothing is lost.)
+            candidates = _sorted_percentiles(misclass_sorted, [5, 10, 15, 20, 25])
+            gained = n_misclass - np.searchsorted(misclass_sorted, candidates, side='left')
+            gained = np.where(candidates < current_threshold, gained, 0)
+        else:
             # For max filters, raising the threshold captures more photos
-            candidates = np.percentile(misclass_arr, [75, 80, 85, 90, 95])
-            best_threshold = current_threshold
-            best_gain = 0
+            candidates = _sorted_percentiles(misclass_sorted, [75, 80, 85, 90, 95])
+            gained = np.searchsorted(misclass_sorted, candidates, side='right')
+            gained = np.where(candidates > current_threshold, gained, 0)
+
+        best = int(np.argmax(gained))
+        best_gain = int(gained[best])
+        best_threshold = float(candidates[best])
+
+        if best_gain > 0 and best_threshold != current_threshold:
+            recall_gain = best_gain / n_total * 100
+            logger.info("    %s: current=%s, suggested=%.4f (+%d photos, +%.1f%% recall)",
+                        filter_key, current_threshold, best_threshold, best_gain, recall_gain)
+            suggestions.append({
+                'category': category,
+                'filter_key': filter_key,
+                'current': current_threshold,
+                'suggested': round(best_threshold, 4),
+                'gain': best_gain,
+            })
+
+
+def _parse_tag_string(value: str) -> frozenset[str]:
+    """Tag set of a DB ``tags`` value: comma-separated (as Facet stores it) or a JSON list."""
+    from utils.tags import string_to_tags
+
+    if value.startswith('['):
+        try:
+            return frozenset(json.loads(value))
+        except (json.JSONDecodeError, TypeError):
+            return frozenset()
+    return frozenset(string_to_tags(value))
 
-            for candidate in candidates:
-                if candidate <= current_threshold:
-                    continue
-                gained = np.sum(misclass_arr <= candidate)
-                net = gained
-                if net > best_gain:
-                    best_gain = net
-                    best_threshold = float(candidate)
-
-            if best_gain > 0 and best_threshold != current_threshold:
-                recall_gain = best_gain / (len(correct) + len(misclassified)) * 100
-                logger.info("    %s: current=%s, suggested=%.4f (+%d photos, +%.1f%% recall)",
-                            filter_key, current_threshold, best_threshold, best_gain, recall_gain)
-                suggestions.append({
-                    'category': category,
-                    'filter_key': filter_key,
-                    'current': current_threshold,
-                    'suggested': round(best_threshold, 4),
-                    'gain': best_gain,
-                })
+
+def _tag_set_codes(tags: np.ndarray) -> tuple[list[frozenset[str]], np.ndarray]:
+    """Factor a ``tags`` column into (vocabulary of tag sets, per-photo index).
+
+    Photos share a small vocabulary of tag strings, so each distinct string
+    is parsed once. NULL and empty tags map to the empty set.
+    """
+    strings, codes = np.unique([t or '' for t in tags.tolist()], return_inverse=True)
+    vocab = [_parse_tag_string(value) if value else frozenset() for value in strings.tolist()]
+    return vocab, codes.reshape(-1)
 
 
 def _analyze_tag_filters(
     category: str,
-    correct: list[dict],
-    misclassified: list[dict],
+    rows: dict[str, np.ndarray],
+    is_correct: np.ndarray,
     filters: dict,
+    tag_vocab: list[frozenset[str]],
 ) -> None:
-    """Analyze tag-based filter hit rate for misclassified photos."""
+    """Analyze tag-based filter hit rate for misclassified photos.
+
+    ``rows['tag_code']`` indexes each photo's tag set in *tag_vocab*
+    (see :func:`_tag_set_codes`).
+    """
     required_tags = filters.get('required_tags')
     if not required_tags:
         return
 
-    # Check what % of misclassified photos lack the required tags
-    missing_count = 0
-    for r in misclassified:
-        photo_tags = r.get('tags')
-        if not photo_tags:
-            missing_count += 1
-            continue
-        # Tags may be stored as JSON string or already a list
-        if isinstance(photo_tags, str):
-            try:
-                photo_tags = json.loads(photo_tags)
-            except (json.JSONDecodeError, TypeError):
-                photo_tags = []
-        has_required = any(t in photo_tags for t in required_tags)
-        if not has_required:
-            missing_count += 1
+    # Check what % of misclassified photos lack the required tags: test each
+    # distinct tag set once, then count photos by their vocabulary index
+    required = frozenset(required_tags)
+    lacks_required = np.array([required.isdisjoint(tag_set) for tag_set in tag_vocab], dtype=bool)
+    n_misclassified = len(is_correct) - int(np.count_nonzero(is_correct))
+    missing_count = int(np.count_nonzero(lacks_required[rows['tag_code'][~is_correct]]))
 
     if missing_count > 0:
-        pct = missing_count / len(misclassified) * 100
+        pct = missing_count / n_misclassified * 100
         logger.info("    Missing required tags: %d/%d (%.0f%%) lack %s -> tagger bottleneck",
-                    missing_count, len(misclassified), pct,
+                    missing_count, n_misclassified, pct,
                     f"{required_tags[:3]}{'...' if len(required_tags) > 3 else ''}")
 
 
+def _penalty_group(category: str, weights: dict) -> tuple[bool, bool]:
+    """(skip_clipping, skip_oversat) penalty flags of a category, as in scorer.py."""
+    return (weights.get('_skip_clipping_penalty', category == 'silhouette'),
+            weights.get('_skip_oversaturation_penalty', category in ('night', 'astro', 'concert')))
+
+
 def optimize_modifiers(
-    rows: list[dict],
+    rows: dict[str, np.ndarray],
     category: str,
-    config_path: str,
+    cat_cfg: dict,
+    penalty_settings: dict,
+    dtype: type = np.float64,
+    init_hint: np.ndarray | None = None,
 ) -> dict | None:
     """Optimize bonus, noise_tolerance_multiplier, and _clipping_multiplier.
 
@@ -839,30 +1149,22 @@ def optimize_modifiers(
     to simulate aggregate scores, then optimizes modifiers via differential
     evolution to maximize SRCC against AVA MOS.
 
-    Returns optimized modifier dict or None if insufficient data.
+    *cat_cfg* is the category's config block (current weights and
+    modifiers) and *penalty_settings* the config's global penalty block.
+    *dtype* sets the precision of the simulated scores in the DE loop, as in
+    :func:`optimize_weights`. *init_hint* is a (bonus, noise_tol, clip_mult)
+    point, typically the optimum of a category with the same penalty setup
+    (see :func:`_penalty_group`), around which part of the initial
+    population is seeded.
+    Returns optimized modifier dict or None if insufficient data. When the
+    current modifiers already reach MODIFIER_SKIP_SRCC the DE is skipped and
+    the result is flagged ``'skipped'`` with the current values as optimized.
     """
-    if len(rows) < MIN_PHOTOS_FOR_BASELINE:
-        return None
-
-    # Load config for current weights and penalty settings
-    try:
-        with open(config_path, 'r') as f:
-            config_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return None
-
-    # Find category config
-    cat_cfg = None
-    for cat in config_data.get('categories', []):
-        if cat.get('name') == category:
-            cat_cfg = cat
-            break
-    if not cat_cfg:
+    if n_rows(rows) < MIN_PHOTOS_FOR_BASELINE:
         return None
 
     weights = cat_cfg.get('weights', {})
     modifiers = cat_cfg.get('modifiers', {})
-    penalty_settings = config_data.get('penalty_settings', {})
 
     # Current modifier values
     current_bonus = modifiers.get('bonus', 0.0)
@@ -878,9 +1180,7 @@ def optimize_modifiers(
     bimodality_pen = penalty_settings.get('bimodality_penalty_points', 0.5)
     oversat_threshold = penalty_settings.get('oversaturation_threshold', 0.9)
     oversat_pen = penalty_settings.get('oversaturation_penalty_points', 0.5)
-    skip_clipping = weights.get('_skip_clipping_penalty', category == 'silhouette')
-    skip_oversat = weights.get('_skip_oversaturation_penalty',
-                               category in ('night', 'astro', 'concert'))
+    skip_clipping, skip_oversat = _penalty_group(category, weights)
 
     # Build weight vector from config (metric_name → decimal weight)
     metric_weights = {}
@@ -889,94 +1189,150 @@ def optimize_modifiers(
             metric_name = key[:-len('_percent')]
             metric_weights[metric_name] = val / 100.0
 
-    # Map DB columns to config metric names for the weight lookup
-    db_to_metric = {
-        'aesthetic': 'aesthetic',
-        'comp_score': 'composition',
-        'face_quality': 'face_quality',
-        'tech_sharpness': 'tech_sharpness',
-        'exposure_score': 'exposure',
-        'color_score': 'color',
-        'contrast_score': 'contrast',
-        'leading_lines_score': 'leading_lines',
-        'aesthetic_iaa': 'aesthetic_iaa',
-        'liqe_score': 'liqe',
-    }
+    # Only metrics with a positive weight contribute (as in scorer.py), so
+    # resolve them against METRIC_COLUMNS once and load just those columns
+    active = [
+        (db_col, metric_weights[metric_name])
+        for db_col, metric_name in METRIC_COLUMNS.items()
+        if metric_weights.get(metric_name, 0.0) > 0
+    ]
 
     # Precompute per-photo base weighted score and penalty components
-    n = len(rows)
-    base_scores = np.zeros(n)
-    noise_penalties = np.zeros(n)
-    clipping_penalties = np.zeros(n)
-    bimodality_penalties = np.zeros(n)
-    oversat_penalties = np.zeros(n)
-    mos = np.zeros(n)
-
-    for i, r in enumerate(rows):
-        mos[i] = r['mos']
-
-        # Weighted sum of metrics
-        score = 0.0
-        for db_col, metric_name in db_to_metric.items():
-            w = metric_weights.get(metric_name, 0.0)
-            if w > 0:
-                val = max(0.0, min(10.0, float(r.get(db_col) or 5.0)))
-                score += val * w
-        base_scores[i] = score
-
-        # Noise penalty
-        noise_sigma = float(r.get('noise_sigma') or 0)
-        if noise_sigma > noise_threshold:
-            noise_penalties[i] = min(noise_max_pen, (noise_sigma - noise_threshold) * noise_rate)
-
-        # Clipping penalty
-        if not skip_clipping:
-            shadow = float(r.get('shadow_clipped') or 0)
-            highlight = float(r.get('highlight_clipped') or 0)
-            if shadow or highlight:
-                clipping_penalties[i] = shadow * 0.5 + highlight * 1.0
-
-        # Bimodality penalty
-        bimod = float(r.get('histogram_bimodality') or 0)
-        if bimod > bimodality_threshold:
-            bimodality_penalties[i] = bimodality_pen
-
-        # Oversaturation penalty
-        if not skip_oversat:
-            mean_sat = float(r.get('mean_saturation') or 0)
-            if mean_sat > oversat_threshold:
-                oversat_penalties[i] = oversat_pen
+    n = n_rows(rows)
+    mos = rows['mos']
+
+    # Weighted sum of metrics: one (n, K) matrix clipped in place, one matvec
+    if active:
+        metric_matrix = np.column_stack([column_or_default(rows, db_col, 5.0) for db_col, _ in active])
+        np.clip(metric_matrix, 0.0, 10.0, out=metric_matrix)
+        base_scores = metric_matrix @ np.array([w for _, w in active])
+    else:
+        base_scores = np.zeros(n)
+
+    # Noise penalty
+    noise_sigma = column_or_default(rows, 'noise_sigma', 0.0)
+    noise_penalties = np.where(
+        noise_sigma > noise_threshold,
+        np.minimum(noise_max_pen, (noise_sigma - noise_threshold) * noise_rate),
+        0.0,
+    )
+
+    # Clipping penalty
+    if skip_clipping:
+        clipping_penalties = np.zeros(n)
+    else:
+        clipping_penalties = (column_or_default(rows, 'shadow_clipped', 0.0) * 0.5
+                              + column_or_default(rows, 'highlight_clipped', 0.0) * 1.0)
+
+    # Bimodality penalty
+    bimodality_penalties = np.where(
+        column_or_default(rows, 'histogram_bimodality', 0.0) > bimodality_threshold, bimodality_pen, 0.0)
+
+    # Oversaturation penalty
+    if skip_oversat:
+        oversat_penalties = np.zeros(n)
+    else:
+        oversat_penalties = np.where(
+            column_or_default(rows, 'mean_saturation', 0.0) > oversat_threshold, oversat_pen, 0.0)
+
+    # Fold the modifier-independent penalties into the base score once, and
+    # stack the two scaled penalties so a candidate's total is one matmul
+    fixed_scores = (base_scores - bimodality_penalties - oversat_penalties).astype(dtype)
+    scaled_penalties = np.column_stack([clipping_penalties, noise_penalties]).astype(dtype)
 
     def simulate(params):
-        """Simulate aggregate with given modifier params."""
-        bonus, noise_tol, clip_mult = params
-        scores = base_scores + bonus
-        scores -= clipping_penalties * clip_mult
-        scores -= noise_penalties * noise_tol
-        scores -= bimodality_penalties
-        scores -= oversat_penalties
-        return np.clip(scores, 0.0, 10.0)
+        """Simulate aggregates for modifier params (3,) or a DE population (3, M).
+
+        Returns an (n, M) score matrix, one column per candidate.
+        """
+        bonus, noise_tol, clip_mult = np.reshape(params, (3, -1))
+        scores = scaled_penalties @ -np.vstack([clip_mult, noise_tol]).astype(dtype)
+        scores += fixed_scores[:, None]
+        scores += bonus
+        # Keep the clamp: scores saturating at 0 or 10 tie, which changes SRCC
+        return np.clip(scores, 0.0, 10.0, out=scores)
+
+    # MOS is constant across objective calls: rank it once
+    mos_centered, mos_norm = rank_target(mos)
+
+    # DE re-proposes near-identical modifiers as the population converges;
+    # memoize per candidate, keyed at 1e-5 resolution.
+    srcc_cache: dict[bytes, float] = {}
 
     def modifier_objective(params):
-        predicted = simulate(params)
-        srcc, _ = spearmanr(predicted, mos)
-        return -srcc if np.isfinite(srcc) else 0.0
+        """-SRCC for params (3,) or, vectorized, for each column of (3, M)."""
+        population = np.reshape(params, (3, -1))
+        keys = [col.tobytes() for col in np.round(population, 5).T]
+        misses = [j for j, key in enumerate(keys) if key not in srcc_cache]
+        if misses:
+            values = -srcc_vs_ranked(simulate(population[:, misses]), mos_centered, mos_norm)
+            srcc_cache.update(zip((keys[j] for j in misses), values.tolist()))
+        neg_srcc = np.array([srcc_cache[key] for key in keys])
+        return neg_srcc if np.ndim(params) == 2 else float(neg_srcc[0])
 
     # Current SRCC
     current_params = [current_bonus, current_noise_tol, current_clip_mult]
     srcc_before = -modifier_objective(current_params)
+    current = {
+        'bonus': current_bonus,
+        'noise_tolerance_multiplier': current_noise_tol,
+        '_clipping_multiplier': current_clip_mult,
+    }
 
-    # Optimize
+    if srcc_before >= MODIFIER_SKIP_SRCC:
+        return {
+            'category': category,
+            'n_photos': n,
+            'srcc_before': srcc_before,
+            'srcc_after': srcc_before,
+            'current': current,
+            'optimized': dict(current),
+            'skipped': True,
+        }
+
+    # Optimize: the whole population is simulated and ranked in one call.
+    # SRCC is piecewise constant in the modifiers, so the default L-BFGS-B
+    # polish only spends finite-difference evaluations on zero gradients.
     bounds = [(0.0, 1.0), (0.0, 1.0), (0.5, 3.0)]
+    low, high = np.array(bounds).T
+
+    # Latin hypercube start seeded with the current modifiers: DE keeps the
+    # best member, so it never returns worse than the current config, and an
+    # already-tuned category converges in a few generations
+    popsize = 15
+    init = qmc.scale(qmc.LatinHypercube(d=3, seed=42).random(popsize * 3), low, high)
+    init[0] = np.clip(current_params, low, high)
+    if init_hint is not None:
+        # Warm start: a block of members jittered around a related optimum
+        jitter = np.random.default_rng(42).normal(0.0, 0.05, size=(popsize, 3)) * (high - low)
+        init[1:popsize + 1] = np.clip(init_hint + jitter, low, high)
+        init[1] = np.clip(init_hint, low, high)
+
+    # Stop early once the best member has not improved for a while; its
+    # objective value is already memoized, so the check costs a dict lookup
+    best = {'value': np.inf, 'stalled': 0}
+
+    def stop_when_stalled(xk, convergence):
+        value = modifier_objective(xk)
+        if value < best['value'] - 1e-6:
+            best['value'], best['stalled'] = value, 0
+        else:
+            best['stalled'] += 1
+        return best['stalled'] >= MODIFIER_STALL_GENERATIONS
+
     result = differential_evolution(
         modifier_objective,
         bounds=bounds,
         strategy='best1bin',
-        popsize=15,
+        popsize=popsize,
         maxiter=100,
         seed=42,
-        tol=1e-6,
-        workers=1,
+        tol=1e-4,
+        init=init,
+        updating='deferred',
+        vectorized=True,
+        polish=False,
+        callback=stop_when_stalled,
     )
 
     opt_bonus, opt_noise_tol, opt_clip_mult = result.x
@@ -987,11 +1343,7 @@ def optimize_modifiers(
         'n_photos': n,
         'srcc_before': srcc_before,
         'srcc_after': srcc_after,
-        'current': {
-            'bonus': current_bonus,
-            'noise_tolerance_multiplier': current_noise_tol,
-            '_clipping_multiplier': current_clip_mult,
-        },
+        'current': current,
         'optimized': {
             'bonus': round(float(opt_bonus), 3),
             'noise_tolerance_multiplier': round(float(opt_noise_tol), 3),
@@ -1001,12 +1353,16 @@ def optimize_modifiers(
 
 
 def run_ava_tag_analysis(
-    matched: list[dict],
+    matched: dict[str, np.ndarray],
     config_path: str,
     apply_filters: bool,
     apply_modifiers: bool = False,
+    dtype: type = np.float64,
 ) -> None:
-    """Run all AVA tag-based analysis phases."""
+    """Run all AVA tag-based analysis phases.
+
+    *dtype* is the precision of the modifier optimizer's simulated scores.
+    """
 
     # Phase 2: Category detection validation
     evaluate_category_detection(matched)
@@ -1014,28 +1370,50 @@ def run_ava_tag_analysis(
     # Phase 4: Priority validation
     validate_priorities(matched)
 
+    # Current config, parsed once for the filter and modifier phases
+    try:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logger.warning("  Could not load config: %s", e)
+        config = None
+
+    cat_configs = categories_by_name(config) if config is not None else {}
+
     # Phase 5: Filter threshold analysis
-    suggestions = analyze_filter_boundaries(matched, config_path)
+    suggestions = analyze_filter_boundaries(matched, cat_configs) if config is not None else []
 
     # Phase 6: Modifier optimization
     modifier_results = []
-    tagged = [r for r in matched if r.get('ava_category')]
-    if tagged:
-        by_ava_cat = defaultdict(list)
-        for r in tagged:
-            by_ava_cat[r['ava_category']].append(r)
+    tagged = tagged_rows(matched)
+    if config is not None and n_rows(tagged):
+        penalty_settings = config.get('penalty_settings', {})
+        by_ava_cat = split_by(tagged, 'ava_category')
 
         logger.info("=" * 70)
         logger.info("MODIFIER OPTIMIZATION")
         logger.info("=" * 70)
 
-        for cat, rows in sorted(by_ava_cat.items(), key=lambda x: -len(x[1])):
-            if len(rows) < MIN_PHOTOS_FOR_CATEGORY:
+        # Best modifiers per (skip_clipping, skip_oversat) setup, used to
+        # warm-start the next category that penalizes the same way
+        last_best: dict[tuple[bool, bool], np.ndarray] = {}
+
+        for cat, rows in sorted(by_ava_cat.items(), key=lambda x: -n_rows(x[1])):
+            if n_rows(rows) < MIN_PHOTOS_FOR_CATEGORY:
                 continue
 
-            logger.info("  Optimizing modifiers for '%s' (%s photos)...", cat, f"{len(rows):,}")
-            result = optimize_modifiers(rows, cat, config_path)
+            logger.info("  Optimizing modifiers for '%s' (%s photos)...", cat, f"{n_rows(rows):,}")
+            cat_cfg = cat_configs.get(cat)
+            if cat_cfg is None:
+                continue
+            group = _penalty_group(cat, cat_cfg.get('weights', {}))
+            result = optimize_modifiers(rows, cat, cat_cfg, penalty_settings, dtype=dtype,
+                                        init_hint=last_best.get(group))
             if result:
+                last_best[group] = np.array(list(result['optimized'].values()))
+            if result and result.get('skipped'):
+                logger.info("    SRCC already %.4f -- keeping current modifiers.", result['srcc_before'])
+            elif result:
                 delta = result['srcc_after'] - result['srcc_before']
                 sign = '+' if delta >= 0 else ''
                 logger.info("    SRCC: %.4f -> %.4f (%s%.4f)", result['srcc_before'], result['srcc_after'], sign, delta)
@@ -1049,93 +1427,80 @@ def run_ava_tag_analysis(
                     logger.info("    %-35s %10s %10s", key, cur_str, opt_str)
                 modifier_results.append(result)
 
-    # Apply modifier results if requested
+    # Apply modifier results and filter suggestions in memory, then save once
+    modifiers_applied = filters_applied = 0
     if apply_modifiers and modifier_results:
         logger.info("=" * 70)
         logger.info("APPLYING MODIFIER CHANGES")
         logger.info("=" * 70)
-        _apply_modifier_results(config_path, modifier_results)
+        modifiers_applied = _apply_modifier_results(cat_configs, modifier_results)
+        if not modifiers_applied:
+            logger.info("  No modifier changes applied.")
     elif modifier_results and not apply_modifiers:
         logger.info("  Tip: rerun with --apply to also write optimized modifiers")
 
-    # Apply filter suggestions if requested
     if apply_filters and suggestions:
         logger.info("=" * 70)
         logger.info("APPLYING FILTER THRESHOLD CHANGES")
         logger.info("=" * 70)
-        _apply_filter_suggestions(config_path, suggestions)
+        filters_applied = _apply_filter_suggestions(cat_configs, suggestions)
+        if not filters_applied:
+            logger.info("  No changes applied.")
     elif suggestions and not apply_filters:
         logger.info("  Tip: rerun with --apply-filters to write suggested threshold changes")
 
+    if modifiers_applied or filters_applied:
+        save_config(config_path, config)
+        if modifiers_applied:
+            logger.info("  Applied modifiers for %d categories to %s", modifiers_applied, config_path)
+        if filters_applied:
+            logger.info("  Applied %d filter changes to %s", filters_applied, config_path)
+            logger.info("  Run: python facet.py --recompute-average")
 
-def _apply_filter_suggestions(config_path: str, suggestions: list[dict]) -> None:
-    """Write filter threshold suggestions to scoring_config.json."""
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error("  Could not load config: %s", e)
-        return
 
+def _apply_filter_suggestions(cat_configs: dict[str, dict], suggestions: list[dict]) -> int:
+    """Write filter threshold suggestions into the in-memory category configs.
+
+    Returns the number of changes made; the caller saves the config.
+    """
     applied = 0
     for suggestion in suggestions:
         cat_name = suggestion['category']
         filter_key = suggestion['filter_key']
         new_value = suggestion['suggested']
 
-        for cat in config.get('categories', []):
-            if cat.get('name') != cat_name:
-                continue
-            filters = cat.setdefault('filters', {})
-            old_value = filters.get(filter_key)
-            filters[filter_key] = new_value
-            logger.info("  %s.filters.%s: %s -> %s", cat_name, filter_key, old_value, new_value)
-            applied += 1
-            break
-
-    if applied:
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
-            f.write('\n')
-        logger.info("  Applied %d filter changes to %s", applied, config_path)
-        logger.info("  Run: python facet.py --recompute-average")
-    else:
-        logger.info("  No changes applied.")
+        cat = cat_configs.get(cat_name)
+        if cat is None:
+            continue
+        filters = cat.setdefault('filters', {})
+        old_value = filters.get(filter_key)
+        filters[filter_key] = new_value
+        logger.info("  %s.filters.%s: %s -> %s", cat_name, filter_key, old_value, new_value)
+        applied += 1
+    return applied
 
 
-def _apply_modifier_results(config_path: str, modifier_results: list[dict]) -> None:
-    """Write optimized modifier values to scoring_config.json."""
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error("  Could not load config: %s", e)
-        return
+def _apply_modifier_results(cat_configs: dict[str, dict], modifier_results: list[dict]) -> int:
+    """Write optimized modifier values into the in-memory category configs.
 
+    Returns the number of categories updated; the caller saves the config.
+    """
     applied = 0
     for result in modifier_results:
         cat_name = result['category']
         optimized = result['optimized']
 
-        for cat in config.get('categories', []):
-            if cat.get('name') != cat_name:
-                continue
-            modifiers = cat.setdefault('modifiers', {})
-            for key, new_val in optimized.items():
-                old_val = modifiers.get(key)
-                modifiers[key] = new_val
-                old_str = f'{old_val:.3f}' if isinstance(old_val, (int, float)) else str(old_val)
-                logger.info("  %s.modifiers.%s: %s -> %.3f", cat_name, key, old_str, new_val)
-            applied += 1
-            break
-
-    if applied:
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
-            f.write('\n')
-        logger.info("  Applied modifiers for %d categories to %s", applied, config_path)
-    else:
-        logger.info("  No modifier changes applied.")
+        cat = cat_configs.get(cat_name)
+        if cat is None:
+            continue
+        modifiers = cat.setdefault('modifiers', {})
+        for key, new_val in optimized.items():
+            old_val = modifiers.get(key)
+            modifiers[key] = new_val
+            old_str = f'{old_val:.3f}' if isinstance(old_val, (int, float)) else str(old_val)
+            logger.info("  %s.modifiers.%s: %s -> %.3f", cat_name, key, old_str, new_val)
+        applied += 1
+    return applied
 
 
 # ---------------------------------------------------------------------------
@@ -1158,106 +1523,109 @@ def print_optimization_result(info: dict, col_to_weight: dict) -> None:
     logger.info("  SRCC before: %.4f  ->  after: %.4f  (%s%.4f)", info['srcc_before'], info['srcc_after'], sign, delta)
 
 
-def log_run_to_db(db_path: str, info: dict, col_to_weight: dict, current_config_weights: dict) -> None:
-    """Insert a row into weight_optimization_runs."""
-    old_w = {col: wb for col, wb in zip(info['col_names'], info['w_before'])}
-    new_w = col_to_weight
+def log_runs_to_db(conn: sqlite3.Connection, runs: list[tuple[dict, dict]]) -> None:
+    """Insert one weight_optimization_runs row per (info, col_to_weight) run.
 
-    conn = sqlite3.connect(db_path)
-    try:
-        conn.execute("""
-            INSERT INTO weight_optimization_runs
-              (category, comparisons_used, old_weights, new_weights, mse_before, mse_after)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
+    The caller owns the commit, so a whole calibration pass is one transaction.
+    """
+    conn.executemany("""
+        INSERT INTO weight_optimization_runs
+          (category, comparisons_used, old_weights, new_weights, mse_before, mse_after)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        (
             info['category'],
             info['n_photos'],
-            json.dumps(old_w),
-            json.dumps(new_w),
+            json.dumps(dict(zip(info['col_names'], info['w_before']))),
+            json.dumps(col_to_weight),
             1.0 - info['srcc_before'],  # "mse" proxy = 1 - SRCC
             1.0 - info['srcc_after'],
-        ))
-        conn.commit()
-    finally:
-        conn.close()
+        )
+        for info, col_to_weight in runs
+    ])
+
 
+def snapshot_config_to_db(conn: sqlite3.Connection, category: str, weights_dict: dict, srcc_before: float) -> None:
+    """Save current config weights to weight_config_snapshots before overwriting.
 
-def snapshot_config_to_db(db_path: str, category: str, weights_dict: dict, srcc_before: float) -> None:
-    """Save current config weights to weight_config_snapshots before overwriting."""
+    The caller owns the commit.
+    """
     from db import record_weight_snapshot
     record_weight_snapshot(
         category, weights_dict,
-        created_by='calibrate.py', db=db_path,
+        created_by='calibrate.py', db=conn,
         description=f"Pre-calibration snapshot (SRCC={srcc_before:.4f})",
         accuracy_before=srcc_before,
     )
 
 
+def save_config(config_path: str, config: dict) -> None:
+    """Write scoring_config.json atomically.
+
+    Writes a sibling temp file then os.replace()s it onto *config_path*, so an
+    interrupted write never leaves a truncated config behind.
+    """
+    tmp_path = f"{config_path}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(config, f, indent=2)
+            f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, config_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
 def apply_weights_to_config(
-    config_path: str,
-    category: str,
+    cat_cfg: dict,
     col_to_weight: dict,
     col_names: list[str],
 ) -> None:
-    """Write optimized weights back to scoring_config.json.
+    """Write optimized weights into a category's config block, in place.
 
     Maps DB column names back to config weight keys (with _percent suffix),
-    rounds to integers summing to 100.
+    rounds to integers summing to 100. The caller saves the config.
     """
     # Column → config key mapping (inverse of METRIC_COLUMNS)
     col_to_config_key = {col: key for col, key in METRIC_COLUMNS.items()}
 
-    with open(config_path, 'r') as f:
-        config = json.load(f)
+    weights_block = cat_cfg.setdefault('weights', {})
 
-    for cat in config.get('categories', []):
-        if cat.get('name') != category:
-            continue
-
-        weights_block = cat.setdefault('weights', {})
-
-        # Convert optimized decimals to percentages
-        new_percents = {}
-        for col in col_names:
-            config_key = col_to_config_key.get(col)
-            if config_key:
-                percent_key = f'{config_key}_percent'
-                new_percents[percent_key] = col_to_weight.get(col, 0.0) * 100.0
-
-        # Round to integers while keeping sum = 100
-        # Keep existing _percent keys not in our optimization set unchanged
-        existing_other = {k: v for k, v in weights_block.items()
-                          if k.endswith('_percent') and k not in new_percents}
-        other_total = sum(existing_other.values())
-        budget = 100 - other_total
-
-        # Scale new_percents to fit in budget
-        total_new = sum(new_percents.values())
-        if total_new > 0:
-            scaled = {k: v / total_new * budget for k, v in new_percents.items()}
-        else:
-            scaled = new_percents
-
-        # Round with remainder fix
-        rounded = {k: int(v) for k, v in scaled.items()}
-        remainder = budget - sum(rounded.values())
-        if remainder != 0 and rounded:
-            # Add remainder to the largest weight
-            largest = max(rounded, key=lambda k: scaled[k])
-            rounded[largest] += remainder
-
-        # Update config
-        weights_block.update(rounded)
-        break
+    # Convert optimized decimals to percentages
+    new_percents = {}
+    for col in col_names:
+        config_key = col_to_config_key.get(col)
+        if config_key:
+            percent_key = f'{config_key}_percent'
+            new_percents[percent_key] = col_to_weight.get(col, 0.0) * 100.0
+
+    # Round to integers while keeping sum = 100
+    # Keep existing _percent keys not in our optimization set unchanged
+    existing_other = {k: v for k, v in weights_block.items()
+                      if k.endswith('_percent') and k not in new_percents}
+    other_total = sum(existing_other.values())
+    budget = 100 - other_total
+
+    # Scale new_percents to fit in budget
+    total_new = sum(new_percents.values())
+    if total_new > 0:
+        scaled = {k: v / total_new * budget for k, v in new_percents.items()}
     else:
-        logger.warning("  Category '%s' not found in scoring_config.json -- skipping apply.", category)
-        return
+        scaled = new_percents
 
-    with open(config_path, 'w') as f:
-        json.dump(config, f, indent=2)
-        f.write('\n')
+    # Round with remainder fix
+    rounded = {k: int(v) for k, v in scaled.items()}
+    remainder = budget - sum(rounded.values())
+    if remainder != 0 and rounded:
+        # Add remainder to the largest weight
+        largest = max(rounded, key=lambda k: scaled[k])
+        rounded[largest] += remainder
 
-    logger.info("  Updated weights for category '%s' in %s", category, config_path)
+    # Update config
+    weights_block.update(rounded)
 
 
 # ---------------------------------------------------------------------------
@@ -1279,6 +1647,8 @@ def parse_args():
                         help='Write optimized weights back to scoring_config.json')
     parser.add_argument('--method', choices=['de', 'nelder-mead'], default='de',
                         help='Optimization method: de=differential_evolution (default), nelder-mead=faster')
+    parser.add_argument('--float32', action='store_true',
+                        help='Run weight and modifier optimization in float32 (halves memory traffic)')
     parser.add_argument('--config', default=SCORING_CONFIG_PATH,
                         help=f'Path to scoring_config.json (default: {SCORING_CONFIG_PATH})')
     # AVA tag-based analysis flags
@@ -1303,27 +1673,28 @@ def main():
 
     use_ava_tags = args.ava_tags or args.ava_tags_only
     skip_weights = args.ava_tags_only
+    dtype = np.float32 if args.float32 else np.float64
 
     # -----------------------------------------------------------------------
     # Phase 1: Load data
     # -----------------------------------------------------------------------
     logger.info("Loading AVA annotations...")
-    ava_map = parse_ava_annotations(args.ava_annotations)
-    logger.info("  Loaded %s AVA annotations.", f"{len(ava_map):,}")
+    ava = parse_ava_annotations(args.ava_annotations)
+    logger.info("  Loaded %s AVA annotations.", f"{n_rows(ava):,}")
 
     if use_ava_tags:
-        tagged_count = sum(1 for v in ava_map.values() if v['tags'])
+        tagged_count = int(np.count_nonzero(ava['ava_tag1']))
         logger.info("  AVA entries with semantic tags: %s", f"{tagged_count:,}")
 
     logger.info("Querying Facet database...")
     all_rows = query_facet_db(args.db, include_extra=use_ava_tags)
-    logger.info("  Found %s scored photos in DB.", f"{len(all_rows):,}")
+    logger.info("  Found %s scored photos in DB.", f"{n_rows(all_rows):,}")
 
-    matched = match_photos(all_rows, ava_map)
-    report_match_summary(all_rows, matched, ava_map)
+    matched = match_photos(all_rows, ava)
+    report_match_summary(all_rows, matched, ava)
 
-    if len(matched) < MIN_PHOTOS_FOR_BASELINE:
-        logger.error("Only %d photos matched AVA. Need at least %d.", len(matched), MIN_PHOTOS_FOR_BASELINE)
+    if n_rows(matched) < MIN_PHOTOS_FOR_BASELINE:
+        logger.error("Only %d photos matched AVA. Need at least %d.", n_rows(matched), MIN_PHOTOS_FOR_BASELINE)
         logger.error("       Score AVA images with: python facet.py /path/to/ava_images/")
         sys.exit(1)
 
@@ -1336,9 +1707,7 @@ def main():
     # Phase 3: Weight optimization (unless --ava-tags-only)
     # -----------------------------------------------------------------------
     if not skip_weights:
-        by_cat = defaultdict(list)
-        for r in matched:
-            by_cat[r.get('category') or 'default'].append(r)
+        by_cat = split_by(matched, 'category')
 
         # Determine which categories to optimize
         if args.categories:
@@ -1347,7 +1716,7 @@ def main():
             # Always include combined optimization; add per-category if enough data
             target_cats = ['_all_']
             for cat, rows in by_cat.items():
-                if len(rows) >= MIN_PHOTOS_FOR_CATEGORY:
+                if n_rows(rows) >= MIN_PHOTOS_FOR_CATEGORY:
                     target_cats.append(cat)
 
         method = 'de' if args.method == 'de' else 'nelder-mead'
@@ -1356,6 +1725,8 @@ def main():
         logger.info("WEIGHT OPTIMIZATION")
         logger.info("=" * 60)
         logger.info("  Method: %s", args.method)
+        if args.float32:
+            logger.info("  Precision: float32")
 
         optimization_results = []
 
@@ -1365,17 +1736,18 @@ def main():
                 cat_label = 'default (all photos combined)'
                 cat_key = 'default'
             else:
-                rows = by_cat.get(cat, [])
+                rows = by_cat.get(cat)
                 cat_label = cat
                 cat_key = cat
 
-            if len(rows) < MIN_PHOTOS_FOR_BASELINE:
-                logger.info("  Skipping '%s': only %d photos (need %d)", cat_label, len(rows), MIN_PHOTOS_FOR_BASELINE)
+            n_cat = n_rows(rows) if rows else 0
+            if n_cat < MIN_PHOTOS_FOR_BASELINE:
+                logger.info("  Skipping '%s': only %d photos (need %d)", cat_label, n_cat, MIN_PHOTOS_FOR_BASELINE)
                 continue
 
-            logger.info("  Optimizing '%s' (%s photos)...", cat_label, f"{len(rows):,}")
+            logger.info("  Optimizing '%s' (%s photos)...", cat_label, f"{n_cat:,}")
             try:
-                info, col_to_weight = optimize_weights(rows, cat_key, method=method)
+                info, col_to_weight = optimize_weights(rows, cat_key, method=method, dtype=dtype)
             except Exception as e:
                 logger.error("  ERROR optimizing '%s': %s", cat_label, e)
                 continue
@@ -1383,51 +1755,69 @@ def main():
             print_optimization_result(info, col_to_weight)
             optimization_results.append((cat_key, info, col_to_weight))
 
-            # Log to DB
-            try:
-                log_run_to_db(args.db, info, col_to_weight, current_config_weights={})
-            except Exception as e:
-                logger.warning("  Could not log run to DB: %s", e)
+        if optimization_results:
+            # One connection for the run log and the pre-apply snapshots
+            from db import get_connection
+            with get_connection(args.db, row_factory=False) as db_conn:
+                try:
+                    log_runs_to_db(db_conn, [(info, col_to_weight) for _, info, col_to_weight in optimization_results])
+                    db_conn.commit()
+                except Exception as e:
+                    db_conn.rollback()
+                    logger.warning("  Could not log runs to DB: %s", e)
 
-        # Apply weights if requested
-        if args.apply and optimization_results:
-            logger.info("=" * 60)
-            logger.info("APPLYING OPTIMIZED WEIGHTS")
-            logger.info("=" * 60)
+                # Apply weights if requested
+                if args.apply:
+                    logger.info("=" * 60)
+                    logger.info("APPLYING OPTIMIZED WEIGHTS")
+                    logger.info("=" * 60)
 
-            if not os.path.exists(args.config):
-                logger.error("  scoring_config.json not found at %s", args.config)
-                sys.exit(1)
+                    if not os.path.exists(args.config):
+                        logger.error("  scoring_config.json not found at %s", args.config)
+                        sys.exit(1)
 
-            for cat_key, info, col_to_weight in optimization_results:
-                # Snapshot existing weights first
-                try:
+                    # One read, in-memory updates, one atomic write
                     with open(args.config, 'r') as f:
                         config = json.load(f)
-                    for cat in config.get('categories', []):
-                        if cat.get('name') == cat_key:
-                            snapshot_config_to_db(args.db, cat_key, cat.get('weights', {}), info['srcc_before'])
-                            break
-                except Exception as e:
-                    logger.warning("  Could not snapshot config: %s", e)
+                    cat_configs = categories_by_name(config)
 
-                # Apply
-                try:
-                    apply_weights_to_config(args.config, cat_key, col_to_weight, info['col_names'])
-                except Exception as e:
-                    logger.error("  ERROR applying weights for '%s': %s", cat_key, e)
+                    applied = []
+                    for cat_key, info, col_to_weight in optimization_results:
+                        cat_cfg = cat_configs.get(cat_key)
+                        if cat_cfg is None:
+                            logger.warning("  Category '%s' not found in scoring_config.json -- skipping apply.", cat_key)
+                            continue
 
-            logger.info("  Done. Run the following to recompute all aggregate scores:")
-            logger.info("    python facet.py --recompute-average")
-        elif not args.apply and optimization_results:
-            logger.info("  Tip: rerun with --apply to write these weights to scoring_config.json")
+                        # Snapshot existing weights first
+                        try:
+                            snapshot_config_to_db(db_conn, cat_key, cat_cfg.get('weights', {}), info['srcc_before'])
+                        except Exception as e:
+                            logger.warning("  Could not snapshot config: %s", e)
+
+                        # Apply
+                        try:
+                            apply_weights_to_config(cat_cfg, col_to_weight, info['col_names'])
+                            applied.append(cat_key)
+                        except Exception as e:
+                            logger.error("  ERROR applying weights for '%s': %s", cat_key, e)
+
+                    if applied:
+                        save_config(args.config, config)
+                        for cat_key in applied:
+                            logger.info("  Updated weights for category '%s' in %s", cat_key, args.config)
+                    db_conn.commit()
+
+                    logger.info("  Done. Run the following to recompute all aggregate scores:")
+                    logger.info("    python facet.py --recompute-average")
+                else:
+                    logger.info("  Tip: rerun with --apply to write these weights to scoring_config.json")
 
     # -----------------------------------------------------------------------
     # Phase 5: AVA tag-based analysis (if --ava-tags or --ava-tags-only)
     # -----------------------------------------------------------------------
     if use_ava_tags:
         run_ava_tag_analysis(matched, args.config, args.apply_filters,
-                             apply_modifiers=args.apply)
+                             apply_modifiers=args.apply, dtype=dtype)
 
 
 if __name__ == '__main__':
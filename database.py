@@ -29,6 +29,7 @@ logger = logging.getLogger("facet.database")
 
 from db import (
     DEFAULT_DB_PATH,
+    get_connection,
     init_database,
     get_schema_info,
     get_user_version,
@@ -50,37 +51,55 @@ from db import (
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'scoring_config.json')
 
+# ((path, mtime_ns, size), config) of the last scoring_config.json read or written
+_config_cache = None
+
+
+def _config_key():
+    st = os.stat(CONFIG_PATH)
+    return CONFIG_PATH, st.st_mtime_ns, st.st_size
+
 
 def _load_config():
-    """Load scoring_config.json."""
+    """Load scoring_config.json.
+
+    Cached on the file's mtime and size, so repeated loads skip the JSON parse
+    until the file changes. The dict is shared: only mutate it to save it.
+    """
+    global _config_cache
+    key = _config_key()
+    if _config_cache is not None and _config_cache[0] == key:
+        return _config_cache[1]
     with open(CONFIG_PATH) as f:
-        return json.load(f)
+        config = json.load(f)
+    _config_cache = (key, config)
+    return config
 
 
 def _save_config(config):
     """Write scoring_config.json (creates timestamped backup first)."""
+    global _config_cache
     backup_path = f"{CONFIG_PATH}.backup.{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     shutil.copy2(CONFIG_PATH, backup_path)
     logger.info("Backup saved to %s", backup_path)
     with open(CONFIG_PATH, 'w') as f:
         json.dump(config, f, indent=2)
+    _config_cache = (_config_key(), config)
     logger.info("Config saved to %s", CONFIG_PATH)
 
 
 def add_user(username, role, display_name=None):
     """Add a user to scoring_config.json with a hashed password."""
     import getpass
-    import hashlib
+
+    from api.auth import hash_password
 
     if role not in ('user', 'admin', 'superadmin'):
         logger.error("Role must be 'user', 'admin', or 'superadmin' (got '%s')", role)
         return
 
     config = _load_config()
-    if 'users' not in config:
-        config['users'] = {'shared_directories': []}
-
-    if username in config['users'] and isinstance(config['users'][username], dict):
+    if isinstance(config.get('users', {}).get(username), dict):
         logger.error("User '%s' already exists. Remove manually from config to re-add.", username)
         return
 
@@ -90,12 +109,10 @@ def add_user(username, role, display_name=None):
         logger.error("Passwords do not match.")
         return
 
-    # Hash with PBKDF2
-    salt = os.urandom(16)
-    dk = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100000)
-    password_hash = f"{salt.hex()}:{dk.hex()}"
+    # Argon2id, as at login
+    password_hash = hash_password(password)
 
-    config['users'][username] = {
+    config.setdefault('users', {'shared_directories': []})[username] = {
         'password_hash': password_hash,
         'display_name': display_name or username,
         'role': role,
@@ -109,42 +126,37 @@ def add_user(username, role, display_name=None):
 
 def migrate_user_preferences(username, db_path=DEFAULT_DB_PATH):
     """Copy non-zero ratings from photos table to user_preferences for a user."""
-    import sqlite3
-
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-
-    # Check if user_preferences table exists
-    tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
-    if 'user_preferences' not in tables:
-        logger.error("user_preferences table not found. Run 'python database.py' to initialize schema first.")
-        conn.close()
-        return
-
-    # Count existing photos with ratings
-    row = conn.execute("""
-        SELECT COUNT(*) FROM photos
-        WHERE star_rating > 0 OR is_favorite = 1 OR is_rejected = 1
-    """).fetchone()
-    count = row[0] if row else 0
-
-    if count == 0:
-        logger.info("No ratings to migrate.")
-        conn.close()
-        return
-
-    logger.info("Migrating %d photo rating(s) to user_preferences for user '%s'...", count, username)
-
-    conn.execute("""
-        INSERT OR IGNORE INTO user_preferences (user_id, photo_path, star_rating, is_favorite, is_rejected)
-        SELECT ?, path, COALESCE(star_rating, 0), COALESCE(is_favorite, 0), COALESCE(is_rejected, 0)
-        FROM photos
-        WHERE star_rating > 0 OR is_favorite = 1 OR is_rejected = 1
-    """, (username,))
-    row = conn.execute("SELECT changes()").fetchone()
-    migrated = row[0] if row else 0
-    conn.commit()
-    conn.close()
+    # Standard connection PRAGMAs (WAL, synchronous=NORMAL, temp_store=MEMORY):
+    # the bulk INSERT appends to the WAL instead of fsyncing a rollback journal
+    with get_connection(db_path) as conn:
+        # Check if user_preferences table exists
+        tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()]
+        if 'user_preferences' not in tables:
+            logger.error("user_preferences table not found. Run 'python database.py' to initialize schema first.")
+            return
+
+        # Count existing photos with ratings
+        row = conn.execute("""
+            SELECT COUNT(*) FROM photos
+            WHERE star_rating > 0 OR is_favorite = 1 OR is_rejected = 1
+        """).fetchone()
+        count = row[0] if row else 0
+
+        if count == 0:
+            logger.info("No ratings to migrate.")
+            return
+
+        logger.info("Migrating %d photo rating(s) to user_preferences for user '%s'...", count, username)
+
+        with conn:
+            conn.execute("""
+                INSERT OR IGNORE INTO user_preferences (user_id, photo_path, star_rating, is_favorite, is_rejected)
+                SELECT ?, path, COALESCE(star_rating, 0), COALESCE(is_favorite, 0), COALESCE(is_rejected, 0)
+                FROM photos
+                WHERE star_rating > 0 OR is_favorite = 1 OR is_rejected = 1
+            """, (username,))
+            row = conn.execute("SELECT changes()").fetchone()
+            migrated = row[0] if row else 0
 
     logger.info("Done. %d preference(s) migrated for '%s'.", migrated, username)
 
@@ -9,8 +9,10 @@ import logging
 import os
 import shutil
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from io import BytesIO
+from itertools import repeat
 
 logger = logging.getLogger("facet.db_maintenance")
 
@@ -20,6 +22,15 @@ _PATH_INACCESSIBLE = 'inaccessible'
 
 _MIN_BACKUPS_TO_KEEP = 1
 
+# Thumbnails handed to a resize worker per round trip
+_RESIZE_CHUNKSIZE = 32
+
+# Incremental BLOB I/O (Connection.blobopen) arrived in Python 3.11
+_HAS_BLOBOPEN = hasattr(sqlite3.Connection, 'blobopen')
+
+# Free pages an incremental viewer-DB sync hands back to the filesystem per run
+_INCREMENTAL_VACUUM_PAGES = 1024
+
 
 def _classify_missing_path(path):
     """Classify a stored photo path as present, genuinely deleted, or merely
@@ -408,7 +419,164 @@ def cleanup_orphaned_persons(db_path='photo_scores_pro.db', verbose=True):
     return count
 
 
-def _reinsert_faces(dest_conn, face_insert_cols, face_resync_paths, batch_size):
+def _resize_one(thumb_bytes, max_dim):
+    """Downsize one JPEG thumbnail so its longest side is at most *max_dim*.
+
+    Module-level so it can run in a ProcessPoolExecutor worker. Returns the
+    re-encoded JPEG bytes, None if the thumbnail already fits, or ``b''`` if
+    it cannot be decoded.
+    """
+    from PIL import Image
+
+    try:
+        img = Image.open(BytesIO(thumb_bytes))
+        width, height = img.size
+        if max(width, height) <= max_dim:
+            return None
+        # Let libjpeg decode straight at a reduced DCT scale (1/2, 1/4, 1/8)
+        # no smaller than the target; draft() needs the aspect-correct target,
+        # as it only scales when both sides allow it. A no-op for non-JPEGs.
+        longest = max(width, height)
+        img.draft(None, (width * max_dim // longest, height * max_dim // longest))
+        # Whole-factor part of the downscale (640 -> 320 is exactly 2x) as a
+        # block-average reduce(), which is several times cheaper than LANCZOS
+        # over the full image; LANCZOS then only finishes any fractional rest
+        factor = max(img.size) // max_dim
+        if factor >= 2:
+            img = img.reduce(factor)
+        if max(img.size) > max_dim:
+            img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+        buf = BytesIO()
+        img.save(buf, format='JPEG', quality=80)
+        return buf.getvalue()
+    except Exception:
+        return b''
+
+
+def _thumbnail_fits(fp, max_dim):
+    """True if the thumbnail's longest side is at most *max_dim*, None if unreadable.
+
+    Image.open only parses the JPEG header, so this costs microseconds and
+    reads just the first few hundred bytes of *fp*.
+    """
+    from PIL import Image
+
+    try:
+        return max(Image.open(fp).size) <= max_dim
+    except Exception:
+        return None
+
+
+def _iter_thumbnails(conn, table, column, rowids):
+    """Yield a readable file object over *column* of each row in *rowids*, in order.
+
+    With incremental BLOB I/O the header probe reads straight from the
+    database pages, so thumbnails that already fit are never copied into
+    Python; older interpreters fall back to one SELECT for the batch.
+    """
+    if _HAS_BLOBOPEN:
+        for rowid in rowids:
+            with conn.blobopen(table, column, rowid, readonly=True) as blob:
+                yield blob
+        return
+    placeholders = ','.join('?' * len(rowids))
+    stored = dict(conn.execute(
+        f"SELECT rowid, {column} FROM {table} WHERE rowid IN ({placeholders})", rowids
+    ).fetchall())
+    for rowid in rowids:
+        yield BytesIO(stored[rowid])
+
+
+def _submit_resizes(executor, sources, max_dim):
+    """Start :func:`_resize_one` over the thumbnails in *sources* on the worker pool.
+
+    Thumbnails that already fit (the common case for face crops) or whose
+    header is unreadable are settled here from their header alone, so only
+    oversize ones are read in full and shipped to a worker to be decoded.
+    Returns the partly settled results, the oversize indices and the lazy
+    iterator of their resized bytes.
+    """
+    results = []
+    oversize = []
+    payloads = []
+    for i, fp in enumerate(sources):
+        fits = _thumbnail_fits(fp, max_dim)
+        results.append(b'' if fits is None else None)
+        if fits is False:
+            fp.seek(0)
+            payloads.append(fp.read())
+            oversize.append(i)
+    resized = executor.map(_resize_one, payloads, repeat(max_dim), chunksize=_RESIZE_CHUNKSIZE)
+    return results, oversize, resized
+
+
+def _resize_batches(executor, batches, max_dim):
+    """Yield ``(keys, results)`` for each ``(keys, sources)`` in *batches*.
+
+    *sources* yields readable file objects and results line up with them
+    (see :func:`_resize_one`). The next batch is fetched, probed and submitted
+    before the current one's results are awaited, so the SQL reads overlap the
+    workers' decoding with at most two batches in flight.
+    """
+    pending = None
+    for keys, sources in batches:
+        submitted = (keys, *_submit_resizes(executor, sources, max_dim))
+        if pending is not None:
+            yield _settle_resizes(*pending)
+        pending = submitted
+    if pending is not None:
+        yield _settle_resizes(*pending)
+
+
+def _settle_resizes(keys, results, oversize, resized):
+    for i, data in zip(oversize, resized):
+        results[i] = data
+    return keys, results
+
+
+def _keyset_thumbnails(conn, table, column, batch_size, where=''):
+    """Yield ``(rowids, sources)`` batches over the non-NULL *column* BLOBs of *table*.
+
+    Keyset paging on rowid: each batch seeks past the last row seen, and is
+    its own short query rather than one cursor left open while the caller
+    writes the table between batches.
+    """
+    last_rowid = 0
+    while True:
+        rowids = [r[0] for r in conn.execute(
+            f"SELECT rowid FROM {table} WHERE {column} IS NOT NULL{where} "
+            f"AND rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_size)
+        )]
+        if not rowids:
+            return
+        last_rowid = rowids[-1]
+        yield rowids, _iter_thumbnails(conn, table, column, rowids)
+
+
+# Tables the incremental sync reads or writes. _schema_columns introspects only
+# these: pragma_table_info on a virtual table such as photos_vec needs its module
+# (vec0), which the export connection never loads.
+_SYNCED_TABLES = ('photos', 'faces', 'persons', 'photo_tags', 'user_preferences', 'stats_cache')
+
+
+def _schema_columns(conn, schema):
+    """Map each synced table of *schema* ('main' or an attached name) to its
+    column names in declaration order, from a single query."""
+    columns = {}
+    placeholders = ', '.join('?' * len(_SYNCED_TABLES))
+    for table, column in conn.execute(
+        f"SELECT m.name, p.name FROM {schema}.sqlite_master AS m, "
+        f"pragma_table_info(m.name, '{schema}') AS p "
+        f"WHERE m.type = 'table' AND m.name IN ({placeholders}) ORDER BY m.name, p.cid",
+        _SYNCED_TABLES,
+    ):
+        columns.setdefault(table, []).append(column)
+    return columns
+
+
+def _reinsert_faces(dest_conn, face_insert_cols):
+    """Replace main.faces rows of the photos in temp.face_resync_paths with src's."""
     face_select_exprs = ', '.join(
         'zeroblob(0)' if c == 'embedding'
         else 'NULL' if c == 'landmark_2d_106'
@@ -417,49 +585,31 @@ def _reinsert_faces(dest_conn, face_insert_cols, face_resync_paths, batch_size):
     )
     face_col_list = ', '.join(face_insert_cols)
 
-    for i in range(0, len(face_resync_paths), batch_size):
-        batch = face_resync_paths[i:i + batch_size]
-        placeholders = ','.join('?' * len(batch))
-        dest_conn.execute(
-            f"DELETE FROM main.faces WHERE photo_path IN ({placeholders})", batch
-        )
-        dest_conn.execute(
-            f"INSERT OR IGNORE INTO main.faces ({face_col_list}) "
-            f"SELECT {face_select_exprs} FROM src.faces WHERE photo_path IN ({placeholders})",
-            batch
-        )
-    dest_conn.commit()
-
+    dest_conn.execute(
+        "DELETE FROM main.faces WHERE photo_path IN (SELECT path FROM temp.face_resync_paths)"
+    )
+    dest_conn.execute(
+        f"INSERT OR IGNORE INTO main.faces ({face_col_list}) "
+        f"SELECT {face_select_exprs} FROM src.faces "
+        f"WHERE photo_path IN (SELECT path FROM temp.face_resync_paths)"
+    )
 
-def _downsize_face_thumbnails(dest_conn, face_resync_paths, thumbnail_size, batch_size):
-    from PIL import Image
 
+def _downsize_face_thumbnails(dest_conn, executor, thumbnail_size, batch_size):
+    """Downsize the face thumbnails of the photos in temp.face_resync_paths."""
     face_resized = 0
-    for i in range(0, len(face_resync_paths), batch_size):
-        batch = face_resync_paths[i:i + batch_size]
-        placeholders = ','.join('?' * len(batch))
-        rows = dest_conn.execute(
-            f"SELECT id, face_thumbnail FROM main.faces "
-            f"WHERE photo_path IN ({placeholders}) AND face_thumbnail IS NOT NULL",
-            batch
-        ).fetchall()
-        updates = []
-        for face_id, thumb_bytes in rows:
-            try:
-                img = Image.open(BytesIO(thumb_bytes))
-                if max(img.size) > thumbnail_size:
-                    img.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
-                    buf = BytesIO()
-                    img.save(buf, format='JPEG', quality=80)
-                    updates.append((buf.getvalue(), face_id))
-                    face_resized += 1
-            except Exception:
-                pass
+    update_cur = dest_conn.cursor()
+    batches = _keyset_thumbnails(
+        dest_conn, 'faces', 'face_thumbnail', batch_size,
+        where=" AND photo_path IN (SELECT path FROM temp.face_resync_paths)"
+    )
+    for face_ids, resized in _resize_batches(executor, batches, thumbnail_size):
+        updates = [(data, face_id) for face_id, data in zip(face_ids, resized) if data]
+        face_resized += len(updates)
         if updates:
-            dest_conn.executemany(
+            update_cur.executemany(
                 "UPDATE main.faces SET face_thumbnail = ? WHERE id = ?", updates
             )
-            dest_conn.commit()
     return face_resized
 
 
@@ -471,8 +621,6 @@ def _incremental_update_viewer_db(source_db, output_path, thumbnail_size, verbos
     Returns:
         Tuple of (source_size, output_size) in bytes
     """
-    from PIL import Image
-
     source_size = os.path.getsize(source_db)
     if verbose:
         logger.info("  Output exists — running incremental update...")
@@ -481,33 +629,47 @@ def _incremental_update_viewer_db(source_db, output_path, thumbnail_size, verbos
     src_escaped = source_db.replace("'", "''")
     dest_conn = sqlite3.connect(output_path)
     dest_conn.execute("PRAGMA foreign_keys = ON")
+    # The whole sync runs as one transaction, committed before DETACH: a
+    # single journal sync instead of one per phase and thumbnail batch.
+    # Durability settings stay at their defaults here since, unlike a fresh
+    # export, this file carries viewer-side ratings and caches.
+    dest_conn.execute("PRAGMA temp_store = MEMORY")
     dest_conn.execute(f"ATTACH DATABASE '{src_escaped}' AS src")
 
+    # Both schemas' tables and columns, introspected once up front
+    src_columns = _schema_columns(dest_conn, 'src')
+    dest_columns = _schema_columns(dest_conn, 'main')
+
     # --- Delta detection ---
-    new_paths = [r[0] for r in dest_conn.execute(
-        "SELECT path FROM src.photos EXCEPT SELECT path FROM main.photos"
-    ).fetchall()]
-    deleted_paths = [r[0] for r in dest_conn.execute(
-        "SELECT path FROM main.photos EXCEPT SELECT path FROM src.photos"
-    ).fetchall()]
+    # New paths go to a temp table so later steps join against it in one
+    # statement each instead of re-running IN (?, ?, ...) per batch of paths
+    dest_conn.execute("CREATE TEMP TABLE new_paths (path TEXT PRIMARY KEY)")
+    dest_conn.execute(
+        "INSERT INTO temp.new_paths SELECT path FROM src.photos EXCEPT SELECT path FROM main.photos"
+    )
+    new_count = dest_conn.execute("SELECT COUNT(*) FROM temp.new_paths").fetchone()[0]
+    dest_conn.execute("CREATE TEMP TABLE deleted_paths (path TEXT PRIMARY KEY)")
+    dest_conn.execute(
+        "INSERT INTO temp.deleted_paths SELECT path FROM main.photos EXCEPT SELECT path FROM src.photos"
+    )
+    deleted_count = dest_conn.execute("SELECT COUNT(*) FROM temp.deleted_paths").fetchone()[0]
 
     if verbose:
         existing_count = dest_conn.execute("SELECT COUNT(*) FROM main.photos").fetchone()[0]
-        logger.info("  Photos: %d existing, %d new, %d deleted", existing_count, len(new_paths), len(deleted_paths))
+        logger.info("  Photos: %d existing, %d new, %d deleted", existing_count, new_count, deleted_count)
 
     # --- Delete removed photos (faces cascade via FK ON DELETE CASCADE) ---
-    if deleted_paths:
-        dest_conn.executemany(
-            "DELETE FROM main.photos WHERE path = ?", [(p,) for p in deleted_paths]
+    if deleted_count:
+        dest_conn.execute(
+            "DELETE FROM main.photos WHERE path IN (SELECT path FROM temp.deleted_paths)"
         )
-        dest_conn.commit()
         if verbose:
-            logger.info("  Removed %d deleted photos", len(deleted_paths))
+            logger.info("  Removed %d deleted photos", deleted_count)
 
     # --- Update metadata for existing photos ---
     # Use intersection of src/dest columns to handle any schema skew gracefully
-    src_photo_cols = [r[1] for r in dest_conn.execute("PRAGMA src.table_info(photos)").fetchall()]
-    dest_photo_col_set = {r[1] for r in dest_conn.execute("PRAGMA main.table_info(photos)").fetchall()}
+    src_photo_cols = src_columns['photos']
+    dest_photo_col_set = set(dest_columns['photos'])
     _STRIP_COLS = {'clip_embedding', 'histogram_data', 'raw_sharpness_variance', 'caption_embedding', 'thumbnail', 'path'}
     # On-demand caches (VLM critique, caption) may be generated on the viewer
     # deployment itself, while the source scan DB keeps them NULL. COALESCE onto
@@ -517,140 +679,138 @@ def _incremental_update_viewer_db(source_db, output_path, thumbnail_size, verbos
     _RATING_COLS = {'star_rating', 'is_favorite', 'is_rejected'}
     update_cols = [c for c in src_photo_cols if c not in _STRIP_COLS and c in dest_photo_col_set]
 
-    def _photo_set_expr(col):
-        """SET expression that propagates source metadata while preserving
-        viewer-side edits. Cache columns keep the destination value when source
-        is NULL. A rating column keeps a *set* viewer value (non-NULL and
-        non-zero: star > 0, favorite/rejected = 1), else takes the source value —
-        so the first export carries the scan rating, later viewer ratings survive
-        a re-export, and scan ratings still reach a never-rated photo. A rating
-        cleared to 0 on the viewer is indistinguishable from unrated and cannot
-        be preserved against a non-zero source."""
-        src_val = f"(SELECT {col} FROM src.photos WHERE src.photos.path = main.photos.path)"
+    def _photo_src_expr(col):
+        """Value expression (over src row ``s``) that propagates source metadata
+        while preserving viewer-side edits. Cache columns keep the destination
+        value when source is NULL. A rating column keeps a *set* viewer value
+        (non-NULL and non-zero: star > 0, favorite/rejected = 1), else takes the
+        source value — so the first export carries the scan rating, later viewer
+        ratings survive a re-export, and scan ratings still reach a never-rated
+        photo. A rating cleared to 0 on the viewer is indistinguishable from
+        unrated and cannot be preserved against a non-zero source."""
         if col in _CACHE_COLS:
-            return f"{col} = COALESCE({src_val}, {col})"
+            return f"COALESCE(s.{col}, main.photos.{col})"
         if col in _RATING_COLS:
-            return (f"{col} = CASE WHEN main.photos.{col} IS NOT NULL AND main.photos.{col} != 0 "
-                    f"THEN main.photos.{col} ELSE {src_val} END")
-        return f"{col} = {src_val}"
+            return (f"CASE WHEN main.photos.{col} IS NOT NULL AND main.photos.{col} != 0 "
+                    f"THEN main.photos.{col} ELSE s.{col} END")
+        return f"s.{col}"
 
     if update_cols:
-        set_clause = ', '.join(_photo_set_expr(c) for c in update_cols)
-        dest_conn.execute(f"UPDATE main.photos SET {set_clause}")
-        dest_conn.commit()
+        # One row-value assignment: a single src.photos lookup per photo rather
+        # than a correlated subquery per column. Every remaining main row has a
+        # src match (removed photos were deleted above), so the subquery never
+        # comes back empty and nulls out the preserved columns.
+        target = ', '.join(update_cols)
+        values = ', '.join(_photo_src_expr(c) for c in update_cols)
+        dest_conn.execute(
+            f"UPDATE main.photos SET ({target}) = "
+            f"(SELECT {values} FROM src.photos AS s WHERE s.path = main.photos.path)"
+        )
         if verbose:
             logger.info("  Updated metadata for existing photos")
 
+    dest_tables = set(dest_columns)
+    src_tables = set(src_columns)
+
     # --- Insert new photos with stripped BLOBs and NULL thumbnail ---
     batch_size = 200
-    if new_paths:
-        common_photo_cols = [c for c in src_photo_cols if c in dest_photo_col_set]
-        _BLOB_STRIP = {'clip_embedding', 'histogram_data', 'raw_sharpness_variance', 'caption_embedding', 'thumbnail'}
-        select_exprs = ', '.join(
-            f"NULL AS {c}" if c in _BLOB_STRIP else c
-            for c in common_photo_cols
-        )
-        col_list = ', '.join(common_photo_cols)
+    # Thumbnail decode/resize/encode is CPU-bound PIL work; fan it out to one
+    # process per core (created on first use) while this thread does the SQL
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        if new_count:
+            common_photo_cols = [c for c in src_photo_cols if c in dest_photo_col_set]
+            _BLOB_STRIP = {'clip_embedding', 'histogram_data', 'raw_sharpness_variance', 'caption_embedding', 'thumbnail'}
+            select_exprs = ', '.join(
+                f"NULL AS {c}" if c in _BLOB_STRIP else c
+                for c in common_photo_cols
+            )
+            col_list = ', '.join(common_photo_cols)
 
-        for i in range(0, len(new_paths), batch_size):
-            batch = new_paths[i:i + batch_size]
-            placeholders = ','.join('?' * len(batch))
+            # temp.new_paths is src EXCEPT main, so no row can collide: a plain
+            # INSERT, without OR IGNORE's per-row conflict handling
             dest_conn.execute(
-                f"INSERT OR IGNORE INTO main.photos ({col_list}) "
-                f"SELECT {select_exprs} FROM src.photos WHERE path IN ({placeholders})",
-                batch
+                f"INSERT INTO main.photos ({col_list}) "
+                f"SELECT {select_exprs} FROM src.photos WHERE path IN (SELECT path FROM temp.new_paths)"
             )
-        dest_conn.commit()
-        if verbose:
-            logger.info("  Inserted %d new photos", len(new_paths))
+            if verbose:
+                logger.info("  Inserted %d new photos", new_count)
 
-        # Fetch and downsize thumbnails for new photos from source
-        if verbose:
-            logger.info("  Downsizing thumbnails for new photos to %dpx...", thumbnail_size)
-        processed = 0
-        for i in range(0, len(new_paths), batch_size):
-            batch = new_paths[i:i + batch_size]
-            placeholders = ','.join('?' * len(batch))
-            rows = dest_conn.execute(
-                f"SELECT path, thumbnail FROM src.photos "
-                f"WHERE path IN ({placeholders}) AND thumbnail IS NOT NULL",
-                batch
-            ).fetchall()
-            updates = []
-            for path, thumb_bytes in rows:
-                try:
-                    img = Image.open(BytesIO(thumb_bytes))
-                    if max(img.size) > thumbnail_size:
-                        img.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
-                        buf = BytesIO()
-                        img.save(buf, format='JPEG', quality=80)
-                        updates.append((buf.getvalue(), path))
-                    else:
-                        updates.append((thumb_bytes, path))
-                    processed += 1
-                except Exception:
-                    pass
-            if updates:
-                dest_conn.executemany(
-                    "UPDATE main.photos SET thumbnail = ? WHERE path = ?", updates
+            # Fetch and downsize thumbnails for new photos from source: one query,
+            # streamed in batches (only main.photos is written while it is open)
+            if verbose:
+                logger.info("  Downsizing thumbnails for new photos to %dpx...", thumbnail_size)
+            processed = 0
+            update_cur = dest_conn.cursor()
+            cursor = dest_conn.execute(
+                "SELECT path, thumbnail FROM src.photos "
+                "WHERE path IN (SELECT path FROM temp.new_paths) AND thumbnail IS NOT NULL"
+            )
+            batches = (
+                (rows, [BytesIO(thumb_bytes) for _, thumb_bytes in rows])
+                for rows in iter(lambda: cursor.fetchmany(batch_size), [])
+            )
+            for rows, resized in _resize_batches(executor, batches, thumbnail_size):
+                updates = [
+                    (thumb_bytes if data is None else data, path)
+                    for (path, thumb_bytes), data in zip(rows, resized)
+                    if data != b''
+                ]
+                processed += len(updates)
+                if updates:
+                    update_cur.executemany(
+                        "UPDATE main.photos SET thumbnail = ? WHERE path = ?", updates
+                    )
+            if verbose:
+                logger.info("    Processed %d thumbnails", processed)
+
+        # --- Sync faces ---
+        if 'faces' in dest_tables and 'faces' in src_tables:
+            src_face_cols = src_columns['faces']
+            dest_face_col_set = set(dest_columns['faces'])
+            # Exclude 'id' so AUTOINCREMENT generates new IDs for inserted faces
+            face_insert_cols = [c for c in src_face_cols if c != 'id' and c in dest_face_col_set]
+
+            if face_insert_cols:
+                dest_conn.execute("CREATE TEMP TABLE face_resync_paths (path TEXT PRIMARY KEY)")
+                dest_conn.execute(
+                    "INSERT INTO temp.face_resync_paths SELECT p.path FROM main.photos p WHERE "
+                    "(SELECT COUNT(*) FROM src.faces sf WHERE sf.photo_path = p.path) != "
+                    "(SELECT COUNT(*) FROM main.faces df WHERE df.photo_path = p.path)"
                 )
-                dest_conn.commit()
-        if verbose:
-            logger.info("    Processed %d thumbnails", processed)
-
-    # --- Sync faces ---
-    dest_tables = {r[0] for r in dest_conn.execute(
-        "SELECT name FROM main.sqlite_master WHERE type='table'"
-    ).fetchall()}
-    src_tables = {r[0] for r in dest_conn.execute(
-        "SELECT name FROM src.sqlite_master WHERE type='table'"
-    ).fetchall()}
-
-    if 'faces' in dest_tables and 'faces' in src_tables:
-        src_face_cols = [r[1] for r in dest_conn.execute("PRAGMA src.table_info(faces)").fetchall()]
-        dest_face_col_set = {r[1] for r in dest_conn.execute("PRAGMA main.table_info(faces)").fetchall()}
-        # Exclude 'id' so AUTOINCREMENT generates new IDs for inserted faces
-        face_insert_cols = [c for c in src_face_cols if c != 'id' and c in dest_face_col_set]
-
-        if face_insert_cols:
-            face_resync_paths = [r[0] for r in dest_conn.execute(
-                "SELECT p.path FROM main.photos p WHERE "
-                "(SELECT COUNT(*) FROM src.faces sf WHERE sf.photo_path = p.path) != "
-                "(SELECT COUNT(*) FROM main.faces df WHERE df.photo_path = p.path)"
-            ).fetchall()]
-
-            if face_resync_paths:
-                _reinsert_faces(dest_conn, face_insert_cols, face_resync_paths, batch_size)
-                face_resized = _downsize_face_thumbnails(
-                    dest_conn, face_resync_paths, thumbnail_size, batch_size
+                face_resync_count = dest_conn.execute(
+                    "SELECT COUNT(*) FROM temp.face_resync_paths"
+                ).fetchone()[0]
+
+                if face_resync_count:
+                    _reinsert_faces(dest_conn, face_insert_cols)
+                    face_resized = _downsize_face_thumbnails(dest_conn, executor, thumbnail_size, batch_size)
+                    if verbose:
+                        logger.info("  Resynced faces for %d photos, downsized %d face thumbnails",
+                                    face_resync_count, face_resized)
+
+            # Refresh mutable per-face signals for existing faces (re-clustering,
+            # recomputed blink/smile) without a full face re-insert. eyes_open_score
+            # and smile_score drive the viewer's face-signal badges, so they must
+            # propagate on every incremental export, not just person_id.
+            _FACE_SYNC_COLS = ['person_id', 'eyes_open_score', 'smile_score']
+            face_sync_cols = [c for c in _FACE_SYNC_COLS if c in src_face_cols and c in dest_face_col_set]
+            if face_sync_cols:
+                # One row-value assignment, so each face costs a single probe of
+                # src.faces' UNIQUE(photo_path, face_index) index instead of one
+                # correlated lookup per synced column
+                dest_conn.execute(
+                    f"UPDATE main.faces SET ({', '.join(face_sync_cols)}) = "
+                    f"(SELECT {', '.join('sf.' + c for c in face_sync_cols)} FROM src.faces AS sf "
+                    f"WHERE sf.photo_path = main.faces.photo_path "
+                    f"AND sf.face_index = main.faces.face_index)"
                 )
                 if verbose:
-                    logger.info("  Resynced faces for %d photos, downsized %d face thumbnails",
-                                len(face_resync_paths), face_resized)
-
-        # Refresh mutable per-face signals for existing faces (re-clustering,
-        # recomputed blink/smile) without a full face re-insert. eyes_open_score
-        # and smile_score drive the viewer's face-signal badges, so they must
-        # propagate on every incremental export, not just person_id.
-        _FACE_SYNC_COLS = ['person_id', 'eyes_open_score', 'smile_score']
-        face_sync_cols = [c for c in _FACE_SYNC_COLS if c in src_face_cols and c in dest_face_col_set]
-        if face_sync_cols:
-            face_set_clause = ', '.join(
-                f"{c} = (SELECT sf.{c} FROM src.faces AS sf "
-                f"WHERE sf.photo_path = main.faces.photo_path "
-                f"AND sf.face_index = main.faces.face_index)"
-                for c in face_sync_cols
-            )
-            dest_conn.execute(f"UPDATE main.faces SET {face_set_clause}")
-            dest_conn.commit()
-            if verbose:
-                logger.info("  Updated person assignments and face signals for existing faces")
+                    logger.info("  Updated person assignments and face signals for existing faces")
 
     # --- Sync persons (full replace — small table) ---
     if 'persons' in dest_tables and 'persons' in src_tables:
         dest_conn.execute("DELETE FROM main.persons")
         dest_conn.execute("INSERT INTO main.persons SELECT * FROM src.persons")
-        dest_conn.commit()
         if verbose:
             count = dest_conn.execute("SELECT COUNT(*) FROM main.persons").fetchone()[0]
             logger.info("  Synced %d persons", count)
@@ -659,7 +819,6 @@ def _incremental_update_viewer_db(source_db, output_path, thumbnail_size, verbos
     if 'photo_tags' in dest_tables and 'photo_tags' in src_tables:
         dest_conn.execute("DELETE FROM main.photo_tags")
         dest_conn.execute("INSERT INTO main.photo_tags SELECT * FROM src.photo_tags")
-        dest_conn.commit()
         if verbose:
             count = dest_conn.execute("SELECT COUNT(*) FROM main.photo_tags").fetchone()[0]
             logger.info("  Synced %d photo_tags", count)
@@ -670,8 +829,8 @@ def _incremental_update_viewer_db(source_db, output_path, thumbnail_size, verbos
     # (user, photo) pairs the viewer has not rated. Rows for deleted photos cascade
     # out with the photos delete above (FK ON DELETE CASCADE, foreign_keys=ON).
     if 'user_preferences' in dest_tables and 'user_preferences' in src_tables:
-        src_pref_cols = [r[1] for r in dest_conn.execute("PRAGMA src.table_info(user_preferences)").fetchall()]
-        dest_pref_col_set = {r[1] for r in dest_conn.execute("PRAGMA main.table_info(user_preferences)").fetchall()}
+        src_pref_cols = src_columns['user_preferences']
+        dest_pref_col_set = set(dest_columns['user_preferences'])
         common_pref_cols = [c for c in src_pref_cols if c in dest_pref_col_set]
         pref_rating_cols = [c for c in common_pref_cols if c not in ('user_id', 'photo_path')]
         pref_match = ("sp.user_id = main.user_preferences.user_id "
@@ -693,7 +852,6 @@ def _incremental_update_viewer_db(source_db, output_path, thumbnail_size, verbos
                 f"INSERT OR IGNORE INTO main.user_preferences ({col_list}) "
                 f"SELECT {col_list} FROM src.user_preferences"
             )
-        dest_conn.commit()
         if verbose:
             count = dest_conn.execute("SELECT COUNT(*) FROM main.user_preferences").fetchone()[0]
             logger.info("  Synced user preferences (%d rows)", count)
@@ -701,13 +859,18 @@ def _incremental_update_viewer_db(source_db, output_path, thumbnail_size, verbos
     # --- Clear stats_cache (viewer regenerates on demand) ---
     if 'stats_cache' in dest_tables:
         dest_conn.execute("DELETE FROM main.stats_cache")
-        dest_conn.commit()
 
     # --- Finalize ---
+    dest_conn.commit()
     dest_conn.execute("DETACH DATABASE src")
+    # Bounded reclaim of pages freed by the deletes instead of a full VACUUM
+    # (a no-op unless the full export set auto_vacuum=INCREMENTAL). Through
+    # executescript, as a plain execute() steps the pragma once: one page.
+    dest_conn.executescript(f"PRAGMA incremental_vacuum({_INCREMENTAL_VACUUM_PAGES});")
     if verbose:
-        logger.info("  Running ANALYZE...")
-    dest_conn.execute("ANALYZE")
+        logger.info("  Running PRAGMA optimize...")
+    # Re-analyzes only tables whose statistics have drifted, not every index
+    dest_conn.execute("PRAGMA optimize")
     dest_conn.close()
 
     output_size = os.path.getsize(output_path)
@@ -740,8 +903,6 @@ def export_viewer_db(source_db='photo_scores_pro.db', output_path=None, thumbnai
     Returns:
         Tuple of (source_size, output_size) in bytes
     """
-    from PIL import Image
-
     if output_path is None:
         output_path = 'photo_scores_viewer.db'
 
@@ -771,21 +932,29 @@ def export_viewer_db(source_db='photo_scores_pro.db', output_path=None, thumbnai
     dst_conn = sqlite3.connect(output_path)
     src_conn.backup(dst_conn)
     src_conn.close()
-
-    # Strip unused columns from the copy
-    if verbose:
-        logger.info("  Stripping unused BLOB columns...")
-
+    # The output is a scratch copy rebuilt from source on failure, so skip
+    # fsyncs and the on-disk journal; all edits below commit once before VACUUM
+    dst_conn.execute("PRAGMA journal_mode = MEMORY")
+    dst_conn.execute("PRAGMA synchronous = OFF")
+    dst_conn.execute("PRAGMA temp_store = MEMORY")
+
+    # Unused BLOB columns are stripped by the same UPDATE that writes a row's
+    # downsized thumbnail, and a set-based UPDATE afterwards strips only the
+    # rows not rewritten yet, so each row (and its overflow chain of
+    # thumbnail pages) is written once rather than once per pass.
     # photos: clip_embedding, histogram_data, raw_sharpness_variance, caption_embedding
     # (caption_embedding is the scan-side moment signal, ~4.6KB/captioned photo,
     # and is never read by the viewer — stripping it keeps the export lightweight).
-    dst_conn.execute("UPDATE photos SET clip_embedding = NULL, histogram_data = NULL, "
-                     "raw_sharpness_variance = NULL, caption_embedding = NULL")
-    dst_conn.commit()
-
+    photo_strip = ("clip_embedding = NULL, histogram_data = NULL, "
+                   "raw_sharpness_variance = NULL, caption_embedding = NULL")
+    photo_unstripped = ("clip_embedding IS NOT NULL OR histogram_data IS NOT NULL "
+                        "OR raw_sharpness_variance IS NOT NULL OR caption_embedding IS NOT NULL")
     # faces: embedding (NOT NULL constraint — use empty blob), landmark_2d_106
-    dst_conn.execute("UPDATE faces SET embedding = zeroblob(0), landmark_2d_106 = NULL")
-    dst_conn.commit()
+    face_strip = "embedding = zeroblob(0), landmark_2d_106 = NULL"
+    face_unstripped = "length(embedding) > 0 OR landmark_2d_106 IS NOT NULL"
+    # Indexes stay in place: none of these rewrites touches an indexed column,
+    # so SQLite never maintains them here, and VACUUM copies them b-tree to
+    # b-tree — dropping and re-creating them afterwards only adds a sort per index.
 
     # Downsize photo thumbnails
     if verbose:
@@ -799,89 +968,68 @@ def export_viewer_db(source_db='photo_scores_pro.db', output_path=None, thumbnai
     except ImportError:
         use_tqdm = False
 
+    # Keyset pagination on rowid (_keyset_thumbnails): each batch seeks past
+    # the last row seen instead of re-scanning an ever-growing OFFSET
     batch_size = 500
-    offset = 0
+    processed = 0
     resized = 0
+    # Thumbnail decode/resize/encode is CPU-bound PIL work; fan it out to one
+    # process per core while this thread only runs the SELECT/UPDATE batches
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        # One cursor per UPDATE statement for the whole run, so each batch rebinds
+        # the already-prepared statement
+        update_cur = dst_conn.cursor()
+        face_update_cur = dst_conn.cursor()
+
+        batches = _keyset_thumbnails(dst_conn, 'photos', 'thumbnail', batch_size)
+        for rowids, resized_thumbs in _resize_batches(executor, batches, thumbnail_size):
+            # Already-small thumbnails (None) and corrupt ones (b'') are left as-is
+            updates = [(data, rowid) for rowid, data in zip(rowids, resized_thumbs) if data]
+            resized += len(updates)
 
-    while True:
-        rows = dst_conn.execute(
-            "SELECT path, thumbnail FROM photos WHERE thumbnail IS NOT NULL LIMIT ? OFFSET ?",
-            (batch_size, offset)
-        ).fetchall()
-        if not rows:
-            break
-
-        updates = []
-        for path, thumb_bytes in rows:
-            if thumb_bytes is None:
-                continue
-            try:
-                img = Image.open(BytesIO(thumb_bytes))
-                if max(img.size) > thumbnail_size:
-                    img.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
-                    buf = BytesIO()
-                    img.save(buf, format='JPEG', quality=80)
-                    updates.append((buf.getvalue(), path))
-                    resized += 1
-            except Exception:
-                pass  # Skip corrupt thumbnails
-
-        if updates:
-            dst_conn.executemany("UPDATE photos SET thumbnail = ? WHERE path = ?", updates)
-            dst_conn.commit()
-
-        offset += batch_size
-        if verbose and not use_tqdm:
-            logger.info("    Processed %d thumbnails...", offset)
+            if updates:
+                update_cur.executemany(
+                    f"UPDATE photos SET thumbnail = ?, {photo_strip} WHERE rowid = ?", updates
+                )
 
-    if verbose:
-        logger.info("    Resized %d thumbnails", resized)
+            processed += len(rowids)
+            if verbose and not use_tqdm:
+                logger.info("    Processed %d thumbnails...", processed)
 
-    # Downsize face thumbnails
-    if verbose:
-        row = dst_conn.execute("SELECT COUNT(*) FROM faces WHERE face_thumbnail IS NOT NULL").fetchone()
-        face_total = row[0]
-        logger.info("  Downsizing %d face thumbnails...", face_total)
+        dst_conn.execute(f"UPDATE photos SET {photo_strip} WHERE {photo_unstripped}")
+        if verbose:
+            logger.info("    Resized %d thumbnails", resized)
 
-    offset = 0
-    face_resized = 0
+        # Downsize face thumbnails
+        if verbose:
+            row = dst_conn.execute("SELECT COUNT(*) FROM faces WHERE face_thumbnail IS NOT NULL").fetchone()
+            face_total = row[0]
+            logger.info("  Downsizing %d face thumbnails...", face_total)
 
-    while True:
-        rows = dst_conn.execute(
-            "SELECT id, face_thumbnail FROM faces WHERE face_thumbnail IS NOT NULL LIMIT ? OFFSET ?",
-            (batch_size, offset)
-        ).fetchall()
-        if not rows:
-            break
-
-        updates = []
-        for face_id, thumb_bytes in rows:
-            if thumb_bytes is None:
-                continue
-            try:
-                img = Image.open(BytesIO(thumb_bytes))
-                # Face thumbnails are small; only resize if larger than thumbnail_size
-                if max(img.size) > thumbnail_size:
-                    img.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
-                    buf = BytesIO()
-                    img.save(buf, format='JPEG', quality=80)
-                    updates.append((buf.getvalue(), face_id))
-                    face_resized += 1
-            except Exception:
-                pass
+        face_resized = 0
 
-        if updates:
-            dst_conn.executemany("UPDATE faces SET face_thumbnail = ? WHERE id = ?", updates)
-            dst_conn.commit()
+        batches = _keyset_thumbnails(dst_conn, 'faces', 'face_thumbnail', batch_size)
+        for face_ids, resized_thumbs in _resize_batches(executor, batches, thumbnail_size):
+            # Face thumbnails are small; only those larger than thumbnail_size change
+            updates = [(data, face_id) for face_id, data in zip(face_ids, resized_thumbs) if data]
+            face_resized += len(updates)
 
-        offset += batch_size
+            if updates:
+                face_update_cur.executemany(
+                    f"UPDATE faces SET face_thumbnail = ?, {face_strip} WHERE id = ?", updates
+                )
 
+        dst_conn.execute(f"UPDATE faces SET {face_strip} WHERE {face_unstripped}")
     if verbose:
         logger.info("    Resized %d face thumbnails", face_resized)
 
-    # VACUUM + ANALYZE
+    dst_conn.commit()
+
+    # VACUUM + ANALYZE. VACUUM also applies auto_vacuum=INCREMENTAL, so later
+    # incremental syncs can reclaim freed pages in bounded steps
     if verbose:
         logger.info("  Running VACUUM...")
+    dst_conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
     dst_conn.execute("VACUUM")
     if verbose:
         logger.info("  Running ANALYZE...")
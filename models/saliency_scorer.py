@@ -19,6 +19,9 @@ logger = logging.getLogger("facet.saliency")
 torch = None
 cv2 = None
 
+# Rule-of-thirds power points as normalized (x, y)
+_POWER_POINTS = np.array([[1/3, 1/3], [1/3, 2/3], [2/3, 1/3], [2/3, 2/3]])
+
 
 def bbox_from_mask(mask, min_subject_pixels: int = 50):
     """Extract the subject bounding box from a binary saliency mask.
@@ -155,7 +158,7 @@ class SaliencyScorer:
             chunk = pil_images[start:start + batch_size]
             batch_tensor = torch.stack([self.transform(img) for img in chunk]).to(self.device, dtype=next(self.model.parameters()).dtype)
 
-            with torch.no_grad():
+            with torch.inference_mode():
                 preds = self.model(batch_tensor)[-1].sigmoid()
 
             for i, pred in enumerate(preds):
@@ -184,7 +187,7 @@ class SaliencyScorer:
         orig_w, orig_h = pil_img.size
         batch_tensor = torch.stack([self.transform(pil_img)]).to(
             self.device, dtype=next(self.model.parameters()).dtype)
-        with torch.no_grad():
+        with torch.inference_mode():
             pred = self.model(batch_tensor)[-1].sigmoid()[0]
         soft = pred.squeeze().cpu().numpy().astype(np.float32)
         if soft.shape[0] != orig_h or soft.shape[1] != orig_w:
@@ -241,23 +244,32 @@ class SaliencyScorer:
         else:
             gray = img_cv
 
-        # Resize gray to mask dimensions if needed
+        # Bring gray and mask to the same size at the smaller resolution: a
+        # larger image is downscaled to the mask, a larger mask is downscaled
+        # (nearest) to the image rather than upscaling pixels for the Laplacian
+        stats_mask = mask
         if gray.shape[:2] != mask.shape[:2]:
-            gray = cv2.resize(gray, (w, h))
-
-        # Compute Laplacian (edge/sharpness detector)
-        laplacian = cv2.Laplacian(gray, cv2.CV_64F)
-
-        # Subject sharpness: Laplacian variance on subject region
-        subject_mask_bool = mask > 128
-        bg_mask_bool = ~subject_mask_bool
-
-        subject_laplacian = laplacian[subject_mask_bool]
-        subject_variance = float(np.var(subject_laplacian)) if len(subject_laplacian) > 0 else 0
+            if gray.shape[0] * gray.shape[1] > h * w:
+                gray = cv2.resize(gray, (w, h))
+            else:
+                stats_mask = cv2.resize(mask, (gray.shape[1], gray.shape[0]),
+                                        interpolation=cv2.INTER_NEAREST)
+
+        # Compute Laplacian (edge/sharpness detector). Integer pixels give
+        # integer responses that float32 holds exactly, and meanStdDev
+        # accumulates in double, so CV_32F halves the array at no precision cost.
+        laplacian = cv2.Laplacian(gray, cv2.CV_32F)
+
+        # Subject sharpness: Laplacian variance on subject region. Masked
+        # meanStdDev computes it in one pass without gathering the pixels;
+        # an empty region yields 0.
+        subject_mask = cv2.compare(stats_mask, 128, cv2.CMP_GT)
+        _, subject_std = cv2.meanStdDev(laplacian, mask=subject_mask)
+        subject_variance = float(subject_std[0, 0]) ** 2
 
         # Background sharpness for separation metric
-        bg_laplacian = laplacian[bg_mask_bool]
-        bg_variance = float(np.var(bg_laplacian)) if len(bg_laplacian) > 0 else 0
+        _, bg_std = cv2.meanStdDev(laplacian, mask=cv2.bitwise_not(subject_mask))
+        bg_variance = float(bg_std[0, 0]) ** 2
 
         # Normalize subject sharpness to 0-10 (typical range 0-5000)
         subject_sharpness = min(10.0, (subject_variance ** 0.5) / 7.0)
@@ -298,24 +310,16 @@ class SaliencyScorer:
         Returns:
             float: Placement score 0-10 (10 = centroid on power point)
         """
-        # Find subject centroid
-        ys, xs = np.nonzero(mask > 128)
-        if len(xs) == 0:
+        # Find subject centroid from the raw moments of the foreground pixels
+        moments = cv2.moments(cv2.compare(mask, 128, cv2.CMP_GT), binaryImage=True)
+        if moments['m00'] == 0:
             return 5.0
 
-        cx = float(np.mean(xs)) / w
-        cy = float(np.mean(ys)) / h
-
-        # Rule-of-thirds power points
-        thirds_x = [1/3, 2/3]
-        thirds_y = [1/3, 2/3]
+        cx = moments['m10'] / moments['m00'] / w
+        cy = moments['m01'] / moments['m00'] / h
 
         # Find minimum distance to any power point
-        min_dist = float('inf')
-        for tx in thirds_x:
-            for ty in thirds_y:
-                dist = ((cx - tx) ** 2 + (cy - ty) ** 2) ** 0.5
-                min_dist = min(min_dist, dist)
+        min_dist = float(np.min(np.hypot(_POWER_POINTS[:, 0] - cx, _POWER_POINTS[:, 1] - cy)))
 
         # Max possible distance from a power point is ~0.47 (corner to center third)
         # Score: closer to power point = higher score
@@ -16,6 +16,23 @@ logger = logging.getLogger("facet.vlm_composition")
 # Lazy import for torch
 torch = None
 
+# Phrases (lowercase substrings) whose mention in a response flags a
+# composition element, in the order elements are reported
+_ELEMENT_PHRASES = {
+    'rule of thirds': 'rule_of_thirds',
+    'thirds': 'rule_of_thirds',
+    'leading line': 'leading_lines',
+    'symmetr': 'symmetry',
+    'balance': 'balance',
+    'depth': 'depth',
+    'layer': 'depth',
+    'fram': 'framing',
+    'negative space': 'negative_space',
+}
+# Every phrase in one scan of the response; the lookahead also reports
+# matches that overlap an earlier one
+_ELEMENT_PATTERN = re.compile('(?=(' + '|'.join(map(re.escape, _ELEMENT_PHRASES)) + '))')
+
 
 def _ensure_torch():
     """Lazy load torch when needed."""
@@ -48,7 +65,8 @@ Format your response as:
 SCORE: [number 1-10]
 EXPLANATION: [1-2 sentences explaining the score]"""
 
-    def __init__(self, model_dict: Dict[str, Any], device: str = 'cuda', max_tokens: int = 256):
+    def __init__(self, model_dict: Dict[str, Any], device: str = 'cuda', max_tokens: int = 256,
+                 batch_size: int = 4):
         """
         Initialize the VLM composition analyzer.
 
@@ -56,11 +74,13 @@ EXPLANATION: [1-2 sentences explaining the score]"""
             model_dict: Dict with 'model' and 'processor' from ModelManager
             device: Device to run inference on
             max_tokens: Maximum tokens for generation
+            batch_size: Maximum images per batched generate call
         """
         self.model = model_dict['model']
         self.processor = model_dict['processor']
         self.device = device
         self.max_tokens = max_tokens
+        self.batch_size = max(1, batch_size)
 
     def analyze_composition(self, image: Image.Image) -> Dict[str, Any]:
         """
@@ -101,7 +121,7 @@ EXPLANATION: [1-2 sentences explaining the score]"""
 
             # Generate response
             _torch = _ensure_torch()
-            with _torch.no_grad():
+            with _torch.inference_mode():
                 output_ids = self.model.generate(
                     **inputs,
                     max_new_tokens=self.max_tokens,
@@ -160,16 +180,11 @@ EXPLANATION: [1-2 sentences explaining the score]"""
                 result['explanation'] = explanation_match.group(1).strip()
 
             # Identify mentioned composition elements
-            elements = {
-                'rule_of_thirds': any(x in response.lower() for x in ['rule of thirds', 'thirds']),
-                'leading_lines': 'leading line' in response.lower(),
-                'symmetry': 'symmetr' in response.lower(),
-                'balance': 'balance' in response.lower(),
-                'depth': 'depth' in response.lower() or 'layer' in response.lower(),
-                'framing': 'fram' in response.lower(),
-                'negative_space': 'negative space' in response.lower()
+            mentioned = {_ELEMENT_PHRASES[m.group(1)] for m in _ELEMENT_PATTERN.finditer(response.lower())}
+            result['elements'] = {
+                element: True for element in dict.fromkeys(_ELEMENT_PHRASES.values())
+                if element in mentioned
             }
-            result['elements'] = {k: v for k, v in elements.items() if v}
 
         except Exception as e:
             logger.warning("Response parsing error: %s", e)
@@ -178,10 +193,11 @@ EXPLANATION: [1-2 sentences explaining the score]"""
 
     def batch_analyze(self, images: List[Image.Image]) -> List[Dict[str, Any]]:
         """
-        Analyze multiple images sequentially.
+        Analyze multiple images, ``batch_size`` images per generate call.
 
-        Note: Qwen2-VL doesn't support efficient batching for this use case,
-        so we process images one at a time.
+        Prompts are left-padded so every row's generation starts at the same
+        offset. A chunk that fails for any reason (CUDA OOM included) falls
+        back to per-image analysis, which returns the default result on error.
 
         Args:
             images: List of PIL Images
@@ -190,10 +206,64 @@ EXPLANATION: [1-2 sentences explaining the score]"""
             List of analysis result dicts
         """
         results = []
-        for image in images:
-            results.append(self.analyze_composition(image))
+        for start in range(0, len(images), self.batch_size):
+            chunk = images[start:start + self.batch_size]
+            if len(chunk) == 1:
+                results.append(self.analyze_composition(chunk[0]))
+                continue
+            try:
+                results.extend(self._analyze_chunk(chunk))
+            except Exception as e:
+                if torch is not None and isinstance(e, torch.cuda.OutOfMemoryError):
+                    torch.cuda.empty_cache()
+                logger.warning("Composition batch of %d failed (%s), falling back to sequential...",
+                               len(chunk), e)
+                results.extend(self.analyze_composition(image) for image in chunk)
         return results
 
+    def _analyze_chunk(self, images: List[Image.Image]) -> List[Dict[str, Any]]:
+        """Analyze *images* with one left-padded, batched generate call."""
+        _torch = _ensure_torch()
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "image", "image": None},  # placeholder
+                    {"type": "text", "text": self.COMPOSITION_PROMPT}
+                ]
+            }
+        ]
+        text = self.processor.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+
+        original_padding_side = self.processor.tokenizer.padding_side
+        self.processor.tokenizer.padding_side = "left"
+        try:
+            inputs = self.processor(
+                text=[text] * len(images),
+                images=images,
+                padding=True,
+                return_tensors="pt"
+            ).to(self.device)
+        finally:
+            self.processor.tokenizer.padding_side = original_padding_side
+
+        with _torch.inference_mode():
+            output_ids = self.model.generate(
+                **inputs,
+                max_new_tokens=self.max_tokens,
+                do_sample=False
+            )
+
+        generated_ids = output_ids[:, inputs.input_ids.shape[1]:]
+        responses = self.processor.batch_decode(
+            generated_ids,
+            skip_special_tokens=True,
+            clean_up_tokenization_spaces=False
+        )
+        return [self._parse_response(response) for response in responses]
+
 
 class RuleBasedCompositionAnalyzer:
     """
@@ -291,10 +361,12 @@ def create_composition_analyzer(model_manager) -> Optional[VLMCompositionAnalyze
     if model_manager.is_using_qwen_composition():
         model_dict = model_manager.load_composition_model()
         if model_dict and 'model' in model_dict:
+            qwen_config = model_manager.model_settings.get('qwen2_vl', {})
             return VLMCompositionAnalyzer(
                 model_dict,
                 model_manager.device,
-                model_manager.model_settings.get('qwen2_vl', {}).get('max_new_tokens', 256)
+                qwen_config.get('max_new_tokens', 256),
+                qwen_config.get('vlm_batch_size', 4),
             )
 
     if model_manager.is_legacy_mode():
@@ -8,12 +8,23 @@ confidence scores.
 """
 
 import logging
+import sys
 from typing import List, Dict, Any
 import math
 import PIL.Image
 
 logger = logging.getLogger("facet.vlm_tagger")
 
+try:
+    from rapidfuzz import process as _rapidfuzz_process
+    from rapidfuzz.distance import Levenshtein as _RapidfuzzLevenshtein
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+
+# Largest edit distance at which a model tag is snapped to a vocabulary tag
+_MAX_TAG_DISTANCE = 2
+
 # Lazy imports
 torch = None
 AutoProcessor = None
@@ -30,20 +41,28 @@ def _ensure_imports():
         AutoProcessor = _Processor
 
 
-def _levenshtein(a: str, b: str) -> int:
-    """Compute Levenshtein edit distance between two strings."""
+def _levenshtein(a: str, b: str, max_dist: int) -> int:
+    """Levenshtein edit distance between two strings, capped at ``max_dist + 1``.
+
+    Uses RapidFuzz's bit-parallel implementation when installed; the
+    pure-Python fallback stops as soon as a whole DP row exceeds *max_dist*.
+    """
+    if HAS_RAPIDFUZZ:
+        return _RapidfuzzLevenshtein.distance(a, b, score_cutoff=max_dist)
     if len(a) < len(b):
-        return _levenshtein(b, a)
-    if len(b) == 0:
-        return len(a)
+        a, b = b, a
+    if len(a) - len(b) > max_dist:
+        return max_dist + 1
     prev = list(range(len(b) + 1))
     for i, ca in enumerate(a):
         curr = [i + 1]
         for j, cb in enumerate(b):
             cost = 0 if ca == cb else 1
             curr.append(min(curr[j] + 1, prev[j + 1] + 1, prev[j] + cost))
+        if min(curr) > max_dist:
+            return max_dist + 1
         prev = curr
-    return prev[-1]
+    return min(prev[-1], max_dist + 1)
 
 
 class VLMTagger:
@@ -73,6 +92,7 @@ class VLMTagger:
         self.backend = backend
         self.model = None
         self.processor = None
+        self._torch_dtype = None  # set by load(); pixel inputs are cast to it
         from utils.device import get_device
         self.device = get_device()
 
@@ -95,12 +115,32 @@ class VLMTagger:
 
         # Batch size for VLM inference
         self.batch_size = model_config.get('vlm_batch_size', 4 if self.family in ('qwen3', 'qwen3_5') else 2)
+        # Greedy decoding by default: tags are truncated to max_tags, so beam
+        # search would multiply decode cost for no better output
+        self.num_beams = model_config.get('num_beams', 1)
 
         # Build valid tag set from config
         self.valid_tags = set()
+        vocab = {}
         if scoring_config:
             vocab = scoring_config.get_tag_vocabulary()
             self.valid_tags = set(vocab.keys())
+        # Exact spellings -> vocabulary tag, normalized the way _parse_tags
+        # cleans model output: every tag maps to itself first, then synonyms
+        # (the first tag listing a shared synonym keeps it)
+        self._exact_lookup: Dict[str, str] = {}
+        for tag in vocab:
+            self._exact_lookup[tag.lower().replace(' ', '_')] = tag
+        for tag, synonyms in vocab.items():
+            for synonym in synonyms or ():
+                self._exact_lookup.setdefault(synonym.lower().replace(' ', '_'), tag)
+        # Fixed order for the vocabulary match (ties go to the first)
+        self._valid_tags_list = list(self.valid_tags)
+        # Indices into _valid_tags_list by tag length: a tag can only be
+        # within _MAX_TAG_DISTANCE edits of tags at most that much longer/shorter
+        self._tags_by_len: Dict[int, List[int]] = {}
+        for j, valid_tag in enumerate(self._valid_tags_list):
+            self._tags_by_len.setdefault(len(valid_tag), []).append(j)
 
         # Build prompt from config vocabulary (cached after first build)
         self._prompt = None
@@ -194,6 +234,7 @@ Tags:"""
             from transformers import Qwen2_5_VLForConditionalGeneration
             model_cls = Qwen2_5_VLForConditionalGeneration
 
+        self._torch_dtype = torch_dtype
         self.model = model_cls.from_pretrained(
             model_path,
             dtype=torch_dtype,
@@ -209,8 +250,53 @@ Tags:"""
 
         self.processor = AutoProcessor.from_pretrained(model_path, **processor_kwargs)
 
+        if self.model_config.get('use_torch_compile', False):
+            self._compile_forward()
+
         logger.info("%s loaded successfully", family_label)
 
+    def _compile_forward(self):
+        """Compile the decoder forward pass with torch.compile (opt-in).
+
+        ``generate()`` runs on the wrapped module, so compiling the module
+        itself would leave decoding eager; the bound ``forward`` is compiled
+        instead. Skipped off CUDA, on Windows (no Triton) and when
+        ``torch_compile_status`` reports no usable compiler.
+        """
+        if not hasattr(torch, 'compile') or not torch.cuda.is_available() or sys.platform == 'win32':
+            logger.info("Skipping torch.compile() for VLM tagger: requires CUDA on Linux/macOS")
+            return
+        from utils.device import torch_compile_status
+        compile_enabled, compile_reason = torch_compile_status()
+        if not compile_enabled:
+            logger.info("Skipping torch.compile() for VLM tagger: %s", compile_reason)
+            return
+        try:
+            self.model.forward = torch.compile(self.model.forward, mode='reduce-overhead', fullgraph=False)
+            logger.info("VLM tagger forward compiled with torch.compile()")
+        except Exception as e:
+            logger.info("torch.compile() not available: %s", e)
+
+    def _to_model_device(self, inputs) -> Dict[str, Any]:
+        """Move processor outputs to the model's device.
+
+        Floating-point tensors (pixel_values) are cast to the model dtype
+        before the copy, so a bf16/fp16 model transfers half the bytes instead
+        of float32 that the vision tower would cast down anyway. Integer ids
+        and masks keep their dtype.
+        """
+        device = self.model.device
+        moved = {}
+        for k, v in inputs.items():
+            if torch.is_tensor(v):
+                if self._torch_dtype is not None and v.is_floating_point():
+                    v = v.to(self._torch_dtype)
+                v = v.to(device, non_blocking=True)
+            elif hasattr(v, 'to'):
+                v = v.to(device)
+            moved[k] = v
+        return moved
+
     def unload(self):
         """Free VRAM by unloading the model."""
         if self.backend is not None:
@@ -282,14 +368,14 @@ Tags:"""
                 padding=True,
             )
 
-        inputs = {k: v.to(self.model.device) if hasattr(v, 'to') else v
-                  for k, v in inputs.items()}
+        inputs = self._to_model_device(inputs)
 
-        with torch.no_grad():
+        with torch.inference_mode():
             output_ids = self.model.generate(
                 **inputs,
                 max_new_tokens=max_new_tokens,
                 do_sample=False,
+                num_beams=self.num_beams,
             )
 
         generated_ids = [
@@ -342,14 +428,14 @@ Tags:"""
                 padding=True,
             )
 
-        inputs = {k: v.to(self.model.device) if hasattr(v, 'to') else v
-                  for k, v in inputs.items()}
+        inputs = self._to_model_device(inputs)
 
-        with torch.no_grad():
+        with torch.inference_mode():
             output_ids = self.model.generate(
                 **inputs,
                 max_new_tokens=max_new_tokens,
                 do_sample=False,
+                num_beams=self.num_beams,
             )
 
         generated_ids = [
@@ -464,14 +550,14 @@ Tags:"""
             )
         finally:
             self.processor.tokenizer.padding_side = original_padding_side
-        inputs = {k: v.to(self.model.device) if hasattr(v, 'to') else v
-                  for k, v in inputs.items()}
+        inputs = self._to_model_device(inputs)
 
-        with torch.no_grad():
+        with torch.inference_mode():
             output_ids = self.model.generate(
                 **inputs,
                 max_new_tokens=max_new_tokens,
                 do_sample=False,
+                num_beams=self.num_beams,
             )
 
         results = []
@@ -533,21 +619,23 @@ Tags:"""
                 padded_attention.append(inp['attention_mask'])
 
         batched = {
-            'input_ids': torch.cat(padded_input_ids, dim=0).to(self.model.device),
-            'attention_mask': torch.cat(padded_attention, dim=0).to(self.model.device),
+            'input_ids': torch.cat(padded_input_ids, dim=0),
+            'attention_mask': torch.cat(padded_attention, dim=0),
         }
         # Pass through additional keys from the first input (e.g. pixel_values)
         # These are shared for Qwen3 vision inputs — concatenate along batch dim
         for key in other_keys:
             tensors = [inp[key] for inp in all_inputs if key in inp]
             if tensors and hasattr(tensors[0], 'to'):
-                batched[key] = torch.cat(tensors, dim=0).to(self.model.device)
+                batched[key] = torch.cat(tensors, dim=0)
+        batched = self._to_model_device(batched)
 
-        with torch.no_grad():
+        with torch.inference_mode():
             output_ids = self.model.generate(
                 **batched,
                 max_new_tokens=max_new_tokens,
                 do_sample=False,
+                num_beams=self.num_beams,
             )
 
         results = []
@@ -562,8 +650,9 @@ Tags:"""
         """
         Parse and validate tags from model output using edit-distance matching.
 
-        Uses Levenshtein distance (threshold <= 2) to match model output tags
-        to the valid vocabulary, replacing the fragile substring matching.
+        Uses Levenshtein distance (threshold <= _MAX_TAG_DISTANCE) to match
+        model output tags to the valid vocabulary, replacing the fragile
+        substring matching.
         """
         text = text.strip()
 
@@ -575,7 +664,7 @@ Tags:"""
         # Split by comma and clean each tag
         raw_tags = [t.strip().lower() for t in text.split(',')]
 
-        tags = []
+        cleaned = []
         for tag in raw_tags:
             # Remove numbering or bullets
             tag = tag.lstrip('0123456789.-) ')
@@ -589,26 +678,53 @@ Tags:"""
 
             if not tag or len(tag) <= 1:
                 continue
+            cleaned.append(tag)
 
-            # Match to valid vocabulary using edit distance
-            if self.valid_tags:
-                if tag not in self.valid_tags:
-                    best_match = None
-                    best_dist = 3  # threshold + 1
-                    for valid_tag in self.valid_tags:
-                        dist = _levenshtein(tag, valid_tag)
-                        if dist < best_dist:
-                            best_dist = dist
-                            best_match = valid_tag
-                    if best_match is not None:
-                        tag = best_match
-                    # If no close match, keep the tag as-is
+        # Resolve tags and synonyms with one dict lookup; the rest go through
+        # edit-distance matching, and a tag with no close match is kept as-is
+        exact = self._exact_lookup
+        matches = self._match_vocabulary([t for t in cleaned if t not in exact])
 
+        tags = []
+        for tag in cleaned:
+            tag = exact.get(tag) or matches.get(tag, tag)
             if tag not in tags:  # Avoid duplicates
                 tags.append(tag)
 
         return tags[:max_tags]
 
+    def _match_vocabulary(self, unknown: List[str]) -> Dict[str, str]:
+        """Map each of *unknown* to its closest vocabulary tag within
+        _MAX_TAG_DISTANCE, omitting tags with no such neighbour."""
+        if not unknown or not self._valid_tags_list:
+            return {}
+        if HAS_RAPIDFUZZ:
+            # The whole unknown x vocabulary distance matrix in one C call
+            dist = _rapidfuzz_process.cdist(
+                unknown, self._valid_tags_list, scorer=_RapidfuzzLevenshtein.distance,
+                score_cutoff=_MAX_TAG_DISTANCE,
+            )
+            best = dist.argmin(axis=1)
+            return {
+                tag: self._valid_tags_list[j]
+                for tag, row, j in zip(unknown, dist, best)
+                if row[j] <= _MAX_TAG_DISTANCE
+            }
+        matches = {}
+        for tag in unknown:
+            best = None  # (distance, index), so ties keep vocabulary order
+            cap = _MAX_TAG_DISTANCE
+            for length in range(len(tag) - _MAX_TAG_DISTANCE, len(tag) + _MAX_TAG_DISTANCE + 1):
+                for j in self._tags_by_len.get(length, ()):
+                    # Nothing farther than the best found so far can win
+                    dist = _levenshtein(tag, self._valid_tags_list[j], cap)
+                    if dist <= cap and (best is None or (dist, j) < best):
+                        best = (dist, j)
+                        cap = dist
+            if best is not None:
+                matches[tag] = self._valid_tags_list[best[1]]
+        return matches
+
     def tag_image_with_scores(self, image: PIL.Image.Image, max_tags: int = 5) -> Dict[str, float]:
         """
         Generate tags with logprob-based confidence scores.
@@ -664,14 +780,14 @@ Tags:"""
                 padding=True,
             )
 
-        inputs = {k: v.to(self.model.device) if hasattr(v, 'to') else v
-                  for k, v in inputs.items()}
+        inputs = self._to_model_device(inputs)
 
-        with torch.no_grad():
+        with torch.inference_mode():
             outputs = self.model.generate(
                 **inputs,
                 max_new_tokens=max_new_tokens,
                 do_sample=False,
+                num_beams=self.num_beams,
                 output_scores=True,
                 return_dict_in_generate=True,
             )
@@ -1,5 +1,8 @@
 """Tests for authentication: JWT tokens, password hashing, rate limiting, and login endpoints."""
 
+import hashlib
+import json
+import os
 from datetime import timedelta
 from unittest import mock
 
@@ -12,6 +15,8 @@ from api.auth import (
     create_access_token,
     decode_access_token,
     hash_password,
+    password_needs_rehash,
+    upgrade_user_password,
     verify_password,
     verify_legacy_password,
     _is_hashed,
@@ -68,6 +73,50 @@ class TestPasswordHashing:
     def test_invalid_stored_hash_returns_false(self):
         assert not verify_password("anything", "not-a-valid-hash")
         assert not verify_password("anything", "")
+        assert not verify_password("anything", "$argon2id$not-a-valid-hash")
+
+    def test_repeat_verification_skips_kdf(self):
+        h = hash_password("secret")
+        assert verify_password("secret", h)
+        with mock.patch("api.auth._verify_password_uncached") as uncached:
+            assert verify_password("secret", h)
+            uncached.assert_not_called()
+            uncached.return_value = False
+            assert not verify_password("wrong", h)
+            assert not verify_password("secret", hash_password("secret"))
+
+
+def _pbkdf2_hash(password):
+    salt = os.urandom(16)
+    return f"{salt.hex()}:{hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100000).hex()}"
+
+
+class TestArgon2Migration:
+    """New hashes are Argon2id; PBKDF2 hashes still verify and get re-hashed."""
+
+    def test_new_hashes_are_argon2id(self):
+        h = hash_password("secret")
+        assert h.startswith("$argon2id$")
+        assert _is_hashed(h)
+        assert not password_needs_rehash(h)
+
+    def test_pbkdf2_hash_still_verifies_and_needs_rehash(self):
+        h = _pbkdf2_hash("secret")
+        assert verify_password("secret", h)
+        assert not verify_password("wrong", h)
+        assert password_needs_rehash(h)
+
+    def test_upgrade_user_password_rewrites_pbkdf2_hash(self, tmp_path, monkeypatch):
+        config_path = tmp_path / "scoring_config.json"
+        config_path.write_text(json.dumps({"users": {"alice": {"password_hash": _pbkdf2_hash("pw")}}}))
+        monkeypatch.setattr("api.config._CONFIG_PATH", str(config_path))
+        monkeypatch.setattr("api.config.reload_config", lambda: None)
+
+        upgrade_user_password("alice", "pw")
+
+        stored = json.loads(config_path.read_text())["users"]["alice"]["password_hash"]
+        assert stored.startswith("$argon2id$")
+        assert verify_password("pw", stored)
 
 
 # ---------------------------------------------------------------------------
@@ -1,14 +1,474 @@
+import json
+import logging
+import shutil
+import sqlite3
+
 import numpy as np
+import pytest
+from scipy.stats import pearsonr, rankdata, spearmanr
 
-from calibrate import METRIC_COLUMNS, build_metric_matrix
+import calibrate
+from calibrate import (
+    AVA_TAG_COMBOS,
+    AVA_TAG_TO_FACET,
+    METRIC_COLUMNS,
+    SCORING_CONFIG_PATH,
+    _analyze_numeric_filters,
+    _analyze_tag_filters,
+    _sorted_percentiles,
+    _tag_set_codes,
+    apply_weights_to_config,
+    average_ranks,
+    build_metric_matrix,
+    categories_by_name,
+    compute_correlations,
+    evaluate_baseline,
+    log_runs_to_db,
+    match_photos,
+    n_rows,
+    objective,
+    optimize_modifiers,
+    optimize_weights,
+    parse_ava_annotations,
+    query_facet_db,
+    rank_target,
+    resolve_ava_categories,
+    resolve_ava_category,
+    run_ava_tag_analysis,
+    save_config,
+)
 
 
 def test_build_metric_matrix_preserves_genuine_zero_scores():
     col = next(iter(METRIC_COLUMNS.keys()))
-    rows = [{col: 0.0, 'mos': 5.0} for _ in range(10)]
+    rows = {col: np.zeros(10), 'mos': np.full(10, 5.0)}
 
     X, y, col_names = build_metric_matrix(rows)
 
     assert col in col_names
     idx = col_names.index(col)
     assert np.all(X[:, idx] == 0.0)
+
+
+def test_compute_correlations_matches_scipy_per_column():
+    rng = np.random.default_rng(4)
+    mos = np.round(rng.uniform(0, 10, 60), 1)
+    values = np.column_stack([mos + rng.normal(0, 2, 60), np.round(rng.uniform(0, 10, 60)), np.full(60, 5.0)])
+
+    c = compute_correlations(values, mos)
+
+    for j in range(2):
+        assert np.isclose(c['srcc'][j], spearmanr(values[:, j], mos)[0])
+        assert np.isclose(c['plcc'][j], pearsonr(values[:, j], mos)[0])
+        assert np.isclose(c['mae'][j], np.mean(np.abs(values[:, j] - mos)))
+    assert np.isnan(c['srcc'][2]) and np.isnan(c['plcc'][2])
+
+
+def test_objective_matches_spearmanr_with_ties():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 5, size=(200, 3)).astype(np.float64)
+    y = rng.integers(0, 10, size=200).astype(np.float64)
+    w = np.array([0.5, 0.3, 0.2])
+
+    y_centered, y_norm = rank_target(y)
+    expected, _ = spearmanr(X @ w, y)
+
+    assert np.isclose(-objective(w, X, y_centered, y_norm), expected)
+
+
+def test_objective_is_zero_for_constant_prediction():
+    X = np.ones((20, 2))
+    y_centered, y_norm = rank_target(np.arange(20, dtype=np.float64))
+
+    assert objective(np.array([0.5, 0.5]), X, y_centered, y_norm) == 0.0
+
+
+def test_objective_scores_population_columns_independently():
+    rng = np.random.default_rng(1)
+    X = rng.uniform(0, 10, size=(100, 3))
+    y = X @ np.array([0.6, 0.3, 0.1]) + rng.normal(0, 1, 100)
+    W = rng.uniform(0, 1, size=(3, 7))
+
+    y_centered, y_norm = rank_target(y)
+    batch = objective(W, X, y_centered, y_norm)
+
+    assert batch.shape == (7,)
+    for j in range(W.shape[1]):
+        assert np.isclose(batch[j], objective(W[:, j], X, y_centered, y_norm))
+
+
+def test_average_ranks_matches_rankdata_with_ties():
+    rng = np.random.default_rng(7)
+    x = np.round(rng.uniform(0, 3, size=(200, 5)), 1)
+    x[:, 4] = 2.0
+
+    assert np.allclose(average_ranks(x), rankdata(x, axis=0))
+    assert np.allclose(average_ranks(x[:, 0]), rankdata(x[:, 0]))
+    assert np.allclose(average_ranks(np.array([1.0])), [1.0])
+
+
+def test_objective_population_matches_spearmanr_on_tied_predictions():
+    rng = np.random.default_rng(2)
+    # Imputed 5.0 defaults and coarse scores leave many tied predictions
+    X = rng.integers(0, 4, size=(300, 3)).astype(np.float64)
+    X[rng.random(X.shape) < 0.4] = 5.0
+    y = rng.normal(size=300)
+    # Dyadic weights keep every weighted sum exact, so batched and per-column
+    # products tie on exactly the same photos
+    W = rng.integers(1, 8, size=(3, 6)) / 8.0
+    W[:, 0] = [1.0, 0.0, 0.0]  # a single coarse metric: ties everywhere
+
+    y_centered, y_norm = rank_target(y)
+    batch = objective(W, X, y_centered, y_norm)
+
+    for j in range(W.shape[1]):
+        expected, _ = spearmanr(X @ W[:, j], y)
+        assert np.isclose(-batch[j], expected)
+
+
+def test_build_metric_matrix_drops_mostly_null_and_missing_columns():
+    cols = list(METRIC_COLUMNS.keys())
+    rows = {
+        cols[0]: np.array([np.nan, 2, 2, 2, np.nan, 2, 2, 2]),
+        cols[1]: np.full(8, np.nan),
+        'mos': np.arange(8, dtype=np.float64),
+    }
+
+    X, y, col_names = build_metric_matrix(rows)
+
+    assert col_names == [cols[0]]
+    assert X[:, 0].tolist() == [5.0, 2.0, 2.0, 2.0, 5.0, 2.0, 2.0, 2.0]
+    assert y.tolist() == [float(i) for i in range(8)]
+
+
+def test_resolve_ava_categories_matches_rule_priority():
+    tags = np.arange(0, 70)
+    tag1, tag2 = (a.ravel() for a in np.meshgrid(tags, tags, indexing='ij'))
+
+    resolved = resolve_ava_categories(tag1, tag2)
+    scalar = [resolve_ava_category(int(a), int(b)) for a, b in zip(tag1, tag2)]
+
+    # Combo rules -> tag_1 mapping -> tag_2 mapping -> None
+    expected = [
+        AVA_TAG_COMBOS.get((a, b)) or AVA_TAG_TO_FACET.get(a) or AVA_TAG_TO_FACET.get(b)
+        for a, b in zip(tag1.tolist(), tag2.tolist())
+    ]
+    assert resolved == expected
+    assert scalar == expected
+
+
+AVA_LINES = [
+    "1 1001 0 0 0 0 10 0 0 0 0 0 17 21 5",
+    "2 1002 0 0 0 0 0 0 0 0 0 0 14 0 5",      # no votes -> skipped
+    "3 1003 1 0 0 0 0 0 0 0 0 1 0 14 5",
+    "4 1004 0 0 0",                           # truncated -> skipped
+]
+
+
+def test_parse_ava_annotations_writes_and_reuses_cache(tmp_path):
+    ava = tmp_path / 'AVA.txt'
+    ava.write_text('\n'.join(AVA_LINES) + '\n')
+
+    first = parse_ava_annotations(str(ava))
+
+    assert first['image_id'].tolist() == [1001, 1003]
+    assert np.isclose(first['mos'][0], (5.0 - 1.0) / 9.0 * 10.0)
+    assert first['ava_tag1'].tolist() == [17, 14]
+    assert first['ava_tag2'].tolist() == [21, 0]
+    assert (tmp_path / 'AVA.txt.facet_cache.npz').exists()
+    second = parse_ava_annotations(str(ava))
+    assert all(np.array_equal(first[col], second[col]) for col in first)
+
+
+def test_parse_ava_annotations_cache_invalidated_by_edit(tmp_path):
+    ava = tmp_path / 'AVA.txt'
+    ava.write_text(AVA_LINES[0] + '\n')
+    assert parse_ava_annotations(str(ava))['image_id'].tolist() == [1001]
+
+    ava.write_text('\n'.join(AVA_LINES) + '\n')
+
+    assert parse_ava_annotations(str(ava))['image_id'].tolist() == [1001, 1003]
+
+
+def test_parse_ava_annotations_bulk_path_matches_line_parser(tmp_path):
+    rng = np.random.default_rng(3)
+    lines = []
+    for i in range(200):
+        counts = rng.integers(0, 20, size=10) * (i % 7 != 0)
+        tags = rng.integers(0, 67, size=2)
+        lines.append(' '.join(map(str, [i, 5000 + i, *counts, *tags, 1])))
+    well_formed = tmp_path / 'AVA.txt'
+    well_formed.write_text('\n'.join(lines) + '\n')
+    ragged = tmp_path / 'AVA_ragged.txt'
+    ragged.write_text('\n'.join(lines + ['x 1 2']) + '\n')
+
+    bulk = parse_ava_annotations(str(well_formed))
+    by_line = parse_ava_annotations(str(ragged))
+
+    assert np.array_equal(bulk['image_id'], by_line['image_id'])
+    assert np.allclose(bulk['mos'], by_line['mos'])
+    assert np.array_equal(bulk['ava_tag1'], by_line['ava_tag1'])
+    assert np.array_equal(bulk['ava_tag2'], by_line['ava_tag2'])
+
+
+def _write_calibration_fixture(tmp_path, n=240):
+    """Facet DB + AVA.txt where aesthetic tracks MOS; returns (db, ava) paths."""
+    from db.schema import init_database
+
+    db_path = str(tmp_path / 'facet.db')
+    init_database(db_path)
+    rng = np.random.default_rng(5)
+    ava_lines = []
+    conn = sqlite3.connect(db_path)
+    for i in range(n):
+        image_id = 10_000 + i
+        votes = rng.integers(0, 30, size=10)
+        votes[i % 10] += 40
+        mos = ((votes * np.arange(1, 11)).sum() / votes.sum() - 1.0) / 9.0 * 10.0
+        tags = (17, 21) if i % 3 == 0 else (14, 0)
+        ava_lines.append(' '.join(map(str, [i, image_id, *votes, *tags, 1])))
+        category = 'portrait_bw' if i % 3 == 0 and i % 2 else ('landscape' if i % 3 else 'portrait')
+        conn.execute(
+            "INSERT INTO photos (path, filename, aggregate, aesthetic, comp_score, category, "
+            "noise_sigma, face_ratio, tags) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (f'/ava/{image_id}.jpg', f'{image_id}.jpg', float(np.clip(mos + rng.normal(0, 2), 0, 10)),
+             float(np.clip(mos + rng.normal(0, 0.5), 0, 10)), float(rng.uniform(0, 10)), category,
+             float(rng.uniform(0, 8)), float(rng.uniform(0, 0.5)),
+             'person,portrait' if i % 2 else None),
+        )
+    conn.execute("INSERT INTO photos (path, filename, aggregate) VALUES ('/x/IMG_1.jpg', 'IMG_1.jpg', 5.0)")
+    conn.commit()
+    conn.close()
+    ava = tmp_path / 'AVA.txt'
+    ava.write_text('\n'.join(ava_lines) + '\n')
+    return db_path, str(ava)
+
+
+def test_calibration_pipeline_on_column_tables(tmp_path):
+    db_path, ava_path = _write_calibration_fixture(tmp_path)
+
+    all_rows = query_facet_db(db_path, include_extra=True)
+    matched = match_photos(all_rows, parse_ava_annotations(ava_path))
+
+    assert n_rows(all_rows) == 241
+    assert n_rows(matched) == 240
+    assert matched['ava_category'][0] == 'portrait_bw'
+    assert matched['ava_category'][1] == 'landscape'
+    assert np.isnan(matched['face_quality']).all()
+
+    evaluate_baseline(matched)
+    info, col_to_weight = optimize_weights(matched, 'default')
+
+    assert info['col_names'] == ['aesthetic', 'comp_score']
+    assert info['srcc_after'] >= info['srcc_before']
+    assert col_to_weight['aesthetic'] > col_to_weight['comp_score']
+    assert np.isclose(sum(col_to_weight.values()), 1.0)
+
+
+def test_optimize_weights_float32_matches_float64(tmp_path):
+    db_path, ava_path = _write_calibration_fixture(tmp_path)
+    matched = match_photos(query_facet_db(db_path), parse_ava_annotations(ava_path))
+
+    info64, weights64 = optimize_weights(matched, 'default')
+    info32, weights32 = optimize_weights(matched, 'default', dtype=np.float32)
+
+    assert info32['col_names'] == info64['col_names']
+    assert abs(info32['srcc_after'] - info64['srcc_after']) < 0.01
+    assert np.isclose(sum(weights32.values()), 1.0)
+
+
+@pytest.fixture
+def landscape_modifier_inputs(tmp_path):
+    """(rows, cat_cfg, penalty_settings) for optimize_modifiers on the
+    landscape photos of the calibration fixture, with the shipped config."""
+    db_path, ava_path = _write_calibration_fixture(tmp_path)
+    matched = match_photos(query_facet_db(db_path, include_extra=True), parse_ava_annotations(ava_path))
+    with open(SCORING_CONFIG_PATH) as f:
+        config = json.load(f)
+    rows = {col: values[matched['ava_category'] == 'landscape'] for col, values in matched.items()}
+    return rows, categories_by_name(config)['landscape'], config.get('penalty_settings', {})
+
+
+def test_optimize_modifiers_never_worse_than_current(landscape_modifier_inputs):
+    rows, cat_cfg, penalty_settings = landscape_modifier_inputs
+
+    result = optimize_modifiers(rows, 'landscape', cat_cfg, penalty_settings)
+
+    assert result['n_photos'] == 160
+    assert result['srcc_after'] >= result['srcc_before']
+
+
+def test_optimize_modifiers_skips_de_when_already_well_ranked(landscape_modifier_inputs, monkeypatch):
+    rows, cat_cfg, penalty_settings = landscape_modifier_inputs
+    monkeypatch.setattr(calibrate, 'MODIFIER_SKIP_SRCC', -1.0)
+    monkeypatch.setattr(calibrate, 'differential_evolution', None)
+
+    result = optimize_modifiers(rows, 'landscape', cat_cfg, penalty_settings)
+
+    assert result['skipped']
+    assert result['optimized'] == result['current']
+    assert result['srcc_after'] == result['srcc_before']
+
+
+def test_optimize_modifiers_warm_start_from_related_optimum(landscape_modifier_inputs, monkeypatch):
+    rows, cat_cfg, penalty_settings = landscape_modifier_inputs
+    cold = optimize_modifiers(rows, 'landscape', cat_cfg, penalty_settings)
+
+    inits = []
+    real_de = calibrate.differential_evolution
+
+    def recording_de(*args, **kwargs):
+        inits.append(kwargs['init'])
+        return real_de(*args, **kwargs)
+
+    monkeypatch.setattr(calibrate, 'differential_evolution', recording_de)
+    hint = np.array(list(cold['optimized'].values()))
+    warm = optimize_modifiers(rows, 'landscape', cat_cfg, penalty_settings, init_hint=hint)
+
+    # The hint itself (clipped to the DE bounds) seeds the second member
+    assert np.array_equal(inits[0][1], np.clip(hint, [0.0, 0.0, 0.5], [1.0, 1.0, 3.0]))
+    assert warm['srcc_after'] >= warm['srcc_before']
+    assert abs(warm['srcc_after'] - cold['srcc_after']) < 0.01
+
+
+def test_optimize_modifiers_float32_matches_float64(landscape_modifier_inputs):
+    rows, cat_cfg, penalty_settings = landscape_modifier_inputs
+
+    result64 = optimize_modifiers(rows, 'landscape', cat_cfg, penalty_settings)
+    result32 = optimize_modifiers(rows, 'landscape', cat_cfg, penalty_settings, dtype=np.float32)
+
+    assert abs(result32['srcc_before'] - result64['srcc_before']) < 0.01
+    assert abs(result32['srcc_after'] - result64['srcc_after']) < 0.01
+
+
+def test_query_facet_db_streams_batches_into_same_table(tmp_path, monkeypatch):
+    db_path, _ = _write_calibration_fixture(tmp_path, n=30)
+    whole = query_facet_db(db_path, include_extra=True)
+
+    monkeypatch.setattr(calibrate, 'QUERY_BATCH_SIZE', 7)
+    batched = query_facet_db(db_path, include_extra=True)
+
+    assert whole.keys() == batched.keys()
+    for col, values in whole.items():
+        assert values.dtype == batched[col].dtype
+        assert np.array_equal(values, batched[col], equal_nan=values.dtype != object)
+    assert batched['category'][-1] == 'default'
+
+
+def test_query_facet_db_reprobes_columns_after_schema_change(tmp_path):
+    db_path, _ = _write_calibration_fixture(tmp_path, n=12)
+    assert 'noise_sigma' in query_facet_db(db_path, include_extra=True)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX IF EXISTS idx_noise_sigma")
+    conn.execute("ALTER TABLE photos DROP COLUMN noise_sigma")
+    conn.commit()
+    conn.close()
+
+    assert 'noise_sigma' not in query_facet_db(db_path, include_extra=True)
+
+
+def test_ava_tag_analysis_runs_on_column_tables(tmp_path, caplog):
+    db_path, ava_path = _write_calibration_fixture(tmp_path)
+    config_path = tmp_path / 'scoring_config.json'
+    shutil.copy(SCORING_CONFIG_PATH, config_path)
+    original = config_path.read_text()
+    matched = match_photos(query_facet_db(db_path, include_extra=True), parse_ava_annotations(ava_path))
+
+    with caplog.at_level(logging.INFO, logger='facet.calibrate'):
+        run_ava_tag_analysis(matched, str(config_path), apply_filters=False)
+
+    assert 'CATEGORY DETECTION VALIDATION (240 photos with AVA tags)' in caplog.text
+    assert "Optimizing modifiers for 'landscape' (160 photos)" in caplog.text
+    assert config_path.read_text() == original
+
+
+def test_match_photos_joins_numeric_stems_only():
+    ava = {
+        'image_id': np.array([7, 42, 953619]),
+        'mos': np.array([1.0, 2.0, 3.0]),
+        'ava_tag1': np.array([17, 0, 14]),
+        'ava_tag2': np.array([21, 0, 0]),
+    }
+    db_rows = {
+        'filename': np.array(['42.jpg', None, 'IMG_7.jpg', '7', '99.jpg', ''], dtype=object),
+        'path': np.array(['/a/42.jpg', '/b/953619.tar.jpg', '/c/IMG_7.jpg', '/d/7', '/e/99.jpg', '/f/953619.JPG'],
+                         dtype=object),
+        'aggregate': np.arange(6, dtype=np.float64),
+    }
+
+    matched = match_photos(db_rows, ava)
+
+    assert matched['aggregate'].tolist() == [0.0, 3.0, 5.0]
+    assert matched['mos'].tolist() == [2.0, 1.0, 3.0]
+    assert matched['ava_category'].tolist() == [None, 'portrait_bw', 'landscape']
+
+
+def test_sorted_percentiles_matches_np_percentile():
+    rng = np.random.default_rng(6)
+    q = [5, 10, 15, 20, 25, 75, 80, 85, 90, 95]
+    for n in (1, 2, 7, 500):
+        values = np.sort(rng.exponential(size=n))
+        assert np.allclose(_sorted_percentiles(values, q), np.percentile(values, q))
+
+
+def test_numeric_filter_sweep_picks_best_loosening_candidate():
+    misclass = np.linspace(0.0, 1.0, 40)
+    rows = {
+        'luminance': np.concatenate([np.full(10, 0.1), misclass]),
+        'face_ratio': np.concatenate([np.full(10, 0.1), misclass]),
+    }
+    is_correct = np.arange(50) < 10
+    filters = {'luminance_max': 0.5, 'face_ratio_min': 0.0}
+    suggestions = []
+
+    _analyze_numeric_filters('night', rows, is_correct, filters, suggestions)
+
+    p95 = np.percentile(misclass, 95)
+    assert suggestions == [{
+        'category': 'night',
+        'filter_key': 'luminance_max',
+        'current': 0.5,
+        'suggested': round(float(p95), 4),
+        'gain': int(np.count_nonzero(misclass <= p95)),
+    }]
+
+
+def test_tag_filter_reads_comma_separated_tags(caplog):
+    tags = np.array(['person,portrait', 'landscape', None, '["person"]', 'person, street', ''], dtype=object)
+    tag_vocab, tag_codes = _tag_set_codes(tags)
+    is_correct = np.array([False] * 5 + [True])
+
+    with caplog.at_level(logging.INFO, logger='facet.calibrate'):
+        _analyze_tag_filters('portrait', {'tag_code': tag_codes}, is_correct, {'required_tags': ['person']}, tag_vocab)
+
+    assert 'Missing required tags: 2/5' in caplog.text
+
+
+def test_log_runs_to_db_inserts_every_run_in_one_transaction(tmp_path):
+    db_path, _ = _write_calibration_fixture(tmp_path, n=12)
+    info = {'category': 'portrait', 'n_photos': 12, 'col_names': ['aesthetic'], 'w_before': [1.0],
+            'srcc_before': 0.5, 'srcc_after': 0.75}
+
+    conn = sqlite3.connect(db_path)
+    log_runs_to_db(conn, [(info, {'aesthetic': 1.0}), (dict(info, category='default'), {'aesthetic': 1.0})])
+    conn.commit()
+    rows = conn.execute(
+        "SELECT category, old_weights, mse_after FROM weight_optimization_runs ORDER BY id").fetchall()
+    conn.close()
+
+    assert rows == [('portrait', '{"aesthetic": 1.0}', 0.25), ('default', '{"aesthetic": 1.0}', 0.25)]
+
+
+def test_apply_weights_in_memory_then_save_once(tmp_path):
+    config_path = tmp_path / 'scoring_config.json'
+    config = {'categories': [{'name': 'portrait', 'weights': {'aesthetic_percent': 50, 'face_quality_percent': 30,
+                                                              'bonus': 1.0}}]}
+    col_to_weight = {'aesthetic': 0.2, 'face_quality': 0.3}
+
+    apply_weights_to_config(categories_by_name(config)['portrait'], col_to_weight, ['aesthetic', 'face_quality'])
+    save_config(str(config_path), config)
+
+    weights = json.loads(config_path.read_text())['categories'][0]['weights']
+    assert weights == {'aesthetic_percent': 40, 'face_quality_percent': 60, 'bonus': 1.0}
+    assert not (tmp_path / 'scoring_config.json.tmp').exists()
@@ -241,3 +241,36 @@ class TestColorsEndpoint:
         assert buckets.get("orange") == 1
         assert buckets.get("blue") == 1
         assert "green" not in buckets  # no green photos
+
+
+class TestTagsEndpoint:
+    """Tests for /filter_options/tags when the photo_tags lookup table is absent."""
+
+    def test_split_fallback_counts_comma_separated_tags(self, tmp_path):
+        db_path = str(tmp_path / "tags.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE photos (path TEXT PRIMARY KEY, tags TEXT)")
+        conn.executemany("INSERT INTO photos VALUES (?, ?)", [
+            ("/a.jpg", "dog, beach"),
+            ("/b.jpg", "dog,,sunset "),
+            ("/c.jpg", 'say "cheese",back\\slash'),
+            ("/d.jpg", ""),
+            ("/f.jpg", "a\tb,x\ny"),
+            ("/e.jpg", None),
+        ])
+        conn.commit()
+        conn.close()
+        app, patches = _build_app_with(db_path, {"dropdowns": {"max_tags": 10}})
+        patches.append(mock.patch(
+            "api.routers.filter_options.is_photo_tags_available", return_value=False,
+        ))
+        patches[-1].start()
+        try:
+            resp = TestClient(app).get("/api/filter_options/tags")
+        finally:
+            _stop_patches(patches)
+        assert resp.status_code == 200
+        assert [tuple(t) for t in resp.json()["tags"]] == [
+            ("dog", 2), ("a\tb", 1), ("back\\slash", 1), ("beach", 1),
+            ('say "cheese"', 1), ("sunset", 1), ("x\ny", 1),
+        ]
@@ -8,6 +8,7 @@ be merged; a DB with no embeddings must reproduce the original pHash-only groups
 """
 
 import numpy as np
+import pytest
 
 from utils.duplicate import _two_stage_union, _build_embedding_matrix
 from utils.embedding import embedding_to_bytes
@@ -76,6 +77,26 @@ def test_no_embeddings_identical_to_pure_phash():
     assert uf.find(0) != uf.find(3)
 
 
+@pytest.mark.parametrize("hw_popcount", [True, False])
+def test_hamming_matches_bit_count(monkeypatch, hw_popcount):
+    """Both popcount paths (NumPy 2 ufunc and SWAR fallback) give exact distances."""
+    import utils.duplicate as dup
+    monkeypatch.setattr(dup, "_HAS_BITWISE_COUNT", hw_popcount and dup._HAS_BITWISE_COUNT)
+    rng = np.random.default_rng(0)
+    hashes = np.append(rng.integers(0, 2**64 - 1, size=200, dtype=np.uint64, endpoint=True),
+                       np.uint64(2**64 - 1))
+    expected = [bin(int(hashes[0]) ^ int(h)).count('1') for h in hashes]
+    assert dup._hamming_to_all(hashes[0], hashes).tolist() == expected
+
+
+def test_phashes_decode_to_uint64():
+    from utils.duplicate import _phashes_to_uint64
+    hexes = ['0000000000000007', 'ffffffffffffffff', '8000000000000001']
+    assert _phashes_to_uint64(hexes).tolist() == [int(h, 16) for h in hexes]
+    # Non-standard widths take the per-string path
+    assert _phashes_to_uint64(['ff', '0000000000000001']).tolist() == [255, 1]
+
+
 def test_build_embedding_matrix_drops_minority_dim():
     """Mixed-dimension DBs keep the dominant dim; the odd one out is marked absent."""
     a = embedding_to_bytes(_norm([1, 0, 0, 0]))
@@ -19,8 +19,8 @@ _B = '/photos/b.jpg'
 _USER = 'alice'
 
 
-def _thumb_bytes(color=(120, 60, 30)):
-    img = Image.new('RGB', (640, 640), color)
+def _thumb_bytes(color=(120, 60, 30), size=640):
+    img = Image.new('RGB', (size, size), color)
     buf = BytesIO()
     img.save(buf, format='JPEG', quality=85)
     return buf.getvalue()
@@ -106,6 +106,68 @@ def test_incremental_export_syncs_faces_for_existing_photos(tmp_path):
     assert n == 1
 
 
+def test_incremental_export_refreshes_existing_face_signals(tmp_path):
+    src = str(tmp_path / 'scan.db')
+    out = str(tmp_path / 'viewer.db')
+    _make_source_db(src)
+    sconn = sqlite3.connect(src)
+    sconn.execute(
+        "INSERT INTO faces (photo_path, face_index, embedding, smile_score) VALUES (?, 0, ?, 0.1)",
+        (_A, sqlite3.Binary(b'\x00' * 512)),
+    )
+    sconn.commit()
+    export_viewer_db(src, out, thumbnail_size=320, verbose=False)
+
+    sconn.execute("UPDATE faces SET smile_score = 0.9, eyes_open_score = 0.8 WHERE photo_path = ?", (_A,))
+    sconn.commit()
+    sconn.close()
+
+    export_viewer_db(src, out, thumbnail_size=320, verbose=False)
+
+    vconn = sqlite3.connect(out)
+    smile, eyes = vconn.execute(
+        "SELECT smile_score, eyes_open_score FROM faces WHERE photo_path = ?", (_A,)
+    ).fetchone()
+    vconn.close()
+    assert smile == pytest.approx(0.9)
+    assert eyes == pytest.approx(0.8)
+
+
+def test_incremental_export_applies_added_and_removed_photos(tmp_path):
+    src = str(tmp_path / 'scan.db')
+    out = str(tmp_path / 'viewer.db')
+    _make_source_db(src)
+    sconn = sqlite3.connect(src)
+    sconn.execute(
+        "INSERT INTO faces (photo_path, face_index, embedding, face_thumbnail) VALUES (?, 0, ?, ?)",
+        (_B, sqlite3.Binary(b'\x00' * 512), _thumb_bytes()),
+    )
+    sconn.commit()
+    sconn.close()
+    export_viewer_db(src, out, thumbnail_size=320, verbose=False)
+
+    sconn = sqlite3.connect(src)
+    sconn.execute("PRAGMA foreign_keys = ON")
+    sconn.execute("DELETE FROM photos WHERE path = ?", (_B,))
+    sconn.execute(
+        "INSERT INTO photos (path, filename, thumbnail) VALUES (?, ?, ?)",
+        ('/photos/c.jpg', 'c.jpg', _thumb_bytes()),
+    )
+    sconn.commit()
+    sconn.close()
+
+    export_viewer_db(src, out, thumbnail_size=320, verbose=False)
+
+    vconn = sqlite3.connect(out)
+    paths = {r[0] for r in vconn.execute("SELECT path FROM photos")}
+    faces = vconn.execute("SELECT COUNT(*) FROM faces WHERE photo_path = ?", (_B,)).fetchone()[0]
+    thumb = vconn.execute("SELECT thumbnail FROM photos WHERE path = '/photos/c.jpg'").fetchone()[0]
+    vconn.close()
+    assert paths == {_A, '/photos/c.jpg'}
+    assert faces == 0
+    assert Image.open(BytesIO(thumb)).size == (320, 320)
+
+
 def test_export_includes_user_preferences(tmp_path):
     src = str(tmp_path / 'scan.db')
     out = str(tmp_path / 'viewer.db')
@@ -193,5 +255,65 @@ def test_incremental_export_preserves_viewer_user_preferences(tmp_path):
     assert fav == 1
 
 
+def test_export_downsizes_photo_and_face_thumbnails(tmp_path):
+    src = str(tmp_path / 'scan.db')
+    out = str(tmp_path / 'viewer.db')
+    _make_source_db(src)
+    sconn = sqlite3.connect(src)
+    sconn.execute(
+        "INSERT INTO faces (photo_path, face_index, embedding, face_thumbnail) VALUES (?, 0, ?, ?)",
+        (_A, sqlite3.Binary(b'\x00' * 512), _thumb_bytes()),
+    )
+    small_face = _thumb_bytes(size=160)
+    sconn.execute(
+        "INSERT INTO faces (photo_path, face_index, embedding, face_thumbnail) VALUES (?, 1, ?, ?)",
+        (_A, sqlite3.Binary(b'\x00' * 512), small_face),
+    )
+    sconn.execute("UPDATE photos SET thumbnail = ? WHERE path = ?", (b'not a jpeg', _B))
+    sconn.commit()
+    sconn.close()
+
+    export_viewer_db(src, out, thumbnail_size=320, verbose=False)
+
+    vconn = sqlite3.connect(out)
+    photo_thumbs = dict(vconn.execute("SELECT path, thumbnail FROM photos").fetchall())
+    face_thumbs = [r[0] for r in vconn.execute("SELECT face_thumbnail FROM faces ORDER BY face_index")]
+    vconn.close()
+    assert Image.open(BytesIO(photo_thumbs[_A])).size == (320, 320)
+    assert photo_thumbs[_B] == b'not a jpeg'  # corrupt thumbnails are left untouched
+    assert Image.open(BytesIO(face_thumbs[0])).size == (320, 320)
+    assert face_thumbs[1] == small_face  # already within size: never re-encoded
+
+
+def test_incremental_export_ignores_unloaded_virtual_tables(tmp_path):
+    """A vec0 table in the scan DB must not break the sync: the export
+    connection never loads sqlite-vec, so its module is unavailable there."""
+    src = str(tmp_path / 'scan.db')
+    out = str(tmp_path / 'viewer.db')
+    _make_source_db(src)
+    sconn = sqlite3.connect(src)
+    # Register a virtual table whose module is not loaded, as photos_vec looks
+    # to a connection without sqlite-vec.
+    schema_version = sconn.execute("PRAGMA schema_version").fetchone()[0]
+    sconn.execute("PRAGMA writable_schema = ON")
+    sconn.execute(
+        "INSERT INTO sqlite_master (type, name, tbl_name, rootpage, sql) VALUES "
+        "('table', 'photos_vec', 'photos_vec', 0, "
+        "'CREATE VIRTUAL TABLE photos_vec USING vec0(path TEXT PRIMARY KEY, embedding float[4])')"
+    )
+    sconn.execute(f"PRAGMA schema_version = {schema_version + 1}")
+    sconn.execute("PRAGMA writable_schema = OFF")
+    sconn.commit()
+    sconn.close()
+
+    export_viewer_db(src, out, thumbnail_size=320, verbose=False)
+    export_viewer_db(src, out, thumbnail_size=320, verbose=False)
+
+    vconn = sqlite3.connect(out)
+    n = vconn.execute("SELECT COUNT(*) FROM photos").fetchone()[0]
+    vconn.close()
+    assert n == 2
+
+
 if __name__ == '__main__':
     raise SystemExit(pytest.main([__file__, '-v']))
@@ -218,6 +218,44 @@ class TestRemoteTagger:
         assert tagger.tag_batch([_image(), _image()], max_tags=5) == [[], []]
 
 
+class _VocabConfig:
+    def __init__(self, tags):
+        self.tags = tags if isinstance(tags, dict) else {tag: [] for tag in tags}
+
+    def get_tag_vocabulary(self):
+        return self.tags
+
+
+class TestTagMatching:
+    @pytest.mark.parametrize("has_rapidfuzz", [True, False])
+    def test_levenshtein_is_capped_above_max_dist(self, monkeypatch, has_rapidfuzz):
+        from models import vlm_tagger
+
+        if has_rapidfuzz and not vlm_tagger.HAS_RAPIDFUZZ:
+            pytest.skip("rapidfuzz not installed")
+        monkeypatch.setattr(vlm_tagger, "HAS_RAPIDFUZZ", has_rapidfuzz)
+        assert vlm_tagger._levenshtein("sunset", "sunsets", 2) == 1
+        assert vlm_tagger._levenshtein("kitten", "sitting", 2) == 3
+        assert vlm_tagger._levenshtein("kitten", "sitting", 5) == 3
+        assert vlm_tagger._levenshtein("cat", "landscape", 2) == 3
+
+    def test_parse_snaps_near_misses_to_vocabulary(self):
+        from models.vlm_tagger import VLMTagger
+
+        tagger = VLMTagger({}, _VocabConfig(["sunset", "landscape", "portrait"]),
+                           backend=_StubBackend())
+        assert tagger._parse_tags("Tags: sunsett, landscpe, zebra crossing", max_tags=5) == [
+            "sunset", "landscape", "zebra_crossing"]
+
+    def test_parse_tags_resolves_synonyms_and_spaced_tags(self):
+        from models.vlm_tagger import VLMTagger
+        vocab = {"aurora": ["aurora", "northern lights"], "milky way": ["milky way"],
+                 "beach": ["beach", "seaside"]}
+        tagger = VLMTagger({}, _VocabConfig(vocab), backend=_StubBackend())
+        assert tagger._parse_tags("Northern Lights, milky way, seaside, beach", max_tags=5) == [
+            "aurora", "milky way", "beach"]
+
+
 # --- resolve_vlm_config un-gates remote on low-VRAM profiles ---------------
 
 _LEGACY_LOCAL = {"models": {"vram_profile": "legacy",
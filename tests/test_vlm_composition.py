@@ -0,0 +1,90 @@
+"""Tests for VLMCompositionAnalyzer.batch_analyze with stub model/processor.
+
+Covers chunking by ``batch_size`` (left-padded batched generate per chunk) and
+the per-image fallback when a batch fails for any reason.
+"""
+
+import pytest
+
+import PIL.Image
+
+from models.vlm_composition import VLMCompositionAnalyzer
+
+
+def _image():
+    return PIL.Image.new("RGB", (4, 4), color=(10, 20, 30))
+
+
+class _FakeTokenizer:
+    def __init__(self):
+        self.padding_side = "right"
+
+
+class _FakeInputs(dict):
+    @property
+    def input_ids(self):
+        return self["input_ids"]
+
+    def to(self, device):
+        return self
+
+
+class _FakeProcessor:
+    def __init__(self, seq_len=8, error=None):
+        self.tokenizer = _FakeTokenizer()
+        self.seq_len = seq_len
+        self.error = error
+        self.calls = []
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=True):
+        return "prompt text"
+
+    def __call__(self, text, images, padding, return_tensors):
+        if self.error is not None:
+            raise self.error
+        import torch
+        self.calls.append((len(images), self.tokenizer.padding_side))
+        return _FakeInputs(input_ids=torch.zeros((len(images), self.seq_len), dtype=torch.long))
+
+    def batch_decode(self, ids, skip_special_tokens=True, clean_up_tokenization_spaces=False):
+        return ["SCORE: 7\nEXPLANATION: Strong leading lines."] * ids.shape[0]
+
+
+class _FakeModel:
+    def generate(self, input_ids, max_new_tokens, do_sample):
+        import torch
+        return torch.zeros((input_ids.shape[0], input_ids.shape[1] + 3), dtype=torch.long)
+
+
+def _analyzer(processor, batch_size):
+    return VLMCompositionAnalyzer(
+        {"model": _FakeModel(), "processor": processor}, device="cpu", batch_size=batch_size
+    )
+
+
+class TestBatchAnalyze:
+    def test_chunks_by_batch_size_with_left_padding(self):
+        pytest.importorskip("torch")
+        processor = _FakeProcessor()
+        analyzer = _analyzer(processor, batch_size=2)
+
+        results = analyzer.batch_analyze([_image() for _ in range(5)])
+
+        # Two batched chunks of 2, then the odd image through analyze_composition
+        assert processor.calls == [(2, "left"), (2, "left"), (1, "right")]
+        assert processor.tokenizer.padding_side == "right"
+        assert len(results) == 5
+        assert all(r["composition_score"] == 7.0 for r in results)
+        assert all(r["elements"] == {"leading_lines": True} for r in results)
+
+    def test_batch_error_falls_back_to_default_results(self):
+        processor = _FakeProcessor(error=RuntimeError("processor exploded"))
+        analyzer = _analyzer(processor, batch_size=4)
+
+        results = analyzer.batch_analyze([_image() for _ in range(3)])
+
+        assert len(results) == 3
+        for result in results:
+            assert result["composition_score"] == 5.0
+            assert result["elements"] == {}
+            assert "processor exploded" in result["explanation"]
@@ -10,25 +10,49 @@ import logging
 import sqlite3
 import numpy as np
 
-from db.connection import apply_pragmas
+from db.connection import apply_pragmas, get_connection
 from utils.union_find import UnionFind as _UnionFind
 
 logger = logging.getLogger("facet.duplicate")
 
+# NumPy >= 2.0 ships a hardware popcount ufunc
+_HAS_BITWISE_COUNT = hasattr(np, 'bitwise_count')
 
-def _hex_to_uint64(hex_str):
-    """Convert a hex pHash string to uint64."""
-    return int(hex_str, 16)
+# Upper bound on (row, later-hash) pairs compared per block in
+# _two_stage_union; keeps the XOR/popcount temporaries to tens of MB
+_HAMMING_BLOCK_PAIRS = 1 << 21
+
+
+def _phashes_to_uint64(hex_strs):
+    """Decode hex pHash strings into a uint64 array.
+
+    Standard 64-bit pHashes (16 hex digits) are hex-decoded in one call and
+    viewed as big-endian words; any other width falls back to ``int(h, 16)``.
+    """
+    if all(len(h) == 16 for h in hex_strs):
+        packed = bytes.fromhex(''.join(hex_strs))
+        return np.frombuffer(packed, dtype='>u8').astype(np.uint64)
+    return np.array([int(h, 16) for h in hex_strs], dtype=np.uint64)
+
+
+def _popcount64(values):
+    """Per-element popcount of a uint64 array, as int32.
+
+    NumPy 2's ``bitwise_count`` ufunc maps to the CPU popcount instruction;
+    older NumPy uses branch-free SWAR bit counting (a handful of whole-array
+    shifts, masks and one multiply).
+    """
+    if _HAS_BITWISE_COUNT:
+        return np.bitwise_count(values).astype(np.int32)
+    v = values - ((values >> _U64_1) & _M1)
+    v = (v & _M2) + ((v >> _U64_2) & _M2)
+    v = (v + (v >> _U64_4)) & _M4
+    return ((v * _H01) >> _U64_56).astype(np.int32)
 
 
 def _hamming_to_all(query_hash, hashes):
     """Vectorized Hamming distance of one uint64 hash against an array of hashes."""
-    xor_result = np.bitwise_xor(query_hash, hashes)
-    distances = np.zeros(len(hashes), dtype=np.int32)
-    for byte_idx in range(8):
-        byte_vals = (xor_result >> np.uint64(byte_idx * 8)) & np.uint64(0xFF)
-        distances += _POPCOUNT_TABLE[byte_vals.astype(np.int32)]
-    return distances
+    return _popcount64(np.bitwise_xor(query_hash, hashes))
 
 
 def _build_embedding_matrix(emb_blobs):
@@ -71,30 +95,34 @@ def _two_stage_union(hashes, matrix, has_emb, max_distance, prefilter_hamming, c
     """
     n = len(hashes)
     uf = _UnionFind(n)
-    for i in range(n):
-        start_j = i + 1
-        if start_j >= n:
-            continue
-        remaining = hashes[start_j:]
-        distances = _hamming_to_all(hashes[i], remaining)
-
-        if matrix is not None and has_emb[i]:
-            both_emb = has_emb[start_j:]
-            # Per-pair Hamming gate: loose where both have embeddings, strict otherwise.
-            gate = np.where(both_emb, prefilter_hamming, max_distance)
-            cand = np.where(distances <= gate)[0]
-            for mi in cand:
-                j = start_j + int(mi)
-                if has_emb[j]:
-                    if float(np.dot(matrix[i], matrix[j])) >= cosine_threshold:
-                        uf.union(i, j)
-                else:
-                    uf.union(i, j)  # strict pHash already satisfied
-        else:
-            # Row i has no embedding -> strict pHash-only for every pair from i.
-            cand = np.where(distances <= max_distance)[0]
-            for mi in cand:
-                uf.union(i, start_j + int(mi))
+    block = max(1, _HAMMING_BLOCK_PAIRS // max(n, 1))
+    # Stage 1 gate over the whole block: the loose one when any pair may carry
+    # embeddings (prefilter_hamming >= max_distance), refined per pair below
+    loose = prefilter_hamming if matrix is not None else max_distance
+    for i0 in range(0, n - 1, block):
+        i1 = min(i0 + block, n - 1)
+        # Rows i0..i1-1 against every later hash in one XOR/popcount; column c
+        # is photo i0 + 1 + c, so pairs with j <= i (c < r) are dropped below
+        distances = _popcount64(np.bitwise_xor(hashes[i0:i1, None], hashes[None, i0 + 1:]))
+        rows, cols = np.nonzero(distances <= loose)  # row-major, like a per-row scan
+        upper = cols >= rows
+        rows, cols = rows[upper], cols[upper]
+        dist = distances[rows, cols]
+        rows += i0
+        cols += i0 + 1
+
+        if matrix is not None:
+            # Both embedded: the loose gate holds, merge on cosine (stage 2).
+            # Otherwise the strict pHash gate decides.
+            both_emb = has_emb[rows] & has_emb[cols]
+            keep = ~both_emb & (dist <= max_distance)
+            if both_emb.any():
+                a, b = rows[both_emb], cols[both_emb]
+                keep[both_emb] = np.einsum('ij,ij->i', matrix[a], matrix[b]) >= cosine_threshold
+            rows, cols = rows[keep], cols[keep]
+
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            uf.union(i, j)
     return uf
 
 
@@ -131,24 +159,52 @@ def detect_duplicates(db_path, config_path=None):
         max_distance, similarity_pct, prefilter_hamming, cosine_threshold,
     )
 
-    # Load all photos with pHash (+ embedding for the cosine gate)
-    with sqlite3.connect(db_path) as conn:
-        apply_pragmas(conn)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.execute(
+    # One connection for the read and the rewrite of the markings
+    with get_connection(db_path) as conn:
+        # Load all photos with pHash (+ embedding for the cosine gate)
+        rows = conn.execute(
             "SELECT path, phash, aggregate, clip_embedding, "
             "face_count, eyes_open_score, expression_score, tech_sharpness, "
             "(SELECT ls.learned_score FROM learned_scores ls "
             " WHERE ls.photo_path = photos.path AND ls.user_id IS NULL "
             " AND ls.category IS NULL) AS learned_score "
             "FROM photos WHERE phash IS NOT NULL ORDER BY path"
-        )
-        rows = cursor.fetchall()
+        ).fetchall()
+
+        if not rows:
+            logger.info("No photos with pHash found.")
+            return
+
+        dup_groups, updates = _group_duplicates(
+            rows, max_distance, prefilter_hamming, cosine_threshold)
+
+        # Replace the existing markings in a single transaction
+        with conn:
+            conn.execute("UPDATE photos SET duplicate_group_id = NULL, is_duplicate_lead = 0")
+            conn.executemany(
+                "UPDATE photos SET duplicate_group_id = ?, is_duplicate_lead = ? WHERE path = ?",
+                updates,
+            )
 
-    if not rows:
-        logger.info("No photos with pHash found.")
+    if not dup_groups:
+        logger.info("No duplicates found.")
         return
 
+    total_dups = sum(len(m) for m in dup_groups.values())
+    hidden = total_dups - len(dup_groups)  # non-lead duplicates
+    logger.info("Marked %d groups: %d photos, %d will be hidden when 'Hide Duplicates' is on",
+                len(dup_groups), total_dups, hidden)
+
+
+def _group_duplicates(rows, max_distance, prefilter_hamming, cosine_threshold):
+    """Group photo rows into duplicate sets and pick each set's lead.
+
+    Returns ``(dup_groups, updates)``: groups of 2+ row indices keyed by their
+    Union-Find root, and ``(group_id, is_lead, path)`` tuples for every grouped
+    photo, group IDs numbered in root order.
+    """
+    from utils.selection import composite_lead_score
+
     paths = [r['path'] for r in rows]
     # Per-row dicts for composite lead selection (aggregate + eyes/expression/sharpness).
     lead_data = [
@@ -165,7 +221,7 @@ def detect_duplicates(db_path, config_path=None):
     n = len(paths)
 
     # Convert hex hashes to uint64 numpy array for vectorized comparison
-    hashes = np.array([_hex_to_uint64(r['phash']) for r in rows], dtype=np.uint64)
+    hashes = _phashes_to_uint64([r['phash'] for r in rows])
     matrix, has_emb = _build_embedding_matrix([r['clip_embedding'] for r in rows])
     logger.info("Comparing %d photos (%d with embeddings)...", n, int(has_emb.sum()))
 
@@ -181,48 +237,19 @@ def detect_duplicates(db_path, config_path=None):
 
     # Filter to groups with 2+ members
     dup_groups = {root: members for root, members in groups.items() if len(members) >= 2}
-
-    if not dup_groups:
-        logger.info("No duplicates found.")
-        # Clear any existing duplicate markings
-        with sqlite3.connect(db_path) as conn:
-            apply_pragmas(conn)
-            conn.execute("UPDATE photos SET duplicate_group_id = NULL, is_duplicate_lead = 0")
-            conn.commit()
-        return
-
-    # Assign group IDs and determine leads
-    logger.info("Found %d duplicate groups (%d photos total)",
-                len(dup_groups), sum(len(m) for m in dup_groups.values()))
-
-    # Clear existing markings
-    with sqlite3.connect(db_path) as conn:
-        apply_pragmas(conn)
-        conn.execute("UPDATE photos SET duplicate_group_id = NULL, is_duplicate_lead = 0")
-
-        from utils.selection import composite_lead_score
-
-        group_id = 1
-        for _root, members in sorted(dup_groups.items()):
-            # Composite best-of: aggregate dominates, eyes-open / expression /
-            # sharpness break near-ties toward the better keeper frame.
-            best_idx = max(members, key=lambda idx: composite_lead_score(lead_data[idx]))
-
-            for idx in members:
-                is_lead = 1 if idx == best_idx else 0
-                conn.execute(
-                    "UPDATE photos SET duplicate_group_id = ?, is_duplicate_lead = ? "
-                    "WHERE path = ?",
-                    (group_id, is_lead, paths[idx])
-                )
-            group_id += 1
-
-        conn.commit()
-
-    total_dups = sum(len(m) for m in dup_groups.values())
-    hidden = total_dups - len(dup_groups)  # non-lead duplicates
-    logger.info("Marked %d groups: %d photos, %d will be hidden when 'Hide Duplicates' is on",
-                len(dup_groups), total_dups, hidden)
+    if dup_groups:
+        logger.info("Found %d duplicate groups (%d photos total)",
+                    len(dup_groups), sum(len(m) for m in dup_groups.values()))
+
+    updates = []
+    for group_id, (_root, members) in enumerate(sorted(dup_groups.items()), start=1):
+        # Composite best-of: aggregate dominates, eyes-open / expression /
+        # sharpness break near-ties toward the better keeper frame.
+        best_idx = max(members, key=lambda idx: composite_lead_score(lead_data[idx]))
+        updates.extend(
+            (group_id, 1 if idx == best_idx else 0, paths[idx]) for idx in members
+        )
+    return dup_groups, updates
 
 
 def evaluate_dedup_thresholds(labelled_pairs, thresholds):
@@ -275,7 +302,7 @@ def _candidate_cosines(db_path, prefilter_hamming, config_path=None):
             "SELECT path, phash, clip_embedding FROM photos "
             "WHERE phash IS NOT NULL AND clip_embedding IS NOT NULL ORDER BY path"
         ).fetchall()
-    hashes = np.array([_hex_to_uint64(r['phash']) for r in rows], dtype=np.uint64)
+    hashes = _phashes_to_uint64([r['phash'] for r in rows])
     matrix, has_emb = _build_embedding_matrix([r['clip_embedding'] for r in rows])
     pairs = []
     n = len(rows)
@@ -359,5 +386,9 @@ def report_dedup_thresholds(db_path, config_path=None, labels_path=None):
         )
 
 
-# Precomputed popcount table for bytes 0-255
-_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.int32)
+# SWAR popcount constants (see _popcount64)
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+_U64_1, _U64_2, _U64_4, _U64_56 = np.uint64(1), np.uint64(2), np.uint64(4), np.uint64(56)